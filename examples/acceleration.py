@@ -0,0 +1,339 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Sampling and sample storage for live acceleration charts (see raw_acceleration_chart.py).
+# Samples are rows of numbers e.g. (t, z, r), kept column wise in NumPy arrays so that
+# adding samples costs the same however long the session runs and charts get views
+# instead of copies.
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from plezmo_backend import Logger, Motion
+
+logger = Logger()
+
+# Latest capacity samples. Every sample is written twice, at i and at i + capacity, so the
+# window is always one contiguous slice and view() needs no copying.
+class RingBuffer:
+    def __init__(self, capacity, columns, dtype=np.float64):
+        self.capacity = capacity
+        self.columns = columns
+        self._data = np.zeros((columns, 2 * capacity), dtype=dtype)
+        # position the next sample goes to
+        self._head = 0
+        # samples added so far
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    # Add samples, rows is a sequence of rows or an array of shape (n, columns)
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=self._data.dtype).reshape(-1, self.columns)
+        if len(rows) > self.capacity:
+            # only the latest ones stay
+            self.total += len(rows) - self.capacity
+            rows = rows[-self.capacity:]
+        n = len(rows)
+        first = min(n, self.capacity - self._head)
+        for offset in (0, self.capacity):
+            self._data[:, offset + self._head:offset + self._head + first] = rows[:first].T
+            self._data[:, offset:offset + n - first] = rows[first:].T
+        self._head = (self._head + n) % self.capacity
+        self.total += n
+
+    # Samples in the window, oldest first, as an array of shape (columns, len(self)).
+    # It is a view into the buffer, valid till the next extend().
+    def view(self):
+        n = len(self)
+        start = self._head + self.capacity - n
+        return self._data[:, start:start + n]
+
+# Overview of all samples of a session in bounded memory, e.g. to chart a whole session.
+# Rows are (t, values...). Every bucket_size rows make a bucket of which only the lowest and
+# highest value of each column, with their times, are kept. When capacity buckets are full,
+# neighbouring buckets are merged and bucket_size doubles, so the points to draw stay between
+# capacity and 2 * capacity per column however long the session runs, and adding a sample
+# costs the same on average.
+class MinMaxDecimator:
+    def __init__(self, columns, capacity=1024, bucket_size=1):
+        # capacity is kept even so that full buckets merge in pairs
+        self.capacity = capacity + capacity % 2
+        self.bucket_size = bucket_size
+        self.values = columns - 1
+        self.total = 0
+        shape = (self.capacity, self.values)
+        self._tmin, self._min = np.empty(shape), np.empty(shape)
+        self._tmax, self._max = np.empty(shape), np.empty(shape)
+        self._count = 0
+        # rows of the bucket being filled
+        self._partial = np.empty((0, columns))
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, self.values + 1)
+        self.total += len(rows)
+        rows = np.concatenate([self._partial, rows])
+        while len(rows) >= self.bucket_size:
+            if self._count == self.capacity:
+                self._merge()
+                continue
+            n = min(len(rows) // self.bucket_size, self.capacity - self._count)
+            self._add(rows[:n * self.bucket_size].reshape(n, self.bucket_size, -1))
+            rows = rows[n * self.bucket_size:]
+        self._partial = rows
+
+    # buckets is an array of shape (n, bucket_size, columns)
+    def _add(self, buckets):
+        n = len(buckets)
+        t, v = buckets[:, :, 0], buckets[:, :, 1:]
+        low, high = v.argmin(axis=1), v.argmax(axis=1)
+        rows = np.arange(n)[:, None]
+        end = self._count + n
+        self._tmin[self._count:end], self._min[self._count:end] = t[rows, low], v.min(axis=1)
+        self._tmax[self._count:end], self._max[self._count:end] = t[rows, high], v.max(axis=1)
+        self._count = end
+
+    def _merge(self):
+        half = self._count // 2
+        for times, values, pick in ((self._tmin, self._min, np.argmin), (self._tmax, self._max, np.argmax)):
+            t = times[:self._count].reshape(half, 2, -1)
+            v = values[:self._count].reshape(half, 2, -1)
+            which = pick(v, axis=1)[:, None, :]
+            times[:half] = np.take_along_axis(t, which, axis=1)[:, 0]
+            values[:half] = np.take_along_axis(v, which, axis=1)[:, 0]
+        self._count = half
+        self.bucket_size *= 2
+
+    # Points to draw for value column i (0 is the first after t): the low and high of each
+    # bucket in time order, as arrays t, y
+    def view(self, i):
+        n = self._count
+        tmin, vmin, tmax, vmax = self._tmin[:n, i], self._min[:n, i], self._tmax[:n, i], self._max[:n, i]
+        if len(self._partial) > 0:
+            t, v = self._partial[:, 0], self._partial[:, i + 1]
+            low, high = v.argmin(), v.argmax()
+            tmin, vmin = np.append(tmin, t[low]), np.append(vmin, v[low])
+            tmax, vmax = np.append(tmax, t[high]), np.append(vmax, v[high])
+        first = tmin <= tmax
+        t = np.empty(2 * len(tmin))
+        y = np.empty(2 * len(tmin))
+        t[0::2], y[0::2] = np.where(first, tmin, tmax), np.where(first, vmin, vmax)
+        t[1::2], y[1::2] = np.where(first, tmax, tmin), np.where(first, vmax, vmin)
+        return t, y
+
+# Events per second over the last second or so, e.g. samples or frames
+class RateCounter:
+    def __init__(self, period=1.0):
+        self.period = period
+        self.total = 0
+        self._lock = threading.Lock()
+        self._since = time.monotonic()
+        self._count = 0
+        self._rate = 0.0
+
+    def add(self, n=1):
+        with self._lock:
+            self.total += n
+            self._count += n
+            self._update(time.monotonic())
+
+    def _update(self, now):
+        if now - self._since >= self.period:
+            self._rate = self._count / (now - self._since)
+            self._since = now
+            self._count = 0
+
+    def rate(self):
+        with self._lock:
+            self._update(time.monotonic())
+            return self._rate
+
+# Timing of sampling: rate, interval between samples and how long each read takes over the
+# latest window samples, and a histogram of all intervals in bins of bin_ms milliseconds
+# (the last bin counts everything from max_ms up). add() takes times in nanoseconds.
+class SampleStats:
+    def __init__(self, window=1000, bin_ms=1.0, max_ms=100.0):
+        self.bin_ms = bin_ms
+        self.max_ms = max_ms
+        bins = int(round(max_ms / bin_ms))
+        # left edge of every bin in milliseconds
+        self.edges = np.arange(bins + 1) * bin_ms
+        self.histogram = np.zeros(bins + 1, dtype=np.int64)
+        self.count = 0
+        self._intervals = RingBuffer(window, 1)
+        self._latencies = RingBuffer(window, 1)
+        self._last = None
+        self._lock = threading.Lock()
+
+    # t is the time stamp of a sample, latency how long reading it took
+    def add(self, t, latency):
+        with self._lock:
+            self.count += 1
+            self._latencies.extend([latency / 1e6])
+            if self._last != None:
+                interval = (t - self._last) / 1e6
+                self._intervals.extend([interval])
+                self.histogram[min(int(interval // self.bin_ms), len(self.histogram) - 1)] += 1
+            self._last = t
+
+    # Statistics as a dict of plain numbers, milliseconds for times
+    def summary(self):
+        with self._lock:
+            intervals = self._intervals.view()[0].copy()
+            latencies = self._latencies.view()[0].copy()
+            histogram = self.histogram.copy()
+            count = self.count
+        mean = intervals.mean() if len(intervals) > 0 else 0.0
+        return {
+            "samples": count,
+            "rate": 1000.0 / mean if mean > 0 else 0.0,
+            "interval_ms": _describe(intervals),
+            "latency_ms": _describe(latencies),
+            "histogram": {"bin_ms": self.bin_ms, "counts": histogram.tolist()},
+        }
+
+def _describe(values):
+    if len(values) == 0:
+        return {"mean": 0.0, "std": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {"mean": float(values.mean()), "std": float(values.std()),
+            "p50": float(p50), "p95": float(p95), "max": float(values.max())}
+
+# Reads several Acceleration axes of a Motion element as one sample, e.g.
+#   reader = AxisReader("Motion", [Acceleration.Z, Acceleration.RESULTANT])
+#   t, z, r = reader.read()
+# Elements answer one axis per request, so the requests of one sample are all issued at
+# once from a small thread pool instead of one after the other. The element still answers
+# them in turn, but each request is queued while the previous one is on its way, saving the
+# time between a reply and the next request. The sample is stamped with the middle of the
+# time it took to read, in seconds of clock(), a monotonic clock in nanoseconds. Timing of
+# the reads is kept in stats.
+class AxisReader:
+    def __init__(self, element_name, axes, clock=time.monotonic_ns):
+        self.element_name = element_name
+        self.axes = list(axes)
+        self.clock = clock
+        self.stats = SampleStats()
+        # the first axis is read in the calling thread
+        self._pool = None
+        if len(self.axes) > 1:
+            self._pool = ThreadPoolExecutor(max_workers=len(self.axes) - 1, thread_name_prefix="axis")
+
+    def _read_axis(self, axis):
+        return Motion.getAccelerometerData(self.element_name, axis)
+
+    # [t, value of each axis]
+    def read(self):
+        start = self.clock()
+        futures = [self._pool.submit(self._read_axis, axis) for axis in self.axes[1:]] if self._pool != None else []
+        values = [self._read_axis(self.axes[0])]
+        values.extend(f.result() for f in futures)
+        end = self.clock()
+        self.stats.add((start + end) // 2, end - start)
+        return [(start + end) / 2e9] + values
+
+    def close(self):
+        if self._pool != None:
+            self._pool.shutdown()
+            self._pool = None
+
+# Calls read() again and again in its own thread, as fast as it returns, and keeps the rows
+# it returns till drain() takes them. If more than max_pending rows are waiting, the oldest
+# are dropped and counted in dropped. Errors of read() are counted, sampling continues
+# after a short pause. Every row is also given to sink(row) if set, in the sampler thread,
+# e.g. CaptureWriter.append so that nothing is lost while the chart does not drain.
+# Sampling stops by itself after count samples if count is set.
+class Sampler:
+    def __init__(self, read, columns, max_pending=100000, error_pause=0.1, sink=None, count=None):
+        self.read = read
+        self.sink = sink
+        self.count = count
+        self.columns = columns
+        self.max_pending = max_pending
+        self.error_pause = error_pause
+        self.samples = RateCounter()
+        self.dropped = 0
+        self.errors = 0
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread != None:
+            self._thread.join()
+            self._thread = None
+
+    # False once stopped or done with count samples
+    def running(self):
+        return self._thread != None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set() and (self.count == None or self.samples.total < self.count):
+            try:
+                row = self.read()
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1:
+                    logger.error("Sampling failed, ex {}".format(e))
+                self._stop.wait(self.error_pause)
+                continue
+            with self._lock:
+                if len(self._pending) >= self.max_pending:
+                    self._pending.popleft()
+                    self.dropped += 1
+                self._pending.append(row)
+            if self.sink != None:
+                self.sink(row)
+            self.samples.add()
+
+    # Rows read since the last drain(), as an array of shape (n, columns)
+    def drain(self):
+        with self._lock:
+            rows, self._pending = self._pending, deque()
+        return np.array(rows, dtype=np.float64).reshape(-1, self.columns)
@@ -0,0 +1,128 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Elements needed: Distance and/or Color elements, any number of them
+# Reads the distance of Distance elements and the light of Color elements, each as often as its
+# value changes (see sampling.AdaptiveSampler): up to --max-rate times a second while the value
+# changes by --threshold or more between readings, backing off to --min-rate while it does not.
+# Elements sharing an adapter then leave the link to the ones that change, instead of all of
+# them polling at the highest rate. Runs for --duration seconds or till Ctrl-C, then shows how
+# many reads were saved for each element.
+#   python adaptive_sampling_example.py Distance:DISTANCE Color:COLOR --min-rate 0.5 --max-rate 10
+
+import time
+import argparse
+import threading
+
+from plezmo_backend import *
+
+import utils
+import sampling
+
+logger = Logger()
+
+# What is read of each element type, the default change threshold and its unit
+READINGS = {
+    "DISTANCE": (lambda name: Distance.getDistanceCM(name), 3, "CM"),
+    "COLOR": (lambda name: Color.getLightValueLux(name), 20, "lux"),
+}
+
+# Reads one element till its sampler is stopped
+def poll(element, sampler):
+    try:
+        for t, value in sampler:
+            logger.info("{:8.3f} s  {} {} {}, next in {:.2f} s".format(t, element["name"], value, READINGS[element["type"].name][2], sampler.interval))
+    except Exception as e:
+        logger.error("Failed to read {}, ex {}".format(element["name"], e))
+
+def main(elementList, options):
+    try:
+        session = utils.ElementSession(elementList).connect()
+    except Exception as e:
+        logger.error("Failed to connect to elements, ex {}".format(e))
+        return
+
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        samplers = []
+        threads = []
+        for element in elementList:
+            read, threshold, unit = READINGS[element["type"].name]
+            sampler = sampling.AdaptiveSampler(lambda name=element["name"], read=read: read(name), options.min_rate, options.max_rate,
+                                               options.threshold if options.threshold != None else threshold, options.duration)
+            samplers.append(sampler)
+            threads.append(threading.Thread(target=poll, args=(element, sampler), daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            logger.info("Stopped")
+        for sampler in samplers:
+            sampler.stop()
+        for thread in threads:
+            thread.join()
+        for element, sampler in zip(elementList, samplers):
+            summary = sampler.summary()
+            logger.info("{}: {} reads at {:.2f} per second on average, {} changes, {} reads fewer than at {} per second".format(
+                element["name"], summary["samples"], summary["achieved_rate"], summary["changes"], summary["saved"], summary["max_rate"]))
+
+# Elements and options from the arguments
+def extract_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("elements", nargs="*")
+    parser.add_argument("--min-rate", type=float, default=0.5)
+    parser.add_argument("--max-rate", type=float, default=10)
+    parser.add_argument("--threshold", type=float)
+    parser.add_argument("--duration", type=float)
+    return parser.parse_args()
+
+# Program starts here
+if __name__ == "__main__":
+    utils.handle_options("python adaptive_sampling_example.py <name:DISTANCE|name:COLOR> ..."
+                         " [--min-rate RATE] [--max-rate RATE] [--threshold VALUE] [--duration SECS]")
+    options = extract_options()
+    elementList = utils.extract_elements(options.elements)
+    if elementList == None or len(elementList) == 0:
+        logger.error("Elements are mandatory as name:TYPE, e.g. # python adaptive_sampling_example.py Distance:DISTANCE Color:COLOR")
+    elif any(e["type"] not in READINGS for e in elementList):
+        logger.error("Only DISTANCE and COLOR elements can be read")
+    elif not 0 < options.min_rate <= options.max_rate:
+        logger.error("Rates must be 0 < --min-rate <= --max-rate")
+    elif not utils.dry_run([e["name"] for e in elementList]):
+        main(utils.resolve_elements(elementList), options)
@@ -0,0 +1,214 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Measures latency and throughput of the element calls used by the examples. Each call is
+# made back to back for a fixed time and count, errors, calls per second, mean, p50, p95,
+# p99 and max latency in milliseconds are reported as JSON. Works with real elements and
+# with any other backend, e.g. PLEZMO_BACKEND=sim.
+#
+# Elements to use are given as name:TYPE. Calls of element types not given are skipped.
+# With --parallel all calls run at the same time instead of one after another, which
+# shows how many elements one adapter can poll.
+#
+# e.g. # python benchmark.py Motion:MOTION Light:LIGHT
+#      # python benchmark.py --duration 10 --parallel --json result.json Motion:MOTION Distance:DISTANCE Color:COLOR
+#      # PLEZMO_BACKEND=sim python benchmark.py Motion:MOTION Distance:DISTANCE Color:COLOR Light:LIGHT Display:DISPLAY Music:MUSIC Motor:MOTOR
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import threading
+
+from plezmo_backend import *
+import plezmo_backend
+
+import utils
+
+logger = Logger()
+
+# Calls measured, as (name, element type name, function taking element name and call number)
+CALLS = [
+    ("Motion.getAccelerometerData", "MOTION", lambda name, i: Motion.getAccelerometerData(name, Acceleration.Z)),
+    ("Motion.getAngle", "MOTION", lambda name, i: Motion.getAngle(name, Axis.FRONT_TO_BACK)),
+    ("Distance.getDistanceCM", "DISTANCE", lambda name, i: Distance.getDistanceCM(name)),
+    ("Color.getColor", "COLOR", lambda name, i: Color.getColor(name)),
+    ("Color.getLightValueLux", "COLOR", lambda name, i: Color.getLightValueLux(name)),
+    ("Light.turnOn", "LIGHT", lambda name, i: Light.turnOn(name, LightColor("#FF0000" if i % 2 == 0 else "#0000FF"), Percentage(50))),
+    ("Display.showText", "DISPLAY", lambda name, i: Display.showText(name, DisplayLine.TWO, TextAlignment.CENTER, str(i))),
+    ("Music.playNote", "MUSIC", lambda name, i: Music.playNote(name, Note(60 + i % 12), 1)),
+    ("Motor.startWithRPM", "MOTOR", lambda name, i: Motor.startWithRPM(name, 20 + i % 100, MotorDirection.CLOCKWISE)),
+]
+
+# Commands to leave the elements the way they were found
+CLEANUP = {
+    "LIGHT": lambda name: Light.setState(name, LightState.OFF),
+    "DISPLAY": lambda name: Display.clearDisplay(name),
+    "MUSIC": lambda name: Music.stop(name),
+    "MOTOR": lambda name: Motor.stop(name),
+}
+
+# Value at percentile p (0-100) of sorted values, nearest rank
+def percentile(values, p):
+    if len(values) == 0:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[rank - 1]
+
+def summarize(latencies, errors, elapsed):
+    values = sorted(latencies)
+    ms = lambda v: None if v == None else round(v * 1000, 3)
+    return {"count": len(values),
+            "errors": errors,
+            "duration_s": round(elapsed, 3),
+            "calls_per_s": round(len(values) / elapsed, 2) if elapsed > 0 else None,
+            "mean_ms": ms(sum(values) / len(values)) if len(values) > 0 else None,
+            "p50_ms": ms(percentile(values, 50)),
+            "p95_ms": ms(percentile(values, 95)),
+            "p99_ms": ms(percentile(values, 99)),
+            "max_ms": ms(values[-1]) if len(values) > 0 else None}
+
+# Make call on element again and again for duration seconds. Latency is measured for
+# successful calls only, failed calls are counted as errors.
+def run_call(call, element_name, duration, warmup):
+    name, _, func = call
+    for i in range(warmup):
+        try:
+            func(element_name, i)
+        except Exception:
+            pass
+    latencies = []
+    errors = 0
+    i = 0
+    start = time.perf_counter()
+    end = start + duration
+    while True:
+        t0 = time.perf_counter()
+        if t0 >= end:
+            break
+        try:
+            func(element_name, i)
+            latencies.append(time.perf_counter() - t0)
+        except Exception as e:
+            errors += 1
+            if errors == 1:
+                logger.error("{} failed, ex {}".format(name, e))
+        i += 1
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+# Results are keyed by call name, then element name. Each call is made on every element of its type.
+def run(elementList, calls, duration, warmup, parallel):
+    selected = [(c, e["name"]) for c in CALLS for e in elementList
+                if c[1] == e["type"].name and (calls == None or c[0] in calls)]
+    results = {}
+    if parallel:
+        def worker(call, element_name):
+            result = run_call(call, element_name, duration, warmup)
+            results.setdefault(call[0], {})[element_name] = result
+        threads = [threading.Thread(target=worker, args=pair) for pair in selected]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        total = sum(r["count"] for by_element in results.values() for r in by_element.values())
+        results = {c[0]: results[c[0]] for c in CALLS if c[0] in results}
+        return results, {"count": total, "calls_per_s": round(total / elapsed, 2)}
+    for call, element_name in selected:
+        logger.info("Running {} on {} for {} seconds".format(call[0], element_name, duration))
+        results.setdefault(call[0], {})[element_name] = run_call(call, element_name, duration, warmup)
+    return results, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure latency and throughput of element calls")
+    parser.add_argument("elements", nargs="+", help="elements to use as name:TYPE e.g. Motion:MOTION")
+    parser.add_argument("--duration", type=float, default=5, help="seconds each call is run for, default 5")
+    parser.add_argument("--warmup", type=int, default=3, help="calls made before measuring, default 3")
+    parser.add_argument("--calls", nargs="*", help="calls to run e.g. Motion.getAngle, default all")
+    parser.add_argument("--parallel", action="store_true", help="run all calls at the same time")
+    parser.add_argument("--json", help="write the results to this file instead of stdout")
+    options = parser.parse_args()
+
+    elementList = utils.extract_elements(options.elements)
+    if elementList == None:
+        logger.error("Elements are given as name:TYPE, e.g. # python benchmark.py Motion:MOTION Light:LIGHT")
+        sys.exit(2)
+    if options.calls != None:
+        unknown = [c for c in options.calls if c not in [call[0] for call in CALLS]]
+        if len(unknown) > 0:
+            logger.error("Unknown calls {}, calls are {}".format(unknown, [call[0] for call in CALLS]))
+            sys.exit(2)
+    elementList = utils.resolve_elements(elementList)
+
+    registerExceptionHandler(lambda e: logger.error("Got exception {}".format(e)))
+    try:
+        session = utils.ElementSession(elementList).connect()
+    except Exception as e:
+        logger.error("Could not connect to all the required elements, ex {}".format(e))
+        sys.exit(1)
+    with session:
+        connect = {name: round(latency, 3) for name, latency in session.latencies.items()}
+        results, total = run(elementList, options.calls, options.duration, options.warmup, options.parallel)
+        for e in elementList:
+            cleanup = CLEANUP.get(e["type"].name)
+            if cleanup != None:
+                try:
+                    cleanup(e["name"])
+                except Exception:
+                    pass
+
+    report = {"backend": plezmo_backend.BACKEND,
+              "python": platform.python_version(),
+              "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "duration_s": options.duration,
+              "parallel": options.parallel,
+              "connect_s": connect,
+              "calls": results}
+    if total != None:
+        report["total"] = total
+    if options.json != None:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info("Results written to {}".format(options.json))
+    else:
+        print(json.dumps(report, indent=2))
+
+# Program starts here
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Broker that owns the Plezmo wireless adapter and keeps elements connected, so that scripts
+# do not have to initialize BLE and connect to the elements every time they start. Scripts
+# run with PLEZMO_BACKEND=broker (see plezmo_backend.py) send their plezmoApi, Motion, Color,
+# Light, Display, Music, Motor and Distance calls to the broker over a Unix domain socket and
+# get their event handlers called by it. Several scripts can use the same elements at once.
+#
+# Elements given on the command line are connected at start, elements that scripts connect
+# to are added to them. All elements stay connected (and are reconnected if they drop out)
+# till the broker is stopped with control-c.
+#
+# e.g. # python broker.py Motion:MOTION Light:LIGHT
+#      # PLEZMO_BACKEND=broker python light_example.py Light
+#
+# The broker uses the backend given by PLEZMO_BACKEND like the examples do, e.g. to serve
+# simulated elements
+#      # PLEZMO_BACKEND=sim python broker.py Motion:MOTION Light:LIGHT
+#
+# Calls that wait for an event, e.g. Motion.waitForTilt(), run on a thread of their own so
+# that they cannot hold up the calls of other clients. The socket can be used only by the
+# user running the broker.
+import os
+import sys
+import json
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import plezmo_types
+import plezmo_backend
+from plezmo_backend import *
+
+import utils
+import plezmo_broker
+
+logger = Logger()
+
+# Threads executing calls of all clients, except the ones waiting for events
+CALL_THREADS = 32
+
+def globalExceptionHandler(e):
+    logger.info("###### Got exception {}".format(e))
+
+class Broker:
+    def __init__(self, elementList, path=plezmo_broker.SOCKET_PATH):
+        self.elementList = elementList
+        self.path = path
+        self.supervisor = utils.ElementSupervisor(elementList)
+        self.targets = {"plezmoApi": plezmoApi, "Motion": Motion, "Color": Color, "Light": Light,
+                        "Display": Display, "Music": Music, "Motor": Motor, "Distance": Distance}
+        self.types = plezmo_broker.type_table([plezmo_backend.load()])
+        self.pool = ThreadPoolExecutor(max_workers=CALL_THREADS)
+        # event subscription key to set of (client connection, handler id)
+        self.subscriptions = {}
+        self._lock = threading.Lock()
+        # element name to lock held while the element is connected
+        self._connect_locks = {}
+
+    def serve_forever(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # socket is created with mode 0600, so that other users cannot drive the elements
+        umask = os.umask(0o177)
+        try:
+            server.bind(self.path)
+        finally:
+            os.umask(umask)
+        server.listen()
+        self.supervisor.start()
+        logger.info("Broker listening on {}".format(self.path))
+        try:
+            while True:
+                sock, _ = server.accept()
+                ClientConnection(self, sock).start()
+        finally:
+            self.supervisor.stop()
+            server.close()
+            os.unlink(self.path)
+
+    # Connect to element if it is not connected yet. It stays connected till the broker stops.
+    # Clients connecting other elements at the same time do not wait for each other.
+    def ensure_connected(self, name, element_type, timeout):
+        with self._lock:
+            connect_lock = self._connect_locks.setdefault(name, threading.Lock())
+        with connect_lock:
+            if name in utils.connected_element_names():
+                return
+            e = {"name": name, "type": element_type}
+            utils.connect_all([e], timeout)
+            with self._lock:
+                if not any(x["name"] == name for x in self.elementList):
+                    self.elementList.append(e)
+
+    # Subscribe client to an element event. Only the first subscription registers a handler
+    # with the element, its events are passed on to all subscribed clients.
+    def subscribe(self, conn, handler_id, target, method, args):
+        key = json.dumps([target, method, args[0], args[2:]])
+        with self._lock:
+            subscribers = self.subscriptions.get(key)
+            if subscribers == None:
+                subscribers = set()
+                self.subscriptions[key] = subscribers
+                def handler():
+                    for c, h in list(subscribers):
+                        c.send({"event": h})
+                call_args = plezmo_broker.decode(args[2:], self.types)
+                # through the supervisor so that the handler is registered again after a reconnect
+                self.supervisor.register(getattr(self.targets[target], method), args[0], handler, *call_args)
+            subscribers.add((conn, handler_id))
+
+    def unsubscribe(self, conn):
+        with self._lock:
+            for subscribers in self.subscriptions.values():
+                for s in [s for s in subscribers if s[0] is conn]:
+                    subscribers.discard(s)
+
+# One connected client script
+class ClientConnection:
+    def __init__(self, broker, sock):
+        self.broker = broker
+        self.sock = sock
+        self.closed = False
+        # elements this client has connected to
+        self.attached = set()
+        self._send_lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        try:
+            with self.sock.makefile("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        request = self._parse(line)
+                    except ValueError as e:
+                        # reply to the bad request only, other requests of the client go on
+                        logger.error("Malformed request from client, ex {}".format(e))
+                        self.send({"id": self._request_id(line), "error": "ValueError", "message": str(e)})
+                        continue
+                    if request["method"].startswith("waitFor"):
+                        # blocks till the event comes, keep it off the shared threads
+                        threading.Thread(target=self._handle, args=(request,), daemon=True).start()
+                    else:
+                        self.broker.pool.submit(self._handle, request)
+        except (OSError, ValueError) as e:
+            logger.error("Client connection failed, ex {}".format(e))
+        finally:
+            self.closed = True
+            self.broker.unsubscribe(self)
+            self.sock.close()
+
+    # Request in a line sent by the client, ValueError if it is not a valid one
+    @staticmethod
+    def _parse(line):
+        request = json.loads(line)
+        if (not isinstance(request, dict) or any(key not in request for key in ("id", "target", "method", "args"))
+                or not isinstance(request["method"], str) or not isinstance(request["args"], list)):
+            raise ValueError("Request must have id, target, method and args, got {}".format(line.strip()))
+        return request
+
+    # Id of a request that could not be parsed, if it has one, so that its caller gets the error
+    @staticmethod
+    def _request_id(line):
+        try:
+            return json.loads(line).get("id")
+        except (ValueError, AttributeError):
+            return None
+
+    def send(self, msg):
+        if self.closed:
+            return
+        line = (json.dumps(msg) + "\n").encode("utf-8")
+        try:
+            with self._send_lock:
+                self.sock.sendall(line)
+        except OSError:
+            self.closed = True
+
+    def _handle(self, request):
+        reply = {"id": request["id"]}
+        try:
+            result = self._call(request["target"], request["method"], request["args"])
+            reply["result"] = plezmo_broker.encode(result)
+        except Exception as e:
+            reply["error"] = type(e).__name__
+            reply["message"] = str(e)
+        self.send(reply)
+
+    def _call(self, target, method, args):
+        if target not in self.broker.targets or method.startswith("_"):
+            raise ValueError("{}.{} is not available through the broker".format(target, method))
+        if target == "plezmoApi":
+            return self._api_call(method, plezmo_broker.decode(args, self.broker.types))
+        if method.startswith("on"):
+            # event handler registration, args are element name, handler and event details
+            self.broker.subscribe(self, args[1]["handler"], target, method, args)
+            return None
+        return getattr(self.broker.targets[target], method)(*plezmo_broker.decode(args, self.broker.types))
+
+    def _api_call(self, method, args):
+        if method == "connect":
+            timeout = args[2] if len(args) > 2 else 30
+            self.broker.ensure_connected(args[0], args[1], timeout)
+            self.attached.add(args[0])
+        elif method == "connectByMac":
+            # only elements already connected in the broker can be attached by MAC
+            for e in plezmoApi.getConnectedElements():
+                if e["mac"] == args[0]:
+                    self.attached.add(e["name"])
+                    return None
+            raise ConnectionFailedException(args[0])
+        elif method == "disconnect":
+            # element stays connected in the broker for other clients
+            if args[0] not in self.attached:
+                raise ElementNotFoundException(args[0])
+            self.attached.discard(args[0])
+        elif method == "getConnectedElements":
+            return [e for e in plezmoApi.getConnectedElements() if e["name"] in self.attached]
+        elif method == "getDiscoveredElements":
+            with utils.adapter_lock:
+                return plezmoApi.getDiscoveredElements(*args)
+        elif method == "close":
+            # clients close only their connection, see plezmo_broker
+            pass
+        else:
+            raise ValueError("plezmoApi.{} is not available through the broker".format(method))
+        return None
+
+def main(elementList):
+    registerExceptionHandler(globalExceptionHandler)
+    try:
+        session = utils.ElementSession(elementList).connect()
+    except Exception as e:
+        logger.error("Could not connect to all the required elements, ex {}".format(e))
+        return
+    # Elements are disconnected and plezmo is closed when the broker stops
+    with session:
+        try:
+            Broker(session.elementList).serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stopping the broker...")
+
+# Program starts here
+if __name__ == "__main__":
+    utils.handle_options("python broker.py [name:TYPE ...]")
+    # Elements to connect at start
+    elementList = utils.extract_elements(sys.argv[1:])
+    if plezmo_backend.BACKEND == "broker":
+        logger.error("Broker cannot use the broker backend, run it with PLEZMO_BACKEND=plezmo or sim")
+    elif elementList == None:
+        logger.error("Elements are given as name:TYPE, TYPE is one of {}, e.g. # python broker.py Motion:MOTION Light:LIGHT".format(
+            "/".join(plezmo_types.PlezmoElementType.__members__)))
+    elif not utils.dry_run([e["name"] for e in elementList]):
+        main(utils.resolve_elements(elementList))
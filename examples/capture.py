@@ -0,0 +1,189 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Writes samples to a file while they come in, so that a long capture runs in bounded memory
+# and a crash or power cut loses at most the last flush_interval seconds. Samples are
+# collected in chunks of chunk_rows rows, a background thread writes them out every
+# flush_interval seconds. The file format goes by the file name:
+#   .npy  NumPy array of shape (rows, columns) of float64, np.load() reads it. The header is
+#         updated after the rows are written, so the file is valid at any time.
+#   else  CSV with an index column and a header line e.g.
+#           ,t,z,r
+#           0,0.012345,-9811,9812
+# Column names, row count and any metadata given are kept next to it in <file>.json. Use
+# set_metadata() to add to them while capturing.
+import os
+import json
+import time
+import struct
+import threading
+from collections import deque
+
+import numpy as np
+
+from plezmo_backend import Logger
+
+logger = Logger()
+
+# Size of the .npy header, room for row counts of any capture
+NPY_HEADER_SIZE = 128
+
+def _npy_header(rows, columns):
+    header = "{{'descr': '<f8', 'fortran_order': False, 'shape': ({}, {}), }}".format(rows, columns)
+    header = header.ljust(NPY_HEADER_SIZE - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+class CaptureWriter:
+    # names are the column names, formats the CSV printf format of each column
+    def __init__(self, path, names, formats=None, chunk_rows=4096, flush_interval=1.0, metadata=None):
+        self.path = path
+        self.names = names
+        self.columns = len(names)
+        self.formats = formats if formats != None else ["%.9g"] * self.columns
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.binary = path.endswith(".npy")
+        self.metadata = {"columns": names, "format": "npy" if self.binary else "csv",
+                         "started": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        if metadata != None:
+            self.metadata.update(metadata)
+        # rows written to the file
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._chunk = np.empty((chunk_rows, self.columns), dtype=np.float64)
+        self._used = 0
+        # rows of the current chunk already written
+        self._written = 0
+        # full chunks not written completely yet, as (chunk, rows already written)
+        self._full = deque()
+        if self.binary:
+            self._file = open(path, "wb")
+            self._file.write(_npy_header(0, self.columns))
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+            self._file.write("," + ",".join(names) + "\n")
+        self._file.flush()
+        # exception that stopped the background writes, raised again by close()
+        self._error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # Add samples, one row or an array of shape (n, columns). Nothing is written here.
+    def append(self, rows):
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, self.columns)
+        with self._lock:
+            while len(rows) > 0:
+                n = min(len(rows), self.chunk_rows - self._used)
+                self._chunk[self._used:self._used + n] = rows[:n]
+                self._used += n
+                rows = rows[n:]
+                if self._used == self.chunk_rows:
+                    self._full.append((self._chunk, self._written))
+                    self._chunk = np.empty((self.chunk_rows, self.columns), dtype=np.float64)
+                    self._used = 0
+                    self._written = 0
+
+    # Set metadata key to value, it is written with the next flush
+    def set_metadata(self, key, value):
+        with self._lock:
+            self.metadata[key] = value
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+        except Exception as e:
+            logger.error("Writing {} failed, ex {}".format(self.path, e))
+            self._error = e
+
+    # Write all samples added so far and make sure they are on disk
+    def flush(self):
+        with self._io_lock:
+            if self._file == None:
+                return
+            with self._lock:
+                pieces = [chunk[start:] for chunk, start in self._full]
+                self._full.clear()
+                pieces.append(self._chunk[self._written:self._used])
+                self._written = self._used
+            # rows of these pieces are not changed by append() any more, no copy needed
+            for piece in pieces:
+                self._write(piece)
+            if self.binary:
+                # rows first, then the header counting them
+                self._file.seek(0)
+                self._file.write(_npy_header(self.rows, self.columns))
+                self._file.seek(0, os.SEEK_END)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._write_metadata()
+
+    def _write(self, rows):
+        if len(rows) == 0:
+            return
+        if self.binary:
+            self._file.write(rows.astype("<f8").tobytes())
+        else:
+            index = np.arange(self.rows, self.rows + len(rows))
+            np.savetxt(self._file, np.column_stack([index, rows]), fmt=["%d"] + self.formats, delimiter=",")
+        self.rows += len(rows)
+
+    def _write_metadata(self):
+        with self._lock:
+            self.metadata["rows"] = self.rows
+            metadata = dict(self.metadata)
+        tmp = self.path + ".json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp, self.path + ".json")
+
+    # Write the rest and close the file. An exception that stopped the background writes is
+    # raised here, after writing what can be written.
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        try:
+            self.flush()
+        finally:
+            with self._io_lock:
+                if self._file != None:
+                    self._file.close()
+                    self._file = None
+        if self._error != None:
+            raise self._error
@@ -39,10 +39,7 @@
 import time
 import traceback
 
-from plezmo import *
-from plezmo.utils.logger import Logger
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_color import *
+from plezmo_backend import *
 
 import utils
 
@@ -57,79 +54,66 @@ def init(color_name):
     registerExceptionHandler(globalExceptionHandler)
     # Elements to connect
     elementList = [{"name" : color_name, "type": PlezmoElementType.COLOR}]
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         logger.error("Failed to connect to element, ex {}".format(e))
         #traceback.print_exc()
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 # Main logic of the program
 def main(color_name):
     # Init bluetooth communication
-    success = init(color_name)
-    if success != True:
+    session = init(color_name)
+    if session == None:
         # Bluetooth communication cannobe enabled, quit.
-        plezmoApi.close()
         logger.error("Could not connect to all the required elements")
         return
 
-    # Register event handlers
-    try:
-        # Event handler to call when color sensor detects GREEN color
-        Color.onColorChange(color_name, green_handler, ColorSensorColor.GREEN)
-        # Event handler to call when color sensor detects RED color
-        Color.onColorChange(color_name, red_handler, ColorSensorColor.RED)
-        logger.info("Event handlers for color detection registered. Take the Color sensor in front of RED/GREEN color to see the event handlers working.")
-        time.sleep(10)
-        # Event handler to call when color sensor detects darkness
-        Color.onLightEvent(color_name, darkness_handler, ColorSensorLightState.DARK)
-        # Event handler to call when color sensor detects brightness
-        Color.onLightEvent(color_name, brightness_handler, ColorSensorLightState.BRIGHT)
-        logger.info("Event handlers darkness/brightness detection registered. Take the Color sensor to dark/bright locations to see the event handlers working.")
-        time.sleep(10)
-
-        comp = Color.getLightValueLux(color_name)
-        logger.info("Light lux value is {}".format(comp))
-        comp = Color.getLightComponentValueInLux(color_name, LightComponent.GREEN)
-        logger.info("Green component is {}".format(comp))
-        light = Color.getLightValuePercent(color_name)
-        logger.info("Detected light value in percent is {}".format(light))
-        logger.info("Checking getColor() functionality. Keep the color sensor facing any basic color")
-        time.sleep(5)
-        color = Color.getColor(color_name)
-        logger.info("Detected color is {}".format(color))
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        # Register event handlers
+        try:
+            # Event handler to call when color sensor detects GREEN color
+            Color.onColorChange(color_name, green_handler, ColorSensorColor.GREEN)
+            # Event handler to call when color sensor detects RED color
+            Color.onColorChange(color_name, red_handler, ColorSensorColor.RED)
+            logger.info("Event handlers for color detection registered. Take the Color sensor in front of RED/GREEN color to see the event handlers working.")
+            time.sleep(10)
+            # Event handler to call when color sensor detects darkness
+            Color.onLightEvent(color_name, darkness_handler, ColorSensorLightState.DARK)
+            # Event handler to call when color sensor detects brightness
+            Color.onLightEvent(color_name, brightness_handler, ColorSensorLightState.BRIGHT)
+            logger.info("Event handlers darkness/brightness detection registered. Take the Color sensor to dark/bright locations to see the event handlers working.")
+            time.sleep(10)
+
+            comp = Color.getLightValueLux(color_name)
+            logger.info("Light lux value is {}".format(comp))
+            comp = Color.getLightComponentValueInLux(color_name, LightComponent.GREEN)
+            logger.info("Green component is {}".format(comp))
+            light = Color.getLightValuePercent(color_name)
+            logger.info("Detected light value in percent is {}".format(light))
+            logger.info("Checking getColor() functionality. Keep the color sensor facing any basic color")
+            time.sleep(5)
+            color = Color.getColor(color_name)
+            logger.info("Detected color is {}".format(color))
         
 
-        logger.info("Waiting for color change, change color in front of color element to different colors")
-        Color.waitForColorChange(color_name)
-        logger.info("Color changed")
-        logger.info("Waiting for color to change to RED. Bring RED color in front of color element.")
-        Color.waitForColorToChangeTo(color_name, ColorSensorColor.RED)
-        logger.info("Color changed to RED")
-        time.sleep(5)
-        logger.info("Waiting for DARK. Take color element to dark location.")
-        Color.waitForLightEvent(color_name, ColorSensorLightState.DARK)
-        logger.info("It is dark")
-        time.sleep(2)
-    except Exception as e:
-        logger.error("Failed to run Color commands {}, ex {}".format(color_name, e))
-        #traceback.print_exc()
-    finally:
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(color_name)
-        time.sleep(1)
-        plezmoApi.close()
+            logger.info("Waiting for color change, change color in front of color element to different colors")
+            Color.waitForColorChange(color_name)
+            logger.info("Color changed")
+            logger.info("Waiting for color to change to RED. Bring RED color in front of color element.")
+            Color.waitForColorToChangeTo(color_name, ColorSensorColor.RED)
+            logger.info("Color changed to RED")
+            time.sleep(5)
+            logger.info("Waiting for DARK. Take color element to dark location.")
+            Color.waitForLightEvent(color_name, ColorSensorLightState.DARK)
+            logger.info("It is dark")
+            time.sleep(2)
+        except Exception as e:
+            logger.error("Failed to run Color commands {}, ex {}".format(color_name, e))
+            #traceback.print_exc()
 
 # Event handler whenever color sensor detects GREEN color
 @PlezmoEventHandler
@@ -153,8 +137,9 @@ def brightness_handler():
 
 # Program starts here
 if __name__ == "__main__":
+    utils.handle_options("python color_example.py <Color element name>")
     color_name = utils.extract_element_name()
     if color_name == None:
         logger.error("Color element name is mandatory, e.g. # python color_example.py Color")
-    else:
+    elif not utils.dry_run([color_name]):
         main(color_name)
\ No newline at end of file
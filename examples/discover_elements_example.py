@@ -34,11 +34,12 @@
 # IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
-import time
+import sys
 import traceback
 
-from plezmo import *
-from plezmo.utils.logger import Logger
+from plezmo_backend import *
+
+import utils
 
 logger = Logger()
 
@@ -51,22 +52,41 @@ def init():
     registerExceptionHandler(globalExceptionHandler)
 
 # Main logic of the program
-def main():
+def main(wanted):
     # Init bluetooth communication
     init()
-    elementList = plezmoApi.getDiscoveredElements(5)
-    #logger.info("Got elements {}".format(elementList))
+    if len(wanted) > 0:
+        # Scanning stops as soon as all the named elements are seen, they are connected right away
+        latencies = utils.discover_and_connect(wanted, 5)
+        logger.info("connected elements {}".format(plezmoApi.getConnectedElements()))
+        logger.info("connect latencies {}".format(latencies))
+        utils.disconnect_all([e["name"] for e in wanted])
+        plezmoApi.close()
+        return
+    # Discovery runs for 5 seconds, elements are reported as soon as they are seen
+    elementList = []
+    for e in utils.discover_elements(5):
+        logger.info("Found element {}".format(e))
+        elementList.append(e)
     if elementList != None and len(elementList) > 0:
+        # remember MAC addresses so that later runs can connect to these elements without scanning
+        utils.remember_discovered(elementList)
         e = elementList[0]
         logger.info("connecting to first element {}".format(e))
         plezmoApi.connectByMac(e["mac"], e["type"])
         connected_elements = plezmoApi.getConnectedElements()
         logger.info("connected elements {}".format(connected_elements))
-        plezmoApi.disconnect(e["name"])
-        time.sleep(1)
+        # disconnect and wait till the element is actually disconnected
+        utils.disconnect_all([e["name"]])
     plezmoApi.close()
 
 # Program starts here
 if __name__ == "__main__":
-    main()
-    quit()
\ No newline at end of file
+    utils.handle_options("python discover_elements_example.py [name:TYPE ...]")
+    wanted = utils.extract_elements(sys.argv[1:])
+    if wanted == None:
+        logger.error("Elements are given as name:TYPE, e.g. # python discover_elements_example.py Motion:MOTION Light:LIGHT")
+        quit()
+    if not utils.dry_run([e["name"] for e in wanted]):
+        main(utils.resolve_elements(wanted))
+    quit()
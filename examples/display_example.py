@@ -40,11 +40,7 @@
 import time
 import traceback
 
-from plezmo import *
-from plezmo.utils.logger import Logger
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_display import *
-from plezmo.elements.plezmo_element import *
+from plezmo_backend import *
 
 import utils
 
@@ -59,75 +55,63 @@ def init(display_name):
     registerExceptionHandler(globalExceptionHandler)
     # Elements to connect
     elementList = [{"name" : display_name, "type": PlezmoElementType.DISPLAY}]
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         logger.error("Failed to connect to element, ex {}".format(e))
         #traceback.print_exc()
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 # Main logic of the program
 def main(display_name):
     # Init bluetooth communication
-    success = init(display_name)
-    if success != True:
+    session = init(display_name)
+    if session == None:
         # Bluetooth communication cannobe enabled, quit.
-        plezmoApi.close()
         logger.error("Could not connect to all the required elements")
         return
 
-    # Register event handlers and call methods of display sensor
-    try:
-        # show INBOX image on display
-        logger.info("Showing INBOX image")
-        Display.showImage(display_name, DisplayImage.INBOX)
-        time.sleep(5)
-        # clear display
-        logger.info("Clearing display")
-        Display.clearDisplay(display_name)
-        time.sleep(2)
-        # Show text on display
-        logger.info("Showing text on display line 2 and alignment center")
-        Display.showText(display_name, DisplayLine.TWO, TextAlignment.CENTER, "Hola!")
-        time.sleep(5)
-        # clear display
-        logger.info("Clearing display")
-        Display.clearDisplay(display_name)
-        time.sleep(2)
-        # set font size, text color
-        Display.setFontSize(display_name, FontSize.MEDIUM)
-        Display.setTextColor(display_name, DisplayBackground.RED)
-        logger.info("Set font size to MEDIUM, text color to RED")
-        Display.showText(display_name, DisplayLine.TWO, TextAlignment.CENTER, "RED!")
-        time.sleep(5)
-        # Set display background color
-        logger.info("Painting background color to BLUE")
-        Display.paintBackgroundColor(display_name, DisplayBackground.BLUE)
-        time.sleep(5)
-    except Exception as e:
-        logger.error("Failed to run display commands {}, ex {}".format(display_name, e))
-        #traceback.print_exc()
-    finally:
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(display_name)
-        time.sleep(1)
-        plezmoApi.close()
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        # Register event handlers and call methods of display sensor
+        try:
+            # show INBOX image on display
+            logger.info("Showing INBOX image")
+            Display.showImage(display_name, DisplayImage.INBOX)
+            time.sleep(5)
+            # clear display
+            logger.info("Clearing display")
+            Display.clearDisplay(display_name)
+            time.sleep(2)
+            # Show text on display
+            logger.info("Showing text on display line 2 and alignment center")
+            Display.showText(display_name, DisplayLine.TWO, TextAlignment.CENTER, "Hola!")
+            time.sleep(5)
+            # clear display
+            logger.info("Clearing display")
+            Display.clearDisplay(display_name)
+            time.sleep(2)
+            # set font size, text color
+            Display.setFontSize(display_name, FontSize.MEDIUM)
+            Display.setTextColor(display_name, DisplayBackground.RED)
+            logger.info("Set font size to MEDIUM, text color to RED")
+            Display.showText(display_name, DisplayLine.TWO, TextAlignment.CENTER, "RED!")
+            time.sleep(5)
+            # Set display background color
+            logger.info("Painting background color to BLUE")
+            Display.paintBackgroundColor(display_name, DisplayBackground.BLUE)
+            time.sleep(5)
+        except Exception as e:
+            logger.error("Failed to run display commands {}, ex {}".format(display_name, e))
+            #traceback.print_exc()
 
 # Program starts here
 if __name__ == "__main__":
+    utils.handle_options("python display_example.py <Display element name>")
     display_name = utils.extract_element_name()
     if display_name == None:
         logger.error("Display element name is mandatory, e.g. # python display_example.py Display")
-    else:
+    elif not utils.dry_run([display_name]):
         main(display_name)
     quit()
\ No newline at end of file
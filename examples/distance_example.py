@@ -40,10 +40,7 @@
 import time
 import traceback
 
-from plezmo import *
-from plezmo.utils.logger import Logger
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_distance import *
+from plezmo_backend import *
 
 import utils
 
@@ -58,55 +55,42 @@ def init(distance_name):
     registerExceptionHandler(globalExceptionHandler)
     # Elements to connect
     elementList = [{"name" : distance_name, "type": PlezmoElementType.DISTANCE}]
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         logger.error("Failed to connect to element, ex {}".format(e))
         #traceback.print_exc()
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 # Main logic of the program
 def main(distance_name):
     # Init bluetooth communication
-    success = init(distance_name)
-    if success != True:
+    session = init(distance_name)
+    if session == None:
         # Bluetooth communication cannobe enabled, quit.
-        plezmoApi.close()
         logger.error("Could not connect to all the required elements")
         return
 
-    # Register event handlers
-    try:
-        # register event handlers for NEAR and FAR events
-        Distance.onDistanceEvent(distance_name, near_handler, DistanceEvent.NEAR)
-        Distance.onDistanceEvent(distance_name, far_handler, DistanceEvent.FAR)
-        logger.info("Waiting 10 seconds to test NEAR/FAR events. Take any object near distance sensor and try moving it away.")
-        time.sleep(10)
-        # get distance detected by the sensor
-        d = Distance.getDistanceCM(distance_name)
-        logger.info("Got detected distance {}".format(d))
-        # wait for distance event
-        logger.info("Waiting for NEAR event, take any object near distance sensor")
-        Distance.waitForDistanceEvent(distance_name, DistanceEvent.NEAR)
-        logger.info("Got NEAR event after wait for")
-    except Exception as e:
-        logger.error("Failed to run distance commands {}, ex {}".format(distance_name, e))
-        #traceback.print_exc()
-    finally:
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(distance_name)
-        time.sleep(1)
-        plezmoApi.close()
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        # Register event handlers
+        try:
+            # register event handlers for NEAR and FAR events
+            Distance.onDistanceEvent(distance_name, near_handler, DistanceEvent.NEAR)
+            Distance.onDistanceEvent(distance_name, far_handler, DistanceEvent.FAR)
+            logger.info("Waiting 10 seconds to test NEAR/FAR events. Take any object near distance sensor and try moving it away.")
+            time.sleep(10)
+            # get distance detected by the sensor
+            d = Distance.getDistanceCM(distance_name)
+            logger.info("Got detected distance {}".format(d))
+            # wait for distance event
+            logger.info("Waiting for NEAR event, take any object near distance sensor")
+            Distance.waitForDistanceEvent(distance_name, DistanceEvent.NEAR)
+            logger.info("Got NEAR event after wait for")
+        except Exception as e:
+            logger.error("Failed to run distance commands {}, ex {}".format(distance_name, e))
+            #traceback.print_exc()
 
 @PlezmoEventHandler
 def near_handler():
@@ -118,8 +102,9 @@ def far_handler():
 
 # Program starts here
 if __name__ == "__main__":
+    utils.handle_options("python distance_example.py <Distance element name>")
     distance_name = utils.extract_element_name()
     if distance_name == None:
         logger.error("Distance element name is mandatory, e.g. # python distance_example.py Distance")
-    else:
+    elif not utils.dry_run([distance_name]):
         main(distance_name)
\ No newline at end of file
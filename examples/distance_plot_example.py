@@ -37,56 +37,193 @@
 
 # Elements needed: 1 distance sensor
 # Python packages: matplotlib
-# Captures distance observed from distance sensor evenry two seconds for 5 times and plots it using matplotlib
-
-import matplotlib.pyplot as plt
-import time
-
-from plezmo import *
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.utils.logger import Logger
+# Captures distance observed from distance sensor every two seconds for 5 times and plots it using matplotlib
+# The interval and how long to capture can be given, e.g. every 0.2 seconds for a minute
+#   python distance_plot_example.py Distance --interval 0.2 --duration 60
+# Readings are taken at fixed times (see sampling.PeriodicSampler) and plotted against the time
+# they were actually taken. With --adaptive the distance is read up to --max-rate times a second
+# while it changes by the given CM or more, and backs off to once every --interval seconds while
+# it does not (see sampling.AdaptiveSampler), e.g.
+#   python distance_plot_example.py Distance --interval 2 --max-rate 10 --adaptive 3 --duration 300
+# With --live the plot is updated while readings are taken and shows the latest --window readings,
+# capturing until the plot window is closed unless --count or --duration is given. --out FILE
+# writes every reading to FILE (.csv or .npy, see capture.CaptureWriter) while capturing, so
+# memory stays the same over captures of hours, e.g.
+#   python distance_plot_example.py Distance --live --interval 1 --adaptive 5 --out occupancy.csv
+
+import argparse
+import threading
+from collections import deque
+
+from plezmo_backend import *
 
 import utils
+import sampling
 
 logger = Logger()
 
-def main(distance_name):
+def main(distance_name, interval, count, duration, threshold=None, max_rate=None, live=False, window=600, out_file=None):
+    # Capture file is opened first, so that a bad --out fails before connecting
+    writer = None
+    if out_file != None:
+        # capture uses numpy, which takes a while to import, so it is imported only here
+        import capture
+        try:
+            writer = capture.CaptureWriter(out_file, ["t", "distance"], ["%.3f", "%d"],
+                                           metadata={"element": distance_name, "unit": "cm"})
+        except Exception as e:
+            logger.error("Failed to open {}, ex {}".format(out_file, e))
+            return
     try:
-        plezmoApi.connect(distance_name, PlezmoElementType.DISTANCE)
-    except:
-        logger.error("Failed to connect to element")
-        quit()
+        session = utils.ElementSession([{"name": distance_name, "type": PlezmoElementType.DISTANCE}]).connect()
+    except Exception as e:
+        logger.error("Failed to connect to element, ex {}".format(e))
+        if writer != None:
+            writer.close()
+        return
 
+    logger.info("Move the distance element closer/away from any surface to record different distances. These values will be plotted using matplotlib.")
+    # Capture distance value every interval seconds
+    read = lambda: Distance.getDistanceCM(distance_name)
+    if threshold == None:
+        sampler = sampling.PeriodicSampler(read, interval, duration, count)
+    else:
+        sampler = sampling.AdaptiveSampler(read, 1 / interval, max_rate, threshold, duration, count)
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        try:
+            if live:
+                plot_live(sampler, window, writer)
+            else:
+                xdata, ydata = take_readings(sampler, writer)
+        finally:
+            summary = sampler.summary()
+            logger.info("{} readings at {:.2f} per second ({:.2f} asked), {} overruns, reads took {:.1f} ms on average".format(
+                summary["samples"], summary["achieved_rate"], summary["rate"], summary["overruns"], summary["mean_read_ms"]))
+            if threshold != None:
+                logger.info("{} changes of {} CM or more, {} reads fewer than at {} per second".format(
+                    summary["changes"], threshold, summary["saved"], max_rate))
+            if writer != None:
+                writer.set_metadata("sampling", summary)
+                try:
+                    writer.close()
+                    logger.info("Wrote {} readings to {}".format(writer.rows, out_file))
+                except Exception as e:
+                    logger.error("Failed to write {}, ex {}".format(out_file, e))
+
+    if not live:
+        # Plot the data, matplotlib takes a while to import so it is imported only here
+        import matplotlib.pyplot as plt
+        plt.plot(xdata, ydata)
+        plt.ylabel('Distance in CM')
+        plt.xlabel('Time in seconds')
+        plt.show()
+
+# Take all readings, returns their times and distances
+def take_readings(sampler, writer):
     ydata = []
     xdata = []
-
-    # Number of intervals for which distance value is captured
-    INTERVALS = 5
-    t = 0
-    logger.info("Move the distance element closer/away from any surface to record different distances. These values will be plotted using matplotlib.")
-    # Capture distance value every 2 seconds
-    for x in range(0, INTERVALS):
-        d = Distance.getDistanceCM(distance_name)
-        logger.info("Got distance {}".format(d))
-        ydata.append(d)
-        xdata.append(t)
-        t += 2
-        time.sleep(2)
-
-    # Disconnect elements and close. Don't forget this for proper deinit.
-    plezmoApi.disconnect(distance_name)
-    plezmoApi.close()
-
-    # Plot the data
-    plt.plot(xdata, ydata)
-    plt.ylabel('Distance in CM')
-    plt.xlabel('Time in seconds')
-    plt.show()
+    try:
+        for t, d in sampler:
+            logger.info("Got distance {} at {:.3f} s".format(d, t))
+            ydata.append(d)
+            xdata.append(t)
+            if writer != None:
+                writer.append((t, d))
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+    return xdata, ydata
+
+# Plot readings while they are taken. Only the latest window readings are kept for the plot,
+# so memory stays the same however long it runs, readings to keep go to the writer. Readings
+# are taken in a thread of their own and handed over to the plot through a deque. Closing
+# the plot window stops the capture.
+def plot_live(sampler, window, writer):
+    import matplotlib.pyplot as plt
+    import acceleration
+    import live_chart
+
+    readings = acceleration.RingBuffer(window, 2)
+    pending = deque()
+
+    def take_readings():
+        try:
+            for t, d in sampler:
+                logger.debug("Got distance {} at {:.3f} s".format(d, t))
+                pending.append((t, d))
+                if writer != None:
+                    writer.append((t, d))
+        except Exception as e:
+            logger.error("Failed to read distance, ex {}".format(e))
+    thread = threading.Thread(target=take_readings, daemon=True)
+
+    fig, ax = plt.subplots()
+    line, = ax.plot([], [], 'b.-', linewidth=1, markersize=3)
+    ax.set_title('Distance')
+    ax.set_ylabel('Distance in CM')
+    ax.set_xlabel('Time in seconds')
+    status = ax.text(0.01, 0.98, 'Waiting for readings', transform=ax.transAxes, va='top', fontsize=9)
+    x_scaler = live_chart.AxisScaler(ax.get_xlim, ax.set_xlim, margin=0.25)
+    y_scaler = live_chart.AxisScaler(ax.get_ylim, ax.set_ylim)
+    renderer = live_chart.BlitRenderer(fig, [line, status])
+
+    def refresh():
+        rows = [pending.popleft() for _ in range(len(pending))]
+        if len(rows) == 0:
+            if not thread.is_alive() and readings.total > 0:
+                status.set_text('Done, {} readings'.format(readings.total))
+                renderer.draw()
+            return
+        readings.extend(rows)
+        t, d = readings.view()
+        line.set_data(t, d)
+        status.set_text('{:.0f} cm at {:.1f} s, {} readings{}'.format(
+            d[-1], t[-1], readings.total, ', last {} shown'.format(len(t)) if readings.total > len(t) else ''))
+        rescaled = x_scaler.update(t[0], t[-1])
+        rescaled = y_scaler.update(d.min(), d.max()) or rescaled
+        renderer.draw(full=rescaled)
+
+    thread.start()
+    # Readings come in a few times a second at most, 20 frames a second is plenty
+    renderer.start(refresh, 20)
+    try:
+        plt.show()
+    finally:
+        renderer.stop()
+        sampler.stop()
+        thread.join()
+
+# Element name and sampling options from the arguments
+def extract_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("distance", nargs="?")
+    parser.add_argument("--interval", type=float, default=2)
+    parser.add_argument("--count", type=int)
+    parser.add_argument("--duration", type=float)
+    parser.add_argument("--adaptive", type=float, metavar="CM")
+    parser.add_argument("--max-rate", type=float, default=10)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--window", type=int, default=600)
+    parser.add_argument("--out")
+    options = parser.parse_args()
+    if options.count == None and options.duration == None and not options.live:
+        # Number of intervals for which distance value is captured
+        options.count = 5
+    return options
 
 # Program starts here
 if __name__ == "__main__":
-    distance_name = utils.extract_element_name()
-    if distance_name == None:
+    utils.handle_options("python distance_plot_example.py <Distance element name> [--interval SECS] [--count N] [--duration SECS]"
+                         " [--adaptive CM [--max-rate RATE]] [--live [--window N]] [--out FILE]")
+    options = extract_options()
+    if options.distance == None:
         logger.error("Distance element name is mandatory, e.g. # python distance_plot_example.py Distance")
-    else:
-        main(distance_name)
\ No newline at end of file
+    elif options.interval <= 0:
+        logger.error("--interval must be more than 0")
+    elif options.adaptive != None and options.max_rate < 1 / options.interval:
+        logger.error("--max-rate must be at least once every --interval")
+    elif options.window < 2:
+        logger.error("--window must be at least 2")
+    elif not utils.dry_run([options.distance]):
+        main(options.distance, options.interval, options.count, options.duration, options.adaptive, options.max_rate,
+             options.live, options.window, options.out)
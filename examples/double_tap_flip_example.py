@@ -42,11 +42,7 @@
 import time
 import traceback
 
-from plezmo import *
-from plezmo.utils.logger import Logger
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_light import *
-from plezmo.elements.plezmo_element import *
+from plezmo_backend import *
 
 import utils
 
@@ -63,57 +59,45 @@ def init(light_name):
     registerExceptionHandler(globalExceptionHandler)
     # Elements to connect
     elementList = [{"name" : light_name, "type": PlezmoElementType.LIGHT}]
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         logger.error("Failed to connect to element, ex {}".format(e))
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 # Main logic of the program
 def main(light_name):
     # Init bluetooth communication
-    success = init(light_name)
-    if success != True:
+    session = init(light_name)
+    if session == None:
         # Bluetooth communication cannobe enabled, quit.
-        plezmoApi.close()
         logger.error("Could not connect to all the required elements")
         return
 
-    # Register event handlers and call methods of display sensor
-    try:
-        # setup double tap and flip event handlers
-        Display.onDoubleTap(light_name, double_tap_handler)
-        Display.onFlipEvent(light_name, flip_up_handler, Flip.UP)
-        Display.onFlipEvent(light_name, flip_down_handler, Flip.DOWN)
-        logger.info("Registered double tap and flip event handlers.")
-        logger.info("Flip the element DOWN to turn the light off.")
-        logger.info("Flip the element UP to turn the light off.")
-        logger.info("Double tap on the element to see the colors change.")
-        logger.info("Press control-c to stop the program...")
-        # turn the light on by default
-        Light.turnOn(light_name, LightColor("#FF0000"), Percentage(100))
-
-        # start an infinite loop so that the program runs forever
-        while True:
-            time.sleep(1000)
-    except Exception as e:
-        logger.error("Failed to run display commands {}, ex {}".format(light_name, e))
-        #traceback.print_exc()
-    finally:
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(light_name)
-        time.sleep(1)
-        plezmoApi.close()
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        # Register event handlers and call methods of display sensor
+        try:
+            # Supervisor reconnects the element if it goes out of range and registers the handlers again
+            supervisor = utils.ElementSupervisor(session.elementList)
+            # setup double tap and flip event handlers
+            supervisor.register(Display.onDoubleTap, light_name, double_tap_handler)
+            supervisor.register(Display.onFlipEvent, light_name, flip_up_handler, Flip.UP)
+            supervisor.register(Display.onFlipEvent, light_name, flip_down_handler, Flip.DOWN)
+            logger.info("Registered double tap and flip event handlers.")
+            logger.info("Flip the element DOWN to turn the light off.")
+            logger.info("Flip the element UP to turn the light off.")
+            logger.info("Double tap on the element to see the colors change.")
+            logger.info("Press control-c to stop the program...")
+            # turn the light on by default
+            Light.turnOn(light_name, LightColor("#FF0000"), Percentage(100))
+
+            # run forever, keeping the element connected
+            supervisor.run_forever()
+        except Exception as e:
+            logger.error("Failed to run display commands {}, ex {}".format(light_name, e))
+            #traceback.print_exc()
 
 @PlezmoEventHandler
 def double_tap_handler():
@@ -149,9 +133,10 @@ def flip_down_handler():
 
 # Program starts here
 if __name__ == "__main__":
+    utils.handle_options("python double_tap_flip_example.py <element name>")
     light_name = utils.extract_element_name()
     if light_name == None:
         logger.error("Display element name is mandatory, e.g. # python double_tap_flip_example.py Display")
-    else:
+    elif not utils.dry_run([light_name]):
         main(light_name)
     quit()
\ No newline at end of file
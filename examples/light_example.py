@@ -39,10 +39,7 @@
 import time
 import traceback
 
-from plezmo import *
-from plezmo.utils.logger import Logger
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_light import *
+from plezmo_backend import *
 
 import utils
 
@@ -57,79 +54,67 @@ def init(light_name):
     registerExceptionHandler(globalExceptionHandler)
     # Elements to connect
     elementList = [{"name" : light_name, "type": PlezmoElementType.LIGHT}]
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         logger.error("Failed to connect to element, ex {}".format(e))
         #traceback.print_exc()
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 # Main logic of the program
 def main(light_name):
     # Init bluetooth communication
-    success = init(light_name)
-    if success != True:
+    session = init(light_name)
+    if session == None:
         # Bluetooth communication cannobe enabled, quit.
-        plezmoApi.close()
         logger.error("Could not connect to all the required elements")
         return
 
-    # Register event handlers
-    try:
-        # turn light ON
-        logger.info("Turning on light in red color and 100 percent brightness")
-        Light.turnOn(light_name, LightColor("#FF0000"), Percentage(100))
-        time.sleep(5)
-        # turn light OFF
-        logger.info("Turning light off")
-        Light.setState(light_name, LightState.OFF)
-        time.sleep(2)
-        # set light color, brightness and turn it on
-        logger.info("Set color to blue, brightness to 10, and turning light on")
-        Light.setColor(light_name, LightColor("#0000FF"))
-        Light.setBrightness(light_name, Percentage(10))
-        Light.setState(light_name, LightState.ON)
-        time.sleep(5)
-        logger.info("Fading in light with 100 percent brightness, red color.")
-        # Fade in
-        Light.fadeIn(light_name, Percentage(100), LightColor("#FF0000"), LightFadeSpeed.FAST)
-        time.sleep(2)
-        # Fade out
-        logger.info("Fading out the light slowly")
-        Light.fadeOut(light_name, LightFadeSpeed.SLOW)
-        time.sleep(2)
-        # Get brightness detected
-        b = Light.getBrightness(light_name)
-        logger.info("Brightness {}".format(b))
-        # Get color detected
-        c = Light.getColor(light_name)
-        logger.info("Color {}".format(c))
-        # Get state (ON/OFF)
-        s = Light.getState(light_name)
-        logger.info("State {}".format(s))
-    except Exception as e:
-        logger.error("Failed to run Light commands {}, ex {}".format(light_name, e))
-        #traceback.print_exc()
-    finally:
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(light_name)
-        time.sleep(1)
-        plezmoApi.close()
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        # Register event handlers
+        try:
+            # turn light ON
+            logger.info("Turning on light in red color and 100 percent brightness")
+            Light.turnOn(light_name, LightColor("#FF0000"), Percentage(100))
+            time.sleep(5)
+            # turn light OFF
+            logger.info("Turning light off")
+            Light.setState(light_name, LightState.OFF)
+            time.sleep(2)
+            # set light color, brightness and turn it on
+            logger.info("Set color to blue, brightness to 10, and turning light on")
+            Light.setColor(light_name, LightColor("#0000FF"))
+            Light.setBrightness(light_name, Percentage(10))
+            Light.setState(light_name, LightState.ON)
+            time.sleep(5)
+            logger.info("Fading in light with 100 percent brightness, red color.")
+            # Fade in
+            Light.fadeIn(light_name, Percentage(100), LightColor("#FF0000"), LightFadeSpeed.FAST)
+            time.sleep(2)
+            # Fade out
+            logger.info("Fading out the light slowly")
+            Light.fadeOut(light_name, LightFadeSpeed.SLOW)
+            time.sleep(2)
+            # Get brightness detected
+            b = Light.getBrightness(light_name)
+            logger.info("Brightness {}".format(b))
+            # Get color detected
+            c = Light.getColor(light_name)
+            logger.info("Color {}".format(c))
+            # Get state (ON/OFF)
+            s = Light.getState(light_name)
+            logger.info("State {}".format(s))
+        except Exception as e:
+            logger.error("Failed to run Light commands {}, ex {}".format(light_name, e))
+            #traceback.print_exc()
 
 # Program starts here
 if __name__ == "__main__":
+    utils.handle_options("python light_example.py <Light element name>")
     light_name = utils.extract_element_name()
     if light_name == None:
         logger.error("Light element name is mandatory, e.g. # python light_example.py Light")
-    else:
+    elif not utils.dry_run([light_name]):
         main(light_name)
\ No newline at end of file
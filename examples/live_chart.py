@@ -0,0 +1,109 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Cheap redrawing of live matplotlib charts (see raw_acceleration_chart.py). With blitting
+# only the changing artists (lines, texts) are drawn again over a saved background on each
+# frame. The whole figure is drawn again only when axes limits change, and limits are
+# changed only when the data goes out of them or shrinks well inside them.
+
+# Keeps one axis of a chart around its data, e.g. AxisScaler(ax.get_ylim, ax.set_ylim).
+# Limits are set to the data range plus margin (fraction of the range) on both sides, and
+# changed again only when data goes out of them or the data range becomes less than
+# shrink (fraction) of them. With pad_low=False there is no margin below the data, for
+# axes that start at a fixed value e.g. elapsed time or counts.
+class AxisScaler:
+    def __init__(self, get_limits, set_limits, margin=0.1, shrink=0.5, pad_low=True):
+        self.get_limits = get_limits
+        self.set_limits = set_limits
+        self.margin = margin
+        self.shrink = shrink
+        self.pad_low = pad_low
+
+    # Returns True if the limits were changed
+    def update(self, low, high):
+        current_low, current_high = self.get_limits()
+        span = current_high - current_low
+        if low >= current_low and high <= current_high and high - low >= self.shrink * span:
+            return False
+        pad = max(high - low, abs(high) * 1e-3, 1e-6) * self.margin
+        self.set_limits(low - pad if self.pad_low else low, high + pad)
+        return True
+
+# Draws artists of fig on each frame, with blitting if blit is True and the canvas can do it
+class BlitRenderer:
+    def __init__(self, fig, artists, blit=True):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.artists = artists
+        self.blit = blit and getattr(self.canvas, "supports_blit", False)
+        self._background = None
+        self._timer = None
+        if self.blit:
+            # animated artists are left out of full draws and drawn by us
+            for a in artists:
+                a.set_animated(True)
+            self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for a in self.artists:
+            self.fig.draw_artist(a)
+
+    # Show the current state of the artists. full=True draws the whole figure, needed after
+    # anything but the artists changed e.g. axes limits.
+    def draw(self, full=False):
+        if not self.blit or full or self._background == None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_artists()
+        self.canvas.blit(self.fig.bbox)
+
+    # Call func on each frame, at most max_fps times a second. There is no point drawing
+    # more often than the display refreshes.
+    def start(self, func, max_fps=60):
+        self._timer = self.canvas.new_timer(interval=max(1, int(1000 / max_fps)))
+        self._timer.add_callback(func)
+        self._timer.start()
+
+    def stop(self):
+        if self._timer != None:
+            self._timer.stop()
+            self._timer = None
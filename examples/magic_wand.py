@@ -39,14 +39,9 @@
 # to create magic wand and lamp using story kits. Place the motion sensor in the wand and light in element
 # in the lamp as indicated and start the example.
 import sys
-import time
 import traceback
 
-from plezmo import *
-from plezmo.utils.logger import Logger
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_motion import *
-from plezmo.elements.plezmo_light import *
+from plezmo_backend import *
 
 import utils
 
@@ -65,60 +60,47 @@ def init(element_names):
     elementList = [{"name" : element_names["motion"], "type": PlezmoElementType.MOTION},
     {"name": element_names["light"], "type": PlezmoElementType.LIGHT}]
 
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         logger.error("Failed to connect to element, ex {}".format(e))
         #traceback.print_exc()
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 # Main logic of the program
 def main(element_names):
     global light_name
     # Init bluetooth communication
-    success = init(element_names)
-    if success != True:
+    session = init(element_names)
+    if session == None:
         # Bluetooth communication cannobe enabled, quit.
-        plezmoApi.close()
         logger.error("Could not connect to all the required elements")
         return
 
     motion_name = element_names["motion"]
     light_name = element_names["light"]
-    # Register event handlers
-    try:
-        # set event handlers for left/right/front/back/flat tilt
-        Motion.onTilt(motion_name, lelf_tilt_handler, Tilt.LEFT)
-        Motion.onTilt(motion_name, right_tilt_handler, Tilt.RIGHT)
-        Motion.onTilt(motion_name, front_tilt_handler, Tilt.FRONT)
-        Motion.onTilt(motion_name, back_tilt_handler, Tilt.BACK)
-        Motion.onFlat(motion_name, flat_handler)
-        logger.info("Registered event handlers for BACK/FRONT/LEFT/RIGHT/FLAT tilts.")
-        logger.info("Tilt the motion element in different directions to see the light element changes.")
-        logger.info("Press control-c to stop the program...")
-
-        # start an infinite loop so that the program runs forever
-        while True:
-            time.sleep(1000)
-
-    finally:
-        logger.info("Stopping the program...")
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(motion_name)
-        time.sleep(1)
-        plezmoApi.disconnect(light_name)
-        time.sleep(1)
-        plezmoApi.close()
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        # Register event handlers
+        try:
+            # Supervisor reconnects elements that go out of range and registers the handlers again
+            supervisor = utils.ElementSupervisor(session.elementList)
+            # set event handlers for left/right/front/back/flat tilt
+            supervisor.register(Motion.onTilt, motion_name, lelf_tilt_handler, Tilt.LEFT)
+            supervisor.register(Motion.onTilt, motion_name, right_tilt_handler, Tilt.RIGHT)
+            supervisor.register(Motion.onTilt, motion_name, front_tilt_handler, Tilt.FRONT)
+            supervisor.register(Motion.onTilt, motion_name, back_tilt_handler, Tilt.BACK)
+            supervisor.register(Motion.onFlat, motion_name, flat_handler)
+            logger.info("Registered event handlers for BACK/FRONT/LEFT/RIGHT/FLAT tilts.")
+            logger.info("Tilt the motion element in different directions to see the light element changes.")
+            logger.info("Press control-c to stop the program...")
+
+            # run forever, keeping the elements connected
+            supervisor.run_forever()
+
+        finally:
+            logger.info("Stopping the program...")
 
 @PlezmoEventHandler
 def lelf_tilt_handler():
@@ -157,8 +139,9 @@ def extract_element_names():
 
 # Program starts here
 if __name__ == "__main__":
+    utils.handle_options("python magic_wand.py <Motion element name> <Light element name>")
     element_names = extract_element_names()
     if element_names == None:
         logger.error("Motion and light element name is mandatory, e.g. # python magic_wand.py Motion Light")
-    else:
+    elif not utils.dry_run(list(element_names.values())):
         main(element_names)
\ No newline at end of file
@@ -39,10 +39,7 @@
 import time
 import traceback
 
-from plezmo import *
-from plezmo.utils.logger import Logger
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_motion import *
+from plezmo_backend import *
 
 import utils
 
@@ -57,89 +54,76 @@ def init(motion_name):
     registerExceptionHandler(globalExceptionHandler)
     # Elements to connect
     elementList = [{"name" : motion_name, "type": PlezmoElementType.MOTION}]
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         logger.error("Failed to connect to element, ex {}".format(e))
         #traceback.print_exc()
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 # Main logic of the program
 def main(motion_name):
     # Init bluetooth communication
-    success = init(motion_name)
-    if success != True:
+    session = init(motion_name)
+    if session == None:
         # Bluetooth communication cannobe enabled, quit.
-        plezmoApi.close()
         logger.error("Could not connect to all the required elements")
         return
 
-    # Register event handlers
-    try:
-        # set event handlers for left/right/front/back/flat tilt
-        Motion.onTilt(motion_name, l_tilt_handler, Tilt.LEFT)
-        Motion.onTilt(motion_name, r_tilt_handler, Tilt.RIGHT)
-        Motion.onTilt(motion_name, f_tilt_handler, Tilt.FRONT)
-        Motion.onTilt(motion_name, b_tilt_handler, Tilt.BACK)
-        Motion.onFlat(motion_name, flat_handler)
-        logger.info("Registered event handlers for BACK/FRONT/LEFT/RIGHT/FLAT tilts.")
-        logger.info("Tilt the motion element in different directions to see the event handlers working.")
-        time.sleep(20)
-
-        Motion.onMotion(motion_name, move_handler, Movement.START)
-        Motion.onMotion(motion_name, stop_handler, Movement.STOP)
-        logger.info("Registered event handlers for START_MOVE/STOP_MOVE. Move the motion to see the event handlers working.")
-        time.sleep(20)
-        logger.info("Trying getAngle functionality. Tilt or move motion element to see the detected angle")
-        time.sleep(5)
-        for i in range(3):
-            # Get detected angle
-            logger.info("Please tilt the motion element...")
-            a1 = Motion.getAngle(motion_name, Axis.LEFT_TO_RIGHT)
-            logger.info("Angle for LEFT_TO_RIGHT axis is {}".format(a1))
-            a2 = Motion.getAngle(motion_name, Axis.FRONT_TO_BACK)
-            logger.info("Angle for FRONT_TO_BACK axis is {}".format(a2))
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        # Register event handlers
+        try:
+            # set event handlers for left/right/front/back/flat tilt
+            Motion.onTilt(motion_name, l_tilt_handler, Tilt.LEFT)
+            Motion.onTilt(motion_name, r_tilt_handler, Tilt.RIGHT)
+            Motion.onTilt(motion_name, f_tilt_handler, Tilt.FRONT)
+            Motion.onTilt(motion_name, b_tilt_handler, Tilt.BACK)
+            Motion.onFlat(motion_name, flat_handler)
+            logger.info("Registered event handlers for BACK/FRONT/LEFT/RIGHT/FLAT tilts.")
+            logger.info("Tilt the motion element in different directions to see the event handlers working.")
+            time.sleep(20)
+
+            Motion.onMotion(motion_name, move_handler, Movement.START)
+            Motion.onMotion(motion_name, stop_handler, Movement.STOP)
+            logger.info("Registered event handlers for START_MOVE/STOP_MOVE. Move the motion to see the event handlers working.")
+            time.sleep(20)
+            logger.info("Trying getAngle functionality. Tilt or move motion element to see the detected angle")
+            time.sleep(5)
+            for i in range(3):
+                # Get detected angle
+                logger.info("Please tilt the motion element...")
+                a1 = Motion.getAngle(motion_name, Axis.LEFT_TO_RIGHT)
+                logger.info("Angle for LEFT_TO_RIGHT axis is {}".format(a1))
+                a2 = Motion.getAngle(motion_name, Axis.FRONT_TO_BACK)
+                logger.info("Angle for FRONT_TO_BACK axis is {}".format(a2))
+                time.sleep(2)
+
+            # Get acceleration
+            try:
+                accl = Motion.getAccelerometerData(motion_name, Acceleration.X)
+                logger.info("Accelerometer data for X axis is {}. This will work only if motion element has 3.4 version.".format(accl))
+            except:
+                logger.error("getAccelerometerData failed. Make sure that motion element has version 3.4.")
+
+            logger.info("Waiting for BACK tilt event. Tilt the motion sensor back")
+            Motion.waitForTilt(motion_name, Tilt.BACK)
+            logger.info("Got tilt back wait event")
             time.sleep(2)
 
-        # Get acceleration
-        try:
-            accl = Motion.getAccelerometerData(motion_name, Acceleration.X)
-            logger.info("Accelerometer data for X axis is {}. This will work only if motion element has 3.4 version.".format(accl))
-        except:
-            logger.error("getAccelerometerData failed. Make sure that motion element has version 3.4.")
-
-        logger.info("Waiting for BACK tilt event. Tilt the motion sensor back")
-        Motion.waitForTilt(motion_name, Tilt.BACK)
-        logger.info("Got tilt back wait event")
-        time.sleep(2)
-
-        logger.info("Waiting for start movement event. Move the motion sensor")
-        Motion.waitForMotion(motion_name, Movement.START)
-        logger.info("Got start event")
-        time.sleep(2)
-
-        logger.info("Waiting for flat event. Make the motion sensor flat")
-        Motion.waitForFlat(motion_name)
-        logger.info("Got flat event")
-        time.sleep(2)
-    except Exception as e:
-        logger.error("Failed to run motion commands {}, ex {}".format(motion_name, e))
-        #traceback.print_exc()
-    finally:
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(motion_name)
-        time.sleep(1)
-        plezmoApi.close()
+            logger.info("Waiting for start movement event. Move the motion sensor")
+            Motion.waitForMotion(motion_name, Movement.START)
+            logger.info("Got start event")
+            time.sleep(2)
+
+            logger.info("Waiting for flat event. Make the motion sensor flat")
+            Motion.waitForFlat(motion_name)
+            logger.info("Got flat event")
+            time.sleep(2)
+        except Exception as e:
+            logger.error("Failed to run motion commands {}, ex {}".format(motion_name, e))
+            #traceback.print_exc()
 
 @PlezmoEventHandler
 def l_tilt_handler():
@@ -171,8 +155,9 @@ def stop_handler():
 
 # Program starts here
 if __name__ == "__main__":
+    utils.handle_options("python motion_example.py <Motion element name>")
     motion_name = utils.extract_element_name()
     if motion_name == None:
         logger.error("Motion element name is mandatory, e.g. # python motion_example.py Motion")
-    else:
+    elif not utils.dry_run([motion_name]):
         main(motion_name)
\ No newline at end of file
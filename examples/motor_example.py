@@ -39,11 +39,7 @@ import time
 import traceback
 import sys
 
-from plezmo import *
-from plezmo.utils.logger import Logger
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_motor import MotorDirection, MotorRotation, MotorSpeed
-from plezmo.elements.plezmo_color import ColorSensorColor
+from plezmo_backend import *
 
 import utils
 
@@ -62,64 +58,51 @@ def init(motor_name):
     # Elements to connect
     elementList = [{"name": motor_name, "type": PlezmoElementType.MOTOR}]
 
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         logger.error("Failed to connect to element, ex {}".format(e))
         #traceback.print_exc()
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 # Main logic of the program
 def main(motor_name):
     # Init bluetooth communication and connect to elements
-    success = init(motor_name)
-    if success != True:
+    session = init(motor_name)
+    if session == None:
         # Bluetooth communication cannobe enabled, quit.
-        plezmoApi.close()
         logger.error("Could not connect to all the required elements")
         return
 
-    # Register event handlers
-    try:
-        # Event handler to call when motor stalls
-        Motor.onStall(motor_name, stall_handler)
-        logger.info("Starting motor with 50 RPM in CLOCKWISE direction")
-        Motor.startWithRPM(motor_name, 50, MotorDirection.CLOCKWISE)
-        time.sleep(5)
-        logger.info("Stopping motor")
-        Motor.stop(motor_name)
-        time.sleep(2)
-        logger.info("Starting motor with 50 RPM in ANTICLOCKWISE direction")
-        Motor.startWithRPM(motor_name, 50, MotorDirection.ANTICLOCKWISE)
-        time.sleep(5)
-        # Rotate motor one turn in clockwise direction
-        logger.info("Rotating motor finite rotations (ONE turn) in CLOCKWISE direction")
-        Motor.rotate(motor_name, MotorRotation.ONE, MotorDirection.CLOCKWISE)
-        time.sleep(2)
-        # Start motor at HIGH speed in clockwise direction, let it run for 5 seconds then stop
-        logger.info("Starting motor at HIGH speed in CLOCKWISE direction")
-        Motor.start(motor_name, MotorSpeed.HIGH, MotorDirection.CLOCKWISE)
-        time.sleep(5)
-        logger.info("Stopping motor")
-        Motor.stop(motor_name)
-    except Exception as e:
-        logger.error("Failed to run motor commands {}, ex {}".format(motor_name, e))
-        #traceback.print_exc()
-    finally:
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(motor_name)
-        time.sleep(1)
-        plezmoApi.close()
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        # Register event handlers
+        try:
+            # Event handler to call when motor stalls
+            Motor.onStall(motor_name, stall_handler)
+            logger.info("Starting motor with 50 RPM in CLOCKWISE direction")
+            Motor.startWithRPM(motor_name, 50, MotorDirection.CLOCKWISE)
+            time.sleep(5)
+            logger.info("Stopping motor")
+            Motor.stop(motor_name)
+            time.sleep(2)
+            logger.info("Starting motor with 50 RPM in ANTICLOCKWISE direction")
+            Motor.startWithRPM(motor_name, 50, MotorDirection.ANTICLOCKWISE)
+            time.sleep(5)
+            # Rotate motor one turn in clockwise direction
+            logger.info("Rotating motor finite rotations (ONE turn) in CLOCKWISE direction")
+            Motor.rotate(motor_name, MotorRotation.ONE, MotorDirection.CLOCKWISE)
+            time.sleep(2)
+            # Start motor at HIGH speed in clockwise direction, let it run for 5 seconds then stop
+            logger.info("Starting motor at HIGH speed in CLOCKWISE direction")
+            Motor.start(motor_name, MotorSpeed.HIGH, MotorDirection.CLOCKWISE)
+            time.sleep(5)
+            logger.info("Stopping motor")
+            Motor.stop(motor_name)
+        except Exception as e:
+            logger.error("Failed to run motor commands {}, ex {}".format(motor_name, e))
+            #traceback.print_exc()
 
 # Event handler whenever motor stalls
 @PlezmoEventHandler
@@ -128,8 +111,9 @@ def stall_handler():
 
 # Program starts here
 if __name__ == "__main__":
+    utils.handle_options("python motor_example.py <Motor element name>")
     motor_name = utils.extract_element_name()
     if motor_name == None:
         logger.error("Motor element name is mandatory, e.g. # python motor_example.py Motor-Kit11A")
-    else:
+    elif not utils.dry_run([motor_name]):
         main(motor_name)
\ No newline at end of file
@@ -47,11 +47,9 @@ import time
 import traceback
 import sys
 
-from plezmo import *
-from plezmo.utils.logger import Logger
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_motor import MotorDirection, MotorRotation, MotorSpeed
-from plezmo.elements.plezmo_color import ColorSensorColor
+from plezmo_backend import *
+
+import utils
 
 logger = Logger()
 
@@ -69,55 +67,40 @@ def init(element_names):
     elementList = [{"name" : element_names["color"], "type": PlezmoElementType.COLOR},
     {"name": element_names["motor"], "type": PlezmoElementType.MOTOR}]
 
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         logger.error("Failed to connect to element, ex {}".format(e))
         #traceback.print_exc()
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 # Main logic of the program
 def main(element_names):
     global motor_name
     # Init bluetooth communication and connect to elements
-    success = init(element_names)
-    if success != True:
+    session = init(element_names)
+    if session == None:
         # Bluetooth communication cannobe enabled, quit.
-        plezmoApi.close()
         logger.error("Could not connect to all the required elements")
         return
 
     color_name = element_names["color"]
     motor_name = element_names["motor"]
-    # Register event handlers
-    try:
-        # Event handler to call when color sensor detects GREEN color
-        Color.onColorChange(color_name, green_handler, ColorSensorColor.GREEN)
-        # Event handler to call when color sensor detects RED color
-        Color.onColorChange(color_name, red_handler, ColorSensorColor.RED)
-        # If this sleep is not added, program will terminate before events can be generated
-        logger.info("Event handlers registered. Bring the RED/GREEN colors in front of the color element to see the motor start and stop.")
-        time.sleep(20)
-    except Exception as e:
-        logger.error("Failed to run color commands {}, ex {}".format(color_name, e))
-        #traceback.print_exc()
-    finally:
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(color_name)
-        time.sleep(1)
-        plezmoApi.disconnect(motor_name)
-        time.sleep(1)
-        plezmoApi.close()
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        # Register event handlers
+        try:
+            # Event handler to call when color sensor detects GREEN color
+            Color.onColorChange(color_name, green_handler, ColorSensorColor.GREEN)
+            # Event handler to call when color sensor detects RED color
+            Color.onColorChange(color_name, red_handler, ColorSensorColor.RED)
+            # If this sleep is not added, program will terminate before events can be generated
+            logger.info("Event handlers registered. Bring the RED/GREEN colors in front of the color element to see the motor start and stop.")
+            time.sleep(20)
+        except Exception as e:
+            logger.error("Failed to run color commands {}, ex {}".format(color_name, e))
+            #traceback.print_exc()
 
 # Event handler whenever color sensor detects GREEN color
 # Start motor when GREEN color is detected
@@ -147,8 +130,9 @@ def extract_element_names():
 
 # Program starts here
 if __name__ == "__main__":
+    utils.handle_options("python motor_start_on_color_change_example.py <Motor element name> <Color element name>")
     element_names = extract_element_names()
     if element_names == None:
         logger.error("Motor and color element name is mandatory, e.g. # python motor_start_on_color_change_example.py Motor-A Color")
-    else:
+    elif not utils.dry_run(list(element_names.values())):
         main(element_names)
\ No newline at end of file
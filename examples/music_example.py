@@ -39,10 +39,7 @@
 import time
 import traceback
 
-from plezmo import *
-from plezmo.utils.logger import Logger
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_music import *
+from plezmo_backend import *
 
 import utils
 
@@ -57,85 +54,73 @@ def init(music_name):
     registerExceptionHandler(globalExceptionHandler)
     # Elements to connect
     elementList = [{"name" : music_name, "type": PlezmoElementType.MUSIC}]
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         logger.error("Failed to connect to element, ex {}".format(e))
         #traceback.print_exc()
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 # Main logic of the program
 def main(music_name):
     # Init bluetooth communication
-    success = init(music_name)
-    if success != True:
+    session = init(music_name)
+    if session == None:
         # Bluetooth communication cannobe enabled, quit.
-        plezmoApi.close()
         logger.error("Could not connect to all the required elements")
         return
 
-    try:
-        # Set volume and play audio
-        logger.info("Setting volume to LOW")
-        Music.setVolume(music_name, Volume.LOW)
-        logger.info("Playing audio PIANO_LOOP_2")
-        Music.playAudio(music_name, Audio.PIANO_LOOP_2)
-        logger.info("Playing audio PIANO_LOOP_1 asynchronously. This will work only if music element has 3.4 version.")
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
         try:
-            Music.playAudioAndContinue(music_name, Audio.PIANO_LOOP_1, AudioLoop.ONCE)
+            # Set volume and play audio
+            logger.info("Setting volume to LOW")
+            Music.setVolume(music_name, Volume.LOW)
+            logger.info("Playing audio PIANO_LOOP_2")
+            Music.playAudio(music_name, Audio.PIANO_LOOP_2)
+            logger.info("Playing audio PIANO_LOOP_1 asynchronously. This will work only if music element has 3.4 version.")
+            try:
+                Music.playAudioAndContinue(music_name, Audio.PIANO_LOOP_1, AudioLoop.ONCE)
+                time.sleep(5)
+            except:
+                logger.error("playAudioAndContinue failed. Make sure that the music element is upgraded to 3.4 version.")
+            logger.info("Stopping audio")
+            Music.stop(music_name)
+            time.sleep(2)
+            # start and stop buzzing
+            logger.info("Starting buzzing")
+            Music.startBuzzing(music_name)
+            time.sleep(2)
+            logger.info("Stopping buzzing")
+            Music.stopBuzzing(music_name)
+            time.sleep(2)
+            # Play a note
+            logger.info("Playing note 66 with beats = 1")
+            Music.playNote(music_name, Note(66), 1)
+            # Set instrument and tempo
+            Music.setInstrument(music_name, Instrument.FLUTE)
+            Music.setTempo(music_name, Tempo.MEDIUM)
+            Music.setVolume(music_name, Volume.HIGH)
+            logger.info("Set instrument to FLUTE, tempo to MEDIUM, volume to HIGH")
+            i = Music.getInstrument(music_name)
+            logger.info("Got instrument {}".format(i))
+            t = Music.getTempo(music_name)
+            logger.info("Got tempo {}".format(t))
+            v = Music.getVolume(music_name)
+            logger.info("Got volume {}".format(v))
+            logger.info("Playing note 66 with beats = 3")
+            Music.playNote(music_name, Note(66), 3)
             time.sleep(5)
-        except:
-            logger.error("playAudioAndContinue failed. Make sure that the music element is upgraded to 3.4 version.")
-        logger.info("Stopping audio")
-        Music.stop(music_name)
-        time.sleep(2)
-        # start and stop buzzing
-        logger.info("Starting buzzing")
-        Music.startBuzzing(music_name)
-        time.sleep(2)
-        logger.info("Stopping buzzing")
-        Music.stopBuzzing(music_name)
-        time.sleep(2)
-        # Play a note
-        logger.info("Playing note 66 with beats = 1")
-        Music.playNote(music_name, Note(66), 1)
-        # Set instrument and tempo
-        Music.setInstrument(music_name, Instrument.FLUTE)
-        Music.setTempo(music_name, Tempo.MEDIUM)
-        Music.setVolume(music_name, Volume.HIGH)
-        logger.info("Set instrument to FLUTE, tempo to MEDIUM, volume to HIGH")
-        i = Music.getInstrument(music_name)
-        logger.info("Got instrument {}".format(i))
-        t = Music.getTempo(music_name)
-        logger.info("Got tempo {}".format(t))
-        v = Music.getVolume(music_name)
-        logger.info("Got volume {}".format(v))
-        logger.info("Playing note 66 with beats = 3")
-        Music.playNote(music_name, Note(66), 3)
-        time.sleep(5)
-    except Exception as e:
-        logger.error("Failed to run music commands {}, ex {}".format(music_name, e))
-        #traceback.print_exc()
-    finally:
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(music_name)
-        time.sleep(1)
-        plezmoApi.close()
+        except Exception as e:
+            logger.error("Failed to run music commands {}, ex {}".format(music_name, e))
+            #traceback.print_exc()
 
 # Program starts here
 if __name__ == "__main__":
+    utils.handle_options("python music_example.py <Music element name>")
     music_name = utils.extract_element_name()
     if music_name == None:
         logger.error("Music element name is mandatory, e.g. # python music_example.py Music")
-    else:
+    elif not utils.dry_run([music_name]):
         main(music_name)
\ No newline at end of file
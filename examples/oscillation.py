@@ -0,0 +1,193 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Live analysis of an oscillating signal, e.g. the acceleration of the pendulum of
+# raw_acceleration_chart.py. Samples (t, x) are added in batches as they come in, with
+# the same cost per sample however long the session runs:
+#  - period from the upward zero crossings of x around its mean over the latest window
+#    samples. A crossing only counts once x went below -hysteresis and then above
+#    +hysteresis times the amplitude, so noise around zero is not taken for crossings.
+#  - damping ratio from the decay of the amplitude over the latest cycles, the amplitude of
+#    a cycle taken from its standard deviation which noise changes less than its peaks.
+#    A straight line is fitted to the log of the amplitudes, the damping ratio is given
+#    only once min_cycles amplitudes are fitted and the decay is more than twice its
+#    standard error, so noise early in a session does not show up as damping.
+#  - frequency of the strongest peak in the spectrum of the latest window samples,
+#    computed every fft_interval seconds
+import math
+from collections import deque
+
+import numpy as np
+
+from acceleration import RingBuffer
+
+class OscillationAnalyzer:
+    def __init__(self, window=1024, cycles=6, hysteresis=0.3, fft_interval=1.0, min_cycles=4):
+        self.cycles = cycles
+        self.min_cycles = min_cycles
+        self.hysteresis = hysteresis
+        self.fft_interval = fft_interval
+        # t, x and running sums of x and x * x, the mean and amplitude of the window come
+        # from the sums at its ends
+        self._window = RingBuffer(window, 4)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        # last sample of the previous batch and the Schmitt trigger state after it
+        self._prev = None
+        self._state = 0
+        self._last_zero = None
+        # samples, sum and sum of squares of the current cycle
+        self._cycle = [0, 0.0, 0.0]
+        self._crossings = deque(maxlen=cycles + 1)
+        self._amplitudes = deque(maxlen=cycles)
+        self._fft_at = -math.inf
+        self.fft_frequency = None
+
+    # rows is an array of shape (n, 2) of t, x
+    def add(self, rows):
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, 2)
+        if len(rows) == 0:
+            return
+        t, x = rows[:, 0], rows[:, 1]
+        sums = self._sum + np.cumsum(x)
+        sums_sq = self._sum_sq + np.cumsum(x * x)
+        self._sum, self._sum_sq = sums[-1], sums_sq[-1]
+        self._window.extend(np.column_stack([t, x, sums, sums_sq]))
+        wt, wx, wsums, wsums_sq = self._window.view()
+        n = len(wt) - 1
+        if n > 0:
+            mean = (wsums[-1] - wsums[0]) / n
+            amplitude = math.sqrt(max((wsums_sq[-1] - wsums_sq[0]) / n - mean * mean, 0.0) * 2)
+            self._find_crossings(t, x, mean, self.hysteresis * amplitude)
+        self._prev = (t[-1], x[-1])
+        if t[-1] - self._fft_at >= self.fft_interval and len(wt) >= 64:
+            self._fft_at = t[-1]
+            self._spectrum(wt, wx)
+
+    def _find_crossings(self, t, x, mean, level):
+        if self._prev != None:
+            t = np.concatenate([[self._prev[0]], t])
+            x = np.concatenate([[self._prev[1]], x])
+            first = 1
+        else:
+            first = 0
+        y = x - mean
+        state = np.where(y > level, 1, np.where(y < -level, -1, 0))
+        if first == 1:
+            state[0] = self._state
+        # carry the last state forward over samples between -level and +level
+        last = np.maximum.accumulate(np.where(state != 0, np.arange(len(state)), 0))
+        state = state[last]
+        self._state = state[-1]
+        flips = np.nonzero((state[:-1] == -1) & (state[1:] == 1))[0] + 1
+        # upward zero crossings, their time interpolated between the samples around them
+        up = np.nonzero((y[:-1] <= 0) & (y[1:] > 0))[0]
+        zero_times = t[up] - y[up] * (t[up + 1] - t[up]) / (y[up + 1] - y[up])
+        start = first
+        for j in flips:
+            # the last zero crossing before the flip, maybe in an earlier batch
+            k = np.searchsorted(up, j, side="left") - 1
+            if k >= 0:
+                self._last_zero = zero_times[k]
+            self._extend_cycle(x[start:j])
+            self._end_cycle(self._last_zero)
+            start = j
+        self._extend_cycle(x[start:])
+        if len(up) > 0:
+            self._last_zero = zero_times[-1]
+
+    def _extend_cycle(self, x):
+        self._cycle[0] += len(x)
+        self._cycle[1] += x.sum()
+        self._cycle[2] += (x * x).sum()
+
+    def _end_cycle(self, t):
+        if t == None:
+            return
+        # the cycle before the first crossing is not a whole one
+        n, total, total_sq = self._cycle
+        if len(self._crossings) > 0 and n > 1:
+            mean = total / n
+            self._amplitudes.append(math.sqrt(max(total_sq / n - mean * mean, 0.0) * 2))
+        self._crossings.append(t)
+        self._cycle = [0, 0.0, 0.0]
+
+    def _spectrum(self, t, x):
+        n = len(t)
+        duration = t[-1] - t[0]
+        if duration <= 0:
+            return
+        # samples are not evenly spaced, take them on an even grid first
+        y = np.interp(np.linspace(t[0], t[-1], n), t, x)
+        y = (y - y.mean()) * np.hanning(n)
+        power = np.abs(np.fft.rfft(y)) ** 2
+        k = 1 + np.argmax(power[1:])
+        # peak between bins from a parabola through the log power around it
+        offset = 0.0
+        if k < len(power) - 1 and power[k - 1] > 0 and power[k + 1] > 0:
+            a, b, c = np.log(power[k - 1:k + 2])
+            if a - 2 * b + c != 0:
+                offset = 0.5 * (a - c) / (a - 2 * b + c)
+        self.fft_frequency = (k + offset) * (n - 1) / (n * duration)
+
+    # Latest results as a dict, None for what is not known yet:
+    #   period     seconds, from the zero crossings
+    #   frequency  Hz, 1 / period
+    #   fft_frequency  Hz, from the spectrum
+    #   damping    damping ratio, from the logarithmic decrement of the amplitude
+    #   damping_error  standard error of the damping ratio
+    #   cycles     whole cycles seen so far in the latest ones
+    def result(self):
+        period = frequency = damping = damping_error = None
+        crossings = list(self._crossings)
+        if len(crossings) >= 2:
+            period = (crossings[-1] - crossings[0]) / (len(crossings) - 1)
+            frequency = 1 / period if period > 0 else None
+        amplitudes = np.array(self._amplitudes)
+        if len(amplitudes) >= max(self.min_cycles, 3) and amplitudes.min() > 0:
+            # log amplitude falls by the decrement every cycle
+            n = np.arange(len(amplitudes))
+            slope, intercept = np.polyfit(n, np.log(amplitudes), 1)
+            residuals = np.log(amplitudes) - (slope * n + intercept)
+            error = math.sqrt((residuals ** 2).sum() / (len(n) - 2) / ((n - n.mean()) ** 2).sum())
+            decrement = -slope
+            if decrement > 2 * error:
+                scale = math.sqrt(4 * math.pi * math.pi + decrement * decrement)
+                damping = decrement / scale
+                damping_error = error / scale
+        return {"period": period, "frequency": frequency, "fft_frequency": self.fft_frequency,
+                "damping": damping, "damping_error": damping_error, "cycles": len(amplitudes)}
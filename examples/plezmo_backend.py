@@ -0,0 +1,166 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Plezmo implementation used by the examples, selected with the PLEZMO_BACKEND environment
+# variable. Examples import everything they need from here instead of from plezmo.
+#
+#   PLEZMO_BACKEND=plezmo  (default) use the plezmo package, the script owns the Plezmo wireless adapter
+#   PLEZMO_BACKEND=broker  use the elements of a running broker.py, see plezmo_broker.py
+#   PLEZMO_BACKEND=sim     use simulated elements, no adapter needed, see plezmo_sim.py
+#   PLEZMO_BACKEND=replay  play back a recording, see plezmo_replay.py
+#
+# With PLEZMO_RECORD=<file> all calls and events of any backend are recorded to file, see
+# plezmo_recorder.py.
+#
+# Importing plezmo initializes BLE and takes a while, so nothing of the backend is imported
+# here. Names exported by this module stand in for the backend ones and import the backend
+# the first time they are used, e.g. on Motion.onTilt(...) or PlezmoElementType.MOTION.
+# Scripts can check their arguments, print help etc. without paying for it.
+#
+# Stand-ins work for calls, attributes and indexing. Where the real object is needed, e.g.
+# a backend exception in an except clause, use resolve(ConnectionFailedException).
+import os
+import functools
+import importlib
+import threading
+
+import plezmo_types
+from plezmo_types import Logger
+
+BACKEND = os.environ.get("PLEZMO_BACKEND", "plezmo")
+RECORD = os.environ.get("PLEZMO_RECORD")
+
+# Modules making up each backend, their public names are merged in this order
+BACKENDS = {
+    "plezmo": ["plezmo", "plezmo.plezmo_exceptions.exceptions", "plezmo.elements.element_types",
+               "plezmo.elements.plezmo_element", "plezmo.elements.plezmo_motion", "plezmo.elements.plezmo_color",
+               "plezmo.elements.plezmo_light", "plezmo.elements.plezmo_display", "plezmo.elements.plezmo_music",
+               "plezmo.elements.plezmo_motor", "plezmo.elements.plezmo_distance"],
+    "broker": ["plezmo_broker"],
+    "sim": ["plezmo_sim"],
+    "replay": ["plezmo_replay"],
+}
+
+if BACKEND not in BACKENDS:
+    raise ImportError("Unknown PLEZMO_BACKEND {}, use one of {}".format(BACKEND, "/".join(BACKENDS)))
+
+__all__ = ["plezmoApi", "Motion", "Color", "Light", "Display", "Music", "Motor", "Distance",
+           "registerExceptionHandler", "PlezmoEventHandler", "Logger", "resolve", "load"] + \
+          [name for name in dir(plezmo_types) if isinstance(getattr(plezmo_types, name), type) and name not in ("Enum", "Logger")]
+
+_names = None
+_lock = threading.Lock()
+
+# Import the backend, returns its public names. Later calls return the same names.
+def load():
+    global _names
+    if _names == None:
+        with _lock:
+            if _names == None:
+                names = {}
+                for module_name in BACKENDS[BACKEND]:
+                    module = importlib.import_module(module_name)
+                    public = getattr(module, "__all__", None)
+                    if public == None:
+                        public = [n for n in vars(module) if not n.startswith("_")]
+                    names.update({n: getattr(module, n) for n in public})
+                if RECORD:
+                    import plezmo_recorder
+                    names = plezmo_recorder.record(names, RECORD, BACKEND)
+                _names = names
+    return _names
+
+def loaded():
+    return _names != None
+
+# Stands in for a backend name till it is used
+class _Lazy:
+    def __init__(self, name):
+        self._name = name
+        self._target = None
+
+    def _resolve(self):
+        if self._target == None:
+            self._target = load()[self._name]
+        return self._target
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return self._resolve()[key]
+
+    def __iter__(self):
+        return iter(self._resolve())
+
+    def __repr__(self):
+        if self._target == None and not loaded():
+            return "<{} from PLEZMO_BACKEND={}, not loaded>".format(self._name, BACKEND)
+        return repr(self._resolve())
+
+# Real backend object for a stand-in, other objects are returned as they are
+def resolve(obj):
+    if isinstance(obj, _Lazy):
+        return obj._resolve()
+    return obj
+
+# Same as plezmo.PlezmoEventHandler. Handlers are decorated when the script is loaded, the
+# backend decorator is applied when the handler is called for the first time.
+def PlezmoEventHandler(func):
+    decorated = []
+    @functools.wraps(func)
+    def eventHandler(*args, **kwargs):
+        if len(decorated) == 0:
+            decorated.append(load()["PlezmoEventHandler"](func))
+        return decorated[0](*args, **kwargs)
+    return eventHandler
+
+for _name in __all__:
+    if _name not in globals():
+        globals()[_name] = _Lazy(_name)
+
+# Anything else of the backend, e.g. plezmo_backend.device_manager
+def __getattr__(name):
+    # the import system looks up __path__ etc. on every import, don't load the backend for them
+    if not name.startswith("__"):
+        names = load()
+        if name in names:
+            return names[name]
+    raise AttributeError("module {} has no attribute {}".format(__name__, name))
@@ -0,0 +1,281 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Client for broker.py. Provides the same names as the plezmo package (plezmoApi, Motion,
+# Color, Light, Display, Music, Motor, Distance, registerExceptionHandler, PlezmoEventHandler
+# and the element enums) but every call is forwarded to the broker over a Unix domain socket.
+# Importing this module does not touch BLE, so scripts start immediately and several of
+# them can use the elements connected by one broker at the same time.
+#
+# Messages are JSON, one per line:
+#   request  {"id": 1, "target": "Motion", "method": "getAngle", "args": [...]}
+#   reply    {"id": 1, "result": ...} or {"id": 1, "error": "ElementNotFoundException", "message": "..."}
+#   event    {"event": 3} calls the event handler registered with id 3
+import os
+import json
+import socket
+import tempfile
+import threading
+from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
+
+import plezmo_types
+from plezmo_types import *
+
+__all__ = ["plezmoApi", "Motion", "Color", "Light", "Display", "Music", "Motor", "Distance",
+           "registerExceptionHandler", "PlezmoEventHandler", "Logger"] + \
+          [name for name in dir(plezmo_types) if isinstance(getattr(plezmo_types, name), type) and name != "Enum"]
+
+# Socket the broker listens on, PLEZMO_BROKER_SOCKET overrides it
+SOCKET_PATH = os.environ.get("PLEZMO_BROKER_SOCKET", os.path.join(tempfile.gettempdir(), "plezmo-broker.sock"))
+
+# Objects whose methods can be called through the broker
+TARGETS = ["plezmoApi", "Motion", "Color", "Light", "Display", "Music", "Motor", "Distance"]
+
+# Number of threads running event handlers, same as plezmoApi.init() default
+EVENT_THREADS = 10
+
+# Enum and value classes by name, used to decode arguments and results. namespaces are
+# dictionaries of name to object, e.g. vars(module).
+def type_table(namespaces):
+    table = {}
+    for names in namespaces:
+        for name, cls in names.items():
+            if isinstance(cls, type) and (issubclass(cls, Enum) and cls is not Enum or name in VALUE_TYPES):
+                table[name] = cls
+    return table
+
+# Convert value to something json can carry. Enums and value types are sent by class name,
+# callables are replaced by the id returned by handler_id(callable).
+def encode(value, handler_id=None):
+    if isinstance(value, Enum):
+        return {"enum": type(value).__name__, "name": value.name}
+    if type(value).__name__ in VALUE_TYPES:
+        return {"value": type(value).__name__, "arg": value.value}
+    if isinstance(value, (list, tuple)):
+        return [encode(v, handler_id) for v in value]
+    if isinstance(value, dict):
+        return {"dict": {k: encode(v, handler_id) for k, v in value.items()}}
+    if callable(value) and handler_id != None:
+        return {"handler": handler_id(value)}
+    return value
+
+# Reverse of encode(). types is the table from type_table(), handler(id) returns the
+# callable to use for a handler id.
+def decode(value, types, handler=None):
+    if isinstance(value, list):
+        return [decode(v, types, handler) for v in value]
+    if isinstance(value, dict):
+        if "enum" in value:
+            return types[value["enum"]][value["name"]]
+        if "value" in value:
+            return types[value["value"]](value["arg"])
+        if "dict" in value:
+            return {k: decode(v, types, handler) for k, v in value["dict"].items()}
+        if "handler" in value and handler != None:
+            return handler(value["handler"])
+    return value
+
+# Exception raised by the broker for errors that are not plezmo exceptions
+class BrokerError(Exception):
+    pass
+
+_types = type_table([vars(plezmo_types)])
+_exceptions = {"PlezmoInvalidStateException": PlezmoInvalidStateException,
+               "ElementNotFoundException": ElementNotFoundException,
+               "ConnectionFailedException": ConnectionFailedException,
+               "PlezmoAdapterNotFoundException": PlezmoAdapterNotFoundException,
+               "CommandFailedException": CommandFailedException}
+
+class BrokerClient:
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self._sock = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._next_id = 1
+        # request id to [threading.Event, reply]
+        self._pending = {}
+        self._handlers = {}
+        self._handler_ids = {}
+        self._events = None
+
+    def _connect(self):
+        with self._lock:
+            if self._sock == None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    sock.connect(self.path)
+                except OSError:
+                    sock.close()
+                    raise PlezmoAdapterNotFoundException("Broker is not running on {}".format(self.path))
+                self._sock = sock
+                self._events = ThreadPoolExecutor(max_workers=EVENT_THREADS)
+                threading.Thread(target=self._read_replies, args=(sock,), daemon=True).start()
+            return self._sock
+
+    def _handler_id(self, func):
+        with self._lock:
+            hid = self._handler_ids.get(func)
+            if hid == None:
+                hid = len(self._handlers) + 1
+                self._handlers[hid] = func
+                self._handler_ids[func] = hid
+            return hid
+
+    def _read_replies(self, sock):
+        try:
+            with sock.makefile("r", encoding="utf-8") as f:
+                for line in f:
+                    msg = json.loads(line)
+                    if "event" in msg:
+                        handler = self._handlers.get(msg["event"])
+                        if handler != None:
+                            self._events.submit(handler)
+                        continue
+                    slot = self._pending.pop(msg["id"], None)
+                    if slot != None:
+                        slot[1] = msg
+                        slot[0].set()
+        except (OSError, ValueError):
+            pass
+        finally:
+            # broker went away, fail calls still waiting for a reply. The next call connects again.
+            self._lost(sock)
+
+    # Forget the connection sock and fail the calls waiting on it
+    def _lost(self, sock):
+        with self._lock:
+            if self._sock is not sock:
+                return
+            self._sock = None
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for slot in pending:
+            slot[1] = {"error": "PlezmoInvalidStateException", "message": "Connection to broker {} lost".format(self.path)}
+            slot[0].set()
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    # Call target.method(*args) in the broker and return the result
+    def call(self, target, method, *args):
+        sock = self._connect()
+        slot = [threading.Event(), None]
+        with self._lock:
+            if self._sock is not sock:
+                raise PlezmoInvalidStateException("Connection to broker {} lost".format(self.path))
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = slot
+        line = json.dumps({"id": request_id, "target": target, "method": method,
+                           "args": encode(list(args), self._handler_id)}) + "\n"
+        try:
+            with self._send_lock:
+                sock.sendall(line.encode("utf-8"))
+        except OSError:
+            self._lost(sock)
+            raise PlezmoInvalidStateException("Connection to broker {} lost".format(self.path))
+        slot[0].wait()
+        reply = slot[1]
+        if "error" in reply:
+            raise _exceptions.get(reply["error"], BrokerError)(reply.get("message"))
+        return decode(reply.get("result"), _types)
+
+    def close(self):
+        with self._lock:
+            sock = self._sock
+        if sock != None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            # calls still waiting for a reply, e.g. waitFor*, fail instead of waiting forever
+            self._lost(sock)
+        if self._events != None:
+            self._events.shutdown(wait=False)
+
+# Forwards method calls on one of the TARGETS to the broker
+class _Target:
+    def __init__(self, client, name):
+        self._client = client
+        self._name = name
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        def call(*args):
+            return self._client.call(self._name, method, *args)
+        return call
+
+class _BrokerApi(_Target):
+    # the adapter is owned by the broker, utils connects through plezmoApi
+    device_manager = None
+
+    # Closes only the connection to the broker, elements stay connected in the broker
+    def close(self):
+        self._client.close()
+
+client = BrokerClient()
+plezmoApi = _BrokerApi(client, "plezmoApi")
+Motion = _Target(client, "Motion")
+Color = _Target(client, "Color")
+Light = _Target(client, "Light")
+Display = _Target(client, "Display")
+Music = _Target(client, "Music")
+Motor = _Target(client, "Motor")
+Distance = _Target(client, "Distance")
+
+globalHandler = None
+
+# Same as plezmo.registerExceptionHandler()
+def registerExceptionHandler(handler):
+    global globalHandler
+    globalHandler = handler
+
+# Same as plezmo.PlezmoEventHandler, exceptions in event handlers go to the global handler
+def PlezmoEventHandler(func):
+    def eventHandler(*args, **kwargs):
+        try:
+            func(*args, **kwargs)
+        except ElementNotFoundException as e:
+            if globalHandler != None:
+                globalHandler(e)
+            else:
+                raise e
+    return eventHandler
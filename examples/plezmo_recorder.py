@@ -0,0 +1,165 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Records what a script does with the elements so that it can be played back later with
+# PLEZMO_BACKEND=replay (see plezmo_replay.py), without the elements and with exactly the
+# same readings and events. Enabled by setting PLEZMO_RECORD to the file to record to, with
+# any backend. Files ending with .gz are gzip compressed.
+#
+# Recording is JSON, one record per line. Times are seconds since the backend was loaded,
+# from time.monotonic().
+#   {"v": 1, "backend": "plezmo", "started": "2026-10-18T10:00:00"}    first line
+#   {"t": 1.52, "c": "Motion.getAngle", "a": ["Motion", {"enum": "Axis", "name": "FRONT_TO_BACK"}], "d": 0.031, "r": 12}
+#                 call started at t with arguments a, took d seconds and returned r
+#   {"t": 1.6, "c": "Light.turnOn", "a": [...], "d": 0.5, "e": "CommandFailedException", "m": "Light"}
+#                 call that raised exception e with message m
+#   {"t": 2.01, "ev": 3}
+#                 event handler 3 called, handlers are numbered {"handler": 3} in "a" of the call registering them
+#
+# e.g. # PLEZMO_RECORD=swing.jsonl.gz python raw_acceleration_chart.py Motion
+import gzip
+import json
+import time
+import atexit
+import threading
+
+from plezmo_broker import TARGETS, encode
+
+# Digits kept of times and latencies, microseconds
+TIME_DIGITS = 6
+
+class Recorder:
+    def __init__(self, path, backend):
+        self.path = path
+        if path.endswith(".gz"):
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        # handler function to (handler id, recording wrapper)
+        self._handlers = {}
+        self._write({"v": 1, "backend": backend, "started": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        atexit.register(self.close)
+
+    def _write(self, record):
+        # results that can't be recorded, like element objects, are recorded as null
+        line = json.dumps(record, separators=(",", ":"), default=lambda o: None) + "\n"
+        with self._lock:
+            if self._file != None:
+                self._file.write(line)
+
+    def _time(self, t):
+        return round(t - self._start, TIME_DIGITS)
+
+    # Recording wrapper of event handler func, the same for every registration of func
+    def _handler(self, func):
+        with self._lock:
+            entry = self._handlers.get(func)
+            if entry == None:
+                hid = len(self._handlers) + 1
+                def recorded(*args, **kwargs):
+                    self._write({"t": self._time(time.monotonic()), "ev": hid})
+                    return func(*args, **kwargs)
+                entry = (hid, recorded)
+                self._handlers[func] = entry
+        return entry
+
+    # Make call name (e.g. "Motion.getAngle") to func with args and record it
+    def call(self, name, func, args):
+        encoded = encode(list(args), lambda f: self._handler(f)[0])
+        args = [self._handler(a)[1] if callable(a) else a for a in args]
+        start = time.monotonic()
+        record = {"t": self._time(start), "c": name, "a": encoded}
+        try:
+            result = func(*args)
+        except Exception as e:
+            record["d"] = round(time.monotonic() - start, TIME_DIGITS)
+            record["e"] = type(e).__name__
+            record["m"] = str(e)
+            self._write(record)
+            raise
+        record["d"] = round(time.monotonic() - start, TIME_DIGITS)
+        record["r"] = encode(result)
+        self._write(record)
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._file != None:
+                self._file.close()
+                self._file = None
+
+# Attributes of targets whose calls are recorded too, e.g. plezmoApi.device_manager.connect()
+# used by utils to reach the adapter
+RECORDED_ATTRIBUTES = ["device_manager"]
+
+# Stands in for plezmoApi or an element facade and records every call made through it.
+# Other attributes are read from and set on the target.
+class RecordedTarget:
+    def __init__(self, recorder, name, target):
+        self.__dict__["_recorder"] = recorder
+        self.__dict__["_name"] = name
+        self.__dict__["_target"] = target
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if attr in RECORDED_ATTRIBUTES and value != None:
+            value = RecordedTarget(self._recorder, self._name + "." + attr, value)
+            self.__dict__[attr] = value
+            return value
+        if not callable(value) or attr.startswith("_"):
+            return value
+        name = self._name + "." + attr
+        recorder = self._recorder
+        def call(*args):
+            return recorder.call(name, value, args)
+        # cached, later lookups don't come here
+        self.__dict__[attr] = call
+        return call
+
+    def __setattr__(self, attr, value):
+        setattr(self._target, attr, value)
+
+# Backend names with plezmoApi and the element facades replaced by recording ones
+def record(names, path, backend):
+    recorder = Recorder(path, backend)
+    recorded = dict(names)
+    for target in TARGETS:
+        if target in names:
+            recorded[target] = RecordedTarget(recorder, target, names[target])
+    return recorded
@@ -0,0 +1,278 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Plays back a recording made with PLEZMO_RECORD (see plezmo_recorder.py), used with
+# PLEZMO_BACKEND=replay. Calls return the recorded results (or raise the recorded
+# exceptions) in the order they were recorded and take the recorded time, event handlers
+# are called at the recorded times. Running the same script again against the same
+# recording gives exactly the same readings and events, without any element.
+#
+#   PLEZMO_REPLAY        recording to play back
+#   PLEZMO_REPLAY_SPEED  1 (default) plays back in recorded time, 10 ten times faster, 0 without
+#                        any waiting; events then come when calls reach their time in the recording
+#
+# A call made more often than recorded returns its last recorded result again, a call not
+# in the recording raises CommandFailedException. Both are counted and logged at close.
+#
+# e.g. # PLEZMO_BACKEND=replay PLEZMO_REPLAY=swing.jsonl.gz PLEZMO_REPLAY_SPEED=4 python raw_acceleration_chart.py Motion
+import os
+import gzip
+import json
+import time
+import threading
+from collections import deque
+
+import plezmo_types
+from plezmo_types import *
+from plezmo_broker import encode, decode, type_table
+
+__all__ = ["plezmoApi", "Motion", "Color", "Light", "Display", "Music", "Motor", "Distance",
+           "registerExceptionHandler", "PlezmoEventHandler", "Logger"] + \
+          [name for name in dir(plezmo_types) if isinstance(getattr(plezmo_types, name), type) and name != "Enum"]
+
+logger = Logger()
+
+REPLAY_FILE = os.environ.get("PLEZMO_REPLAY")
+REPLAY_SPEED = float(os.environ.get("PLEZMO_REPLAY_SPEED", "1"))
+
+TYPES = type_table([vars(plezmo_types)])
+
+def read_recording(path):
+    if path.endswith(".gz"):
+        f = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        f = open(path, encoding="utf-8")
+    with f:
+        return [json.loads(line) for line in f if line.strip() != ""]
+
+# Arguments of a call with event handlers left out, calls are matched on it
+def _masked(args):
+    if isinstance(args, list):
+        return [_masked(a) for a in args]
+    if isinstance(args, dict):
+        if "handler" in args:
+            return {"handler": None}
+        return {k: _masked(v) for k, v in args.items()}
+    return args
+
+def _key(name, args):
+    return name + json.dumps(_masked(args), sort_keys=True)
+
+def _handler_ids(args):
+    if isinstance(args, list):
+        return [h for a in args for h in _handler_ids(a)]
+    if isinstance(args, dict):
+        if "handler" in args:
+            return [args["handler"]]
+        return [h for v in args.values() for h in _handler_ids(v)]
+    return []
+
+class Replay:
+    def __init__(self, records, speed):
+        self.speed = speed
+        self.header = records[0] if len(records) > 0 and "v" in records[0] else {}
+        # call key to recorded calls not played back yet
+        self.calls = {}
+        # call key to recorded handler ids registered by it
+        self.registrations = {}
+        self.events = deque()
+        for r in records:
+            if "c" in r:
+                key = _key(r["c"], r["a"])
+                self.calls.setdefault(key, deque()).append(r)
+                ids = _handler_ids(r["a"])
+                if len(ids) > 0:
+                    self.registrations.setdefault(key, set()).update(ids)
+            elif "ev" in r:
+                self.events.append(r)
+        # recorded handler id to handlers registered by the script being run
+        self.handlers = {}
+        self.connected = {}
+        self.played = 0
+        self.repeated = 0
+        self.missing = 0
+        # recording time reached by played back calls
+        self._call_clock = 0
+        self._start = time.monotonic()
+        self._clock = threading.Condition()
+        # calls come from the script, its sampler threads and event handlers at the same time
+        self._lock = threading.Lock()
+        threading.Thread(target=self._play_events, daemon=True).start()
+
+    # Current time in the recording
+    def now(self):
+        if self.speed > 0:
+            return (time.monotonic() - self._start) * self.speed
+        return self._call_clock
+
+    def _play_events(self):
+        while len(self.events) > 0:
+            event = self.events.popleft()
+            with self._clock:
+                while self.now() < event["t"]:
+                    self._clock.wait(None if self.speed <= 0 else (event["t"] - self.now()) / self.speed)
+            with self._lock:
+                handlers = list(self.handlers.get(event["ev"], []))
+            for handler in handlers:
+                try:
+                    handler()
+                except Exception as e:
+                    logger.error("Event handler failed, ex {}".format(e))
+
+    # Play back call name with encoded args, handlers are the callables in the arguments
+    def call(self, name, args, handlers=()):
+        key = _key(name, args)
+        with self._lock:
+            recorded = self.calls.get(key)
+            if recorded == None or len(recorded) == 0:
+                self.missing += 1
+                raise CommandFailedException("{} with arguments {} is not in the recording".format(name, args))
+            if len(recorded) > 1:
+                r = recorded.popleft()
+            else:
+                # made more often than recorded, keep returning the last one
+                r = recorded[0]
+                if r.get("played"):
+                    self.repeated += 1
+                r["played"] = True
+            self.played += 1
+            for hid in self.registrations.get(key, ()):
+                for handler in handlers:
+                    if handler not in self.handlers.setdefault(hid, []):
+                        self.handlers[hid].append(handler)
+        if self.speed > 0 and r["d"] > 0:
+            time.sleep(r["d"] / self.speed)
+        with self._clock:
+            self._call_clock = max(self._call_clock, r["t"] + r["d"])
+            self._clock.notify_all()
+        if "e" in r:
+            cls = getattr(plezmo_types, r["e"], None)
+            if not (isinstance(cls, type) and issubclass(cls, Exception)):
+                cls = CommandFailedException
+            raise cls(r["m"])
+        return decode(r.get("r"), TYPES)
+
+    def report(self):
+        logger.info("Replayed {} calls, {} repeated, {} not in the recording".format(self.played, self.repeated, self.missing))
+
+replay = Replay(read_recording(REPLAY_FILE), REPLAY_SPEED) if REPLAY_FILE != None else None
+
+def _replay():
+    if replay == None:
+        raise PlezmoInvalidStateException("Set PLEZMO_REPLAY to the recording to play back")
+    return replay
+
+# Element facade playing back recorded calls
+class ReplayTarget:
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        name = self._name + "." + attr
+        def call(*args):
+            handlers = [a for a in args if callable(a)]
+            return _replay().call(name, _encode(args), handlers)
+        self.__dict__[attr] = call
+        return call
+
+def _encode(args):
+    return encode(list(args), lambda f: 0)
+
+# plezmoApi playing back recorded calls. Connects not in the recording succeed, so that
+# scripts connecting by name play back recordings made with cached MAC addresses and
+# the other way round.
+class ReplayApi(ReplayTarget):
+    # there is no adapter, utils connects through plezmoApi
+    device_manager = None
+
+    def connect(self, elementName, elementType, timeoutSec=30):
+        try:
+            _replay().call("plezmoApi.connect", _encode([elementName, elementType, timeoutSec]))
+        except CommandFailedException:
+            pass
+        _replay().connected[elementName] = {"mac": None, "type": elementType, "name": elementName}
+
+    def connectByMac(self, mac, elementType, timeoutSec=30):
+        # cached MAC addresses may not be the recorded ones, have the element connected by name
+        raise ConnectionFailedException(mac)
+
+    def disconnect(self, elementName):
+        if _replay().connected.pop(elementName, None) == None:
+            raise ElementNotFoundException(elementName)
+
+    def getConnectedElements(self):
+        return list(_replay().connected.values())
+
+    def getDiscoveredElements(self, timeout=5):
+        try:
+            return _replay().call("plezmoApi.getDiscoveredElements", _encode([timeout]))
+        except CommandFailedException:
+            return []
+
+    def close(self):
+        _replay().connected.clear()
+        _replay().report()
+
+plezmoApi = ReplayApi("plezmoApi")
+Motion = ReplayTarget("Motion")
+Color = ReplayTarget("Color")
+Light = ReplayTarget("Light")
+Display = ReplayTarget("Display")
+Music = ReplayTarget("Music")
+Motor = ReplayTarget("Motor")
+Distance = ReplayTarget("Distance")
+
+globalHandler = None
+
+# Same as plezmo.registerExceptionHandler()
+def registerExceptionHandler(handler):
+    global globalHandler
+    globalHandler = handler
+
+# Same as plezmo.PlezmoEventHandler, exceptions in event handlers go to the global handler
+def PlezmoEventHandler(func):
+    def eventHandler(*args, **kwargs):
+        try:
+            func(*args, **kwargs)
+        except ElementNotFoundException as e:
+            if globalHandler != None:
+                globalHandler(e)
+            else:
+                raise e
+    return eventHandler
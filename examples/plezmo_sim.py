@@ -0,0 +1,687 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Simulated Plezmo elements, used with PLEZMO_BACKEND=sim (see plezmo_backend.py). Has the
+# same plezmoApi and Motion, Color, Light, Display, Music, Motor and Distance functions as
+# the plezmo package but needs neither the Plezmo wireless adapter nor any element, so the
+# examples can be run and timed on any machine.
+#
+# Every call takes a random time drawn from a configurable distribution and can be made to
+# fail with a given probability. Connected elements raise random events (tilt, color
+# change, near/far, ...) and can be made to drop their connection. Motion elements swing
+# like the pendulum of raw_acceleration_chart.py.
+#
+# Settings are read from PLEZMO_SIM_CONFIG, either a JSON file or the JSON itself, and can
+# be changed at run time with configure(). See DEFAULT_CONFIG for what can be set.
+#
+# e.g. # PLEZMO_BACKEND=sim python motion_example.py Motion
+#      # PLEZMO_BACKEND=sim PLEZMO_SIM_CONFIG='{"time_scale": 0, "seed": 1}' python light_example.py Light
+import os
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import plezmo_types
+from plezmo_types import *
+
+__all__ = ["plezmoApi", "Motion", "Color", "Light", "Display", "Music", "Motor", "Distance",
+           "registerExceptionHandler", "PlezmoEventHandler", "Logger"] + \
+          [name for name in dir(plezmo_types) if isinstance(getattr(plezmo_types, name), type) and name != "Enum"]
+
+logger = Logger()
+
+# Number of threads running event handlers, same as plezmoApi.init() default
+EVENT_THREADS = 10
+
+# Standard gravity in mm/sec^2, the unit of Motion.getAccelerometerData()
+GRAVITY = 9806.65
+
+DEFAULT_CONFIG = {
+    # Seed of the random numbers, null for different numbers on every run
+    "seed": None,
+    # All latencies are multiplied by this, 0 runs everything without delay
+    "time_scale": 1.0,
+    # Time taken by calls in seconds. Looked up by "Target.method" (e.g. "Motion.getAngle"),
+    # then by "Target", then "default". Distributions are
+    #   {"dist": "constant", "value": v}
+    #   {"dist": "uniform", "low": a, "high": b}
+    #   {"dist": "normal", "mean": m, "stddev": s}      (negative values are taken as 0)
+    #   {"dist": "lognormal", "mu": m, "sigma": s}
+    #   {"dist": "exponential", "mean": m}
+    "latency": {
+        "default": {"dist": "normal", "mean": 0.03, "stddev": 0.008},
+        "plezmoApi": {"dist": "constant", "value": 0},
+        # scan for the element, then start it up (plezmoApi.connect() waits 1 second for it)
+        "plezmoApi.connect": {"dist": "uniform", "low": 1.5, "high": 3.5},
+        "plezmoApi.connectByMac": {"dist": "uniform", "low": 1.2, "high": 1.6},
+        "plezmoApi.disconnect": {"dist": "constant", "value": 0.2},
+    },
+    # Probability of a call failing, looked up the same way as latency. Failed connects
+    # raise ConnectionFailedException, other calls CommandFailedException.
+    "failure": {
+        "default": 0.0,
+    },
+    # Elements that can be discovered and connected, e.g. [{"name": "Motion", "type": "MOTION"}].
+    # null lets elements of any name connect and discovery finds one element of each type.
+    "elements": None,
+    # Average number of events per second raised by each connected element, either a number
+    # or per element type e.g. {"default": 0.5, "MOTION": 2}
+    "event_rate": 0.5,
+    # Average number of times per hour a connected element drops its connection
+    "drop_rate": 0,
+    # Motion elements hang on a pendulum released when they get connected. Period in
+    # seconds, amplitude in degrees, damping time constant in seconds, noise in mm/sec^2.
+    "pendulum": {"period": 2.8, "amplitude": 15, "damping": 60, "noise": 30},
+}
+
+# Events raised by each element type, as (handler registration function, detail values)
+COMMON_EVENTS = [("onDoubleTap", [None]), ("onFlipEvent", list(Flip))]
+EVENTS = {
+    PlezmoElementType.MOTION: COMMON_EVENTS + [("onTilt", list(Tilt)), ("onMotion", list(Movement)),
+                                               ("onFlat", [None]), ("onStep", [None])],
+    PlezmoElementType.COLOR: COMMON_EVENTS + [("onColorChange", [c for c in ColorSensorColor if c != ColorSensorColor.UNKNOWN]),
+                                              ("onLightEvent", [ColorSensorLightState.BRIGHT, ColorSensorLightState.DARK])],
+    PlezmoElementType.DISTANCE: COMMON_EVENTS + [("onDistanceEvent", list(DistanceEvent))],
+    PlezmoElementType.MOTOR: [("onStall", [None])],
+    PlezmoElementType.LIGHT: COMMON_EVENTS,
+    PlezmoElementType.DISPLAY: COMMON_EVENTS,
+    PlezmoElementType.MUSIC: COMMON_EVENTS,
+}
+
+COLOR_HEX = {ColorSensorColor.RED: "#FF0000", ColorSensorColor.GREEN: "#00FF00", ColorSensorColor.BLUE: "#0000FF",
+             ColorSensorColor.YELLOW: "#FFFF00", ColorSensorColor.WHITE: "#FFFFFF", ColorSensorColor.PINK: "#FFC0CB",
+             ColorSensorColor.ORANGE: "#FFA500", ColorSensorColor.UNKNOWN: "#000000"}
+
+def _merge(config, override):
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key] = dict(config[key], **value)
+        else:
+            config[key] = value
+    return config
+
+def _load_config():
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    value = os.environ.get("PLEZMO_SIM_CONFIG")
+    if value:
+        if value.lstrip().startswith("{"):
+            _merge(config, json.loads(value))
+        else:
+            with open(value, encoding="utf-8") as f:
+                _merge(config, json.load(f))
+    return config
+
+# Simulated MAC address, the same for the same element on every run
+def element_mac(name, element_type):
+    digest = hashlib.md5("{}/{}".format(element_type.name, name).encode("utf-8")).digest()
+    return "F0:" + ":".join("{:02X}".format(b) for b in digest[:5])
+
+# One simulated element
+class SimElement:
+    def __init__(self, name, element_type, mac):
+        self.name = name
+        self.type = element_type
+        self.mac = mac
+        self.connected_at = time.monotonic()
+        self.state = {"color": ColorSensorColor.WHITE, "light_percent": 60, "distance": 50, "distance_threshold": 20,
+                      "light_state": LightState.OFF, "brightness": 0, "light_color": LightColor("#FFFFFF"),
+                      "volume": Volume.MEDIUM, "tempo": Tempo.MEDIUM, "instrument": Instrument.PIANO}
+        # commands to an element are sent one at a time
+        self.command_lock = threading.Lock()
+        # (event, detail) to list of handlers
+        self.handlers = {}
+        # (event, detail) to number of times it was raised, waitFor* functions wait on it
+        self.event_counts = {}
+        self.events = threading.Condition()
+        self.stopped = threading.Event()
+
+class Simulator:
+    def __init__(self):
+        self.config = _load_config()
+        self.random = random.Random(self.config["seed"])
+        self.elements = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=EVENT_THREADS)
+        self.event_interceptor = None
+
+    # Change settings, e.g. configure(time_scale=0, failure={"Motion": 0.1})
+    def configure(self, **settings):
+        _merge(self.config, json.loads(json.dumps(settings)))
+        if "seed" in settings:
+            self.random.seed(settings["seed"])
+
+    def _lookup(self, table, key):
+        target = key.split(".")[0]
+        for k in (key, target, "default"):
+            if k in table:
+                return table[k]
+        return None
+
+    # Random latency in seconds of call key e.g. "Motion.getAngle", before time_scale
+    def latency(self, key):
+        spec = self._lookup(self.config["latency"], key) or {"dist": "constant", "value": 0}
+        dist = spec.get("dist", "constant")
+        r = self.random
+        if dist == "constant":
+            value = spec["value"]
+        elif dist == "uniform":
+            value = r.uniform(spec["low"], spec["high"])
+        elif dist == "normal":
+            value = r.normalvariate(spec["mean"], spec["stddev"])
+        elif dist == "lognormal":
+            value = r.lognormvariate(spec["mu"], spec["sigma"])
+        elif dist == "exponential":
+            value = r.expovariate(1 / spec["mean"]) if spec["mean"] > 0 else 0
+        else:
+            raise ValueError("Unknown latency distribution {}".format(dist))
+        return max(0, value)
+
+    def delay(self, key):
+        seconds = self.latency(key) * self.config["time_scale"]
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def fails(self, key):
+        probability = self._lookup(self.config["failure"], key) or 0
+        return probability > 0 and self.random.random() < probability
+
+    # Elements that can be found, dictionary of MAC address to element
+    def advertised(self):
+        configured = self.config["elements"]
+        if configured == None:
+            configured = [{"name": t.name.title(), "type": t.name} for t in PlezmoElementType]
+        elements = {}
+        for e in configured:
+            element_type = PlezmoElementType[e["type"]]
+            mac = e.get("mac") or element_mac(e["name"], element_type)
+            elements[mac] = {"mac": mac, "type": element_type, "name": e["name"]}
+        return elements
+
+    def find(self, name, element_type):
+        for e in self.advertised().values():
+            if e["name"] == name and e["type"] == element_type:
+                return e
+        if self.config["elements"] == None:
+            return {"mac": element_mac(name, element_type), "type": element_type, "name": name}
+        return None
+
+    def add(self, e):
+        element = SimElement(e["name"], e["type"], e["mac"])
+        with self._lock:
+            old = self.elements.get(element.name)
+            if old != None:
+                old.stopped.set()
+            self.elements[element.name] = element
+        threading.Thread(target=self._run_element, args=(element,), daemon=True).start()
+        return element
+
+    def remove(self, name):
+        with self._lock:
+            element = self.elements.pop(name, None)
+        if element != None:
+            element.stopped.set()
+            with element.events:
+                element.events.notify_all()
+        return element
+
+    def get(self, name):
+        return self.elements.get(name)
+
+    def _event_rate(self, element):
+        rate = self.config["event_rate"]
+        if isinstance(rate, dict):
+            rate = rate.get(element.type.name, rate.get("default", 0))
+        return rate
+
+    def _next(self, rate):
+        if rate <= 0:
+            return math.inf
+        return time.monotonic() + self.random.expovariate(rate)
+
+    # Raises random events and drops the connection of an element till it is disconnected
+    def _run_element(self, element):
+        next_event = self._next(self._event_rate(element))
+        next_drop = self._next(self.config["drop_rate"] / 3600)
+        while True:
+            wait = min(next_event, next_drop) - time.monotonic()
+            if element.stopped.wait(None if wait == math.inf else max(0, wait)):
+                return
+            now = time.monotonic()
+            if now >= next_drop:
+                logger.info("Simulated element {} dropped its connection".format(element.name))
+                self.remove(element.name)
+                return
+            if now >= next_event:
+                event, details = self.random.choice(EVENTS[element.type])
+                self.raise_event(element, event, self.random.choice(details))
+                next_event = self._next(self._event_rate(element))
+
+    # Raise event on element, updating element state the event is about
+    def raise_event(self, element, event, detail=None):
+        keys = [(event, detail)]
+        if event == "onColorChange":
+            element.state["color"] = detail
+            keys.append(("onAnyColor", None))
+        elif event == "onLightEvent":
+            element.state["light_percent"] = self.random.randint(60, 100) if detail == ColorSensorLightState.BRIGHT else self.random.randint(0, 20)
+        elif event == "onDistanceEvent":
+            threshold = element.state["distance_threshold"]
+            element.state["distance"] = self.random.randint(2, threshold) if detail == DistanceEvent.NEAR else self.random.randint(threshold + 1, 200)
+        if self.event_interceptor != None:
+            self._submit(self.event_interceptor, {"name": element.name, "event": event, "detail": detail})
+        with element.events:
+            for key in keys:
+                element.event_counts[key] = element.event_counts.get(key, 0) + 1
+                for handler in element.handlers.get(key, []):
+                    self._submit(handler)
+            element.events.notify_all()
+
+    def _submit(self, handler, *args):
+        def run():
+            try:
+                handler(*args)
+            except Exception as e:
+                logger.error("Event handler failed, ex {}".format(e))
+        self._pool.submit(run)
+
+    def close(self):
+        for name in list(self.elements):
+            self.remove(name)
+
+    # Motion element readings: z and resultant follow a damped pendulum, x and y are noise
+    def pendulum(self, element):
+        p = self.config["pendulum"]
+        t = time.monotonic() - element.connected_at
+        omega = 2 * math.pi / p["period"]
+        length = GRAVITY / (omega * omega)
+        decay = math.exp(-t / p["damping"]) if p["damping"] > 0 else 1
+        amplitude = math.radians(p["amplitude"]) * decay
+        theta = amplitude * math.cos(omega * t)
+        theta_dot = -amplitude * omega * math.sin(omega * t)
+        # acceleration along the thread, the element hangs upside down so it reads it negative
+        radial = GRAVITY * math.cos(theta) + length * theta_dot * theta_dot
+        noise = p["noise"]
+        r = self.random
+        x, y, z = r.normalvariate(0, noise), r.normalvariate(0, noise), -radial + r.normalvariate(0, noise)
+        return {"theta": math.degrees(theta), Acceleration.X: x, Acceleration.Y: y, Acceleration.Z: z,
+                Acceleration.RESULTANT: math.sqrt(x * x + y * y + z * z)}
+
+sim = Simulator()
+
+# Same as configure() of the simulator, for scripts that set up the simulation themselves
+def configure(**settings):
+    sim.configure(**settings)
+
+class SimApi:
+    def __init__(self, sim):
+        self._sim = sim
+
+    def init(self, eventThreadpoolSize=EVENT_THREADS):
+        self._sim._pool = ThreadPoolExecutor(max_workers=eventThreadpoolSize)
+
+    def setEventInterceptor(self, eventInterceptor):
+        self._sim.event_interceptor = eventInterceptor
+
+    def _connect(self, key, e, name, timeoutSec):
+        if e == None:
+            # element is not advertising, a real connect keeps scanning till the timeout
+            time.sleep(timeoutSec * self._sim.config["time_scale"])
+            logger.error("Failed to connect to element {}. Please check element name and type.".format(name))
+            raise ConnectionFailedException(name)
+        self._sim.delay(key)
+        if self._sim.fails(key):
+            logger.error("Failed to connect to element {}. Please check element name and type.".format(name))
+            raise ConnectionFailedException(name)
+        return self._sim.add(e)
+
+    def connect(self, elementName, elementType, timeoutSec=30):
+        return self._connect("plezmoApi.connect", self._sim.find(elementName, elementType), elementName, timeoutSec)
+
+    def connectByMac(self, mac, elementType, timeoutSec=30):
+        e = self._sim.advertised().get(mac)
+        if e == None or e["type"] != elementType:
+            logger.error("Failed to connect with element {}".format(mac))
+            raise ConnectionFailedException(mac)
+        return self._connect("plezmoApi.connectByMac", e, mac, timeoutSec)
+
+    def disconnect(self, elementName):
+        if self._sim.remove(elementName) == None:
+            logger.error("Element to disconnect not found. The element may be disconnected already {}".format(elementName))
+            raise ElementNotFoundException(elementName)
+        self._sim.delay("plezmoApi.disconnect")
+
+    def getDiscoveredElements(self, timeout=5):
+        # like the real scan this runs for the complete timeout
+        time.sleep(timeout * self._sim.config["time_scale"])
+        return list(self._sim.advertised().values())
+
+    def getConnectedElements(self):
+        return [{"mac": e.mac, "type": e.type, "name": e.name} for e in list(self._sim.elements.values())]
+
+    def close(self):
+        self._sim.close()
+
+    def getElementByName(self, elementName):
+        return self._sim.get(elementName)
+
+# Functions common to the elements, same as plezmo.elements.plezmo_element.PlezmoElement
+class SimElementApi:
+    def __init__(self, sim, target):
+        self._sim = sim
+        self._target = target
+
+    def _element(self, elementName):
+        element = self._sim.get(elementName)
+        if element == None:
+            logger.error("Element {} not found".format(elementName))
+            raise ElementNotFoundException(elementName)
+        return element
+
+    # Send command to element, command returns func(element)
+    def _command(self, elementName, method, func=None):
+        element = self._element(elementName)
+        key = self._target + "." + method
+        with element.command_lock:
+            self._sim.delay(key)
+            if self._sim.fails(key):
+                raise CommandFailedException("{} failed for element {}".format(key, elementName))
+            if func != None:
+                return func(element)
+        return None
+
+    def _on(self, elementName, method, handler, event, detail=None):
+        def register(element):
+            with element.events:
+                element.handlers.setdefault((event, detail), []).append(handler)
+        self._command(elementName, method, register)
+
+    def _wait(self, elementName, event, detail=None):
+        element = self._element(elementName)
+        key = (event, detail)
+        with element.events:
+            count = element.event_counts.get(key, 0)
+            while element.event_counts.get(key, 0) == count:
+                if element.stopped.is_set():
+                    raise ElementNotFoundException(elementName)
+                element.events.wait(0.5)
+
+    def _set(self, elementName, method, **state):
+        self._command(elementName, method, lambda e: e.state.update(state))
+
+    def onDoubleTap(self, elementName, handler):
+        self._on(elementName, "onDoubleTap", handler, "onDoubleTap")
+
+    def onFlipEvent(self, elementName, handler, flipDirection):
+        self._on(elementName, "onFlipEvent", handler, "onFlipEvent", flipDirection)
+
+class SimMotion(SimElementApi):
+    def getAngle(self, elementName, direction):
+        def angle(e):
+            theta = self._sim.pendulum(e)["theta"] if direction == Axis.FRONT_TO_BACK else self._sim.random.normalvariate(0, 0.5)
+            return int(round(theta))
+        return self._command(elementName, "getAngle", angle)
+
+    def getAccelerometerData(self, elementName, direction):
+        return self._command(elementName, "getAccelerometerData", lambda e: int(round(self._sim.pendulum(e)[direction])))
+
+    def setTiltThreshold(self, elementName, threshold):
+        self._set(elementName, "setTiltThreshold", tilt_threshold=threshold)
+
+    def setFlatThreshold(self, elementName, threshold):
+        self._set(elementName, "setFlatThreshold", flat_threshold=threshold)
+
+    def onMotion(self, elementName, handler, motionType):
+        self._on(elementName, "onMotion", handler, "onMotion", motionType)
+
+    def onTilt(self, elementName, handler, direction):
+        self._on(elementName, "onTilt", handler, "onTilt", direction)
+
+    def onStep(self, elementName, handler):
+        self._on(elementName, "onStep", handler, "onStep")
+
+    def onFlat(self, elementName, handler):
+        self._on(elementName, "onFlat", handler, "onFlat")
+
+    def waitForMotion(self, elementName, motionType):
+        self._wait(elementName, "onMotion", motionType)
+
+    def waitForTilt(self, elementName, direction):
+        self._wait(elementName, "onTilt", direction)
+
+    def waitForStep(self, elementName):
+        self._wait(elementName, "onStep")
+
+    def waitForFlat(self, elementName):
+        self._wait(elementName, "onFlat")
+
+class SimColor(SimElementApi):
+    def onColorChange(self, elementName, handler, color):
+        self._on(elementName, "onColorChange", handler, "onColorChange", color)
+
+    def onAnyColor(self, elementName, handler):
+        self._on(elementName, "onAnyColor", handler, "onAnyColor")
+
+    def onLightEvent(self, elementName, handler, eventType):
+        self._on(elementName, "onLightEvent", handler, "onLightEvent", eventType)
+
+    def setLightThresholdPercent(self, elementName, value):
+        self._set(elementName, "setLightThresholdPercent", light_threshold=value)
+
+    def setLightThresholdLux(self, elementName, value):
+        self._set(elementName, "setLightThresholdLux", light_threshold_lux=value)
+
+    def getColor(self, elementName):
+        return self._command(elementName, "getColor", lambda e: COLOR_HEX[e.state["color"]])
+
+    def getLightValuePercent(self, elementName):
+        return self._command(elementName, "getLightValuePercent", lambda e: e.state["light_percent"])
+
+    def getLightValueLux(self, elementName):
+        return self._command(elementName, "getLightValueLux", lambda e: e.state["light_percent"] * 10)
+
+    def getLightComponentValueInLux(self, elementName, lightComponent):
+        def component(e):
+            if lightComponent == LightComponent.CLEAR:
+                return e.state["light_percent"] * 10
+            rgb = COLOR_HEX[e.state["color"]]
+            value = int(rgb[2 * lightComponent.value - 1:2 * lightComponent.value + 1], 16)
+            return value * e.state["light_percent"] * 10 // 255
+        return self._command(elementName, "getLightComponentValueInLux", component)
+
+    def waitForColorToChangeTo(self, elementName, toColor):
+        self._wait(elementName, "onColorChange", toColor)
+
+    def waitForColorChange(self, elementName):
+        self._wait(elementName, "onAnyColor")
+
+    def waitForLightEvent(self, elementName, eventType):
+        self._wait(elementName, "onLightEvent", eventType)
+
+class SimDistance(SimElementApi):
+    def setDistanceThresholdCM(self, elementName, value):
+        self._set(elementName, "setDistanceThresholdCM", distance_threshold=value)
+
+    def getDistanceCM(self, elementName):
+        def distance(e):
+            # wander a little around the last distance
+            e.state["distance"] = min(200, max(2, e.state["distance"] + self._sim.random.randint(-2, 2)))
+            return e.state["distance"]
+        return self._command(elementName, "getDistanceCM", distance)
+
+    def onDistanceEvent(self, elementName, handler, eventType):
+        self._on(elementName, "onDistanceEvent", handler, "onDistanceEvent", eventType)
+
+    def waitForDistanceEvent(self, elementName, eventType):
+        self._wait(elementName, "onDistanceEvent", eventType)
+
+class SimLight(SimElementApi):
+    def turnOn(self, elementName, color, brightness):
+        self._set(elementName, "turnOn", light_state=LightState.ON, light_color=color, brightness=brightness.value)
+
+    def setState(self, elementName, value):
+        self._set(elementName, "setState", light_state=value)
+
+    def setColor(self, elementName, color):
+        self._set(elementName, "setColor", light_color=color)
+
+    def setBrightness(self, elementName, brightness):
+        self._set(elementName, "setBrightness", brightness=brightness.value)
+
+    def getState(self, elementName):
+        return self._command(elementName, "getState", lambda e: e.state["light_state"].value)
+
+    def getBrightness(self, elementName):
+        return self._command(elementName, "getBrightness", lambda e: e.state["brightness"])
+
+    def getColor(self, elementName):
+        return self._command(elementName, "getColor", lambda e: e.state["light_color"])
+
+    def fadeIn(self, elementName, brightness, color, speed):
+        self._set(elementName, "fadeIn", light_state=LightState.ON, light_color=color, brightness=brightness.value)
+
+    def fadeOut(self, elementName, speed):
+        self._set(elementName, "fadeOut", light_state=LightState.OFF, brightness=0)
+
+class SimDisplay(SimElementApi):
+    def showImage(self, elementName, imageName):
+        self._set(elementName, "showImage", image=imageName)
+
+    def showText(self, elementName, line, alignment, text):
+        self._command(elementName, "showText", lambda e: e.state.setdefault("lines", {}).update({line: text}))
+
+    def clearDisplay(self, elementName):
+        self._set(elementName, "clearDisplay", image=None, lines={})
+
+    def paintBackgroundColor(self, elementName, color):
+        self._set(elementName, "paintBackgroundColor", background=color)
+
+    def setTextColor(self, elementName, color):
+        self._set(elementName, "setTextColor", text_color=color)
+
+    def setFontSize(self, elementName, font_size):
+        self._set(elementName, "setFontSize", font_size=font_size)
+
+class SimMusic(SimElementApi):
+    def playAudio(self, elementName, audio):
+        self._command(elementName, "playAudio")
+
+    def playAudioAndContinue(self, elementName, clipName, loopMode):
+        self._command(elementName, "playAudioAndContinue")
+
+    def playNote(self, elementName, note, beats):
+        self._command(elementName, "playNote")
+
+    def startBuzzing(self, elementName):
+        self._command(elementName, "startBuzzing")
+
+    def stopBuzzing(self, elementName):
+        self._command(elementName, "stopBuzzing")
+
+    def setInstrument(self, elementName, instrumentName):
+        self._set(elementName, "setInstrument", instrument=instrumentName)
+
+    def setTempo(self, elementName, tempo):
+        self._set(elementName, "setTempo", tempo=tempo)
+
+    def setVolume(self, elementName, volume):
+        self._set(elementName, "setVolume", volume=volume)
+
+    def mute(self, elementName):
+        self._command(elementName, "mute")
+
+    def unmute(self, elementName):
+        self._command(elementName, "unmute")
+
+    def stop(self, elementName):
+        self._command(elementName, "stop")
+
+    def getVolume(self, elementName):
+        return self._command(elementName, "getVolume", lambda e: e.state["volume"].value)
+
+    def getTempo(self, elementName):
+        return self._command(elementName, "getTempo", lambda e: e.state["tempo"].value)
+
+    def getInstrument(self, elementName):
+        return self._command(elementName, "getInstrument", lambda e: e.state["instrument"].value)
+
+class SimMotor(SimElementApi):
+    def start(self, elementName, speed, direction):
+        self._set(elementName, "start", motor_speed=speed, motor_direction=direction)
+
+    def startWithRPM(self, elementName, speed, direction):
+        self._set(elementName, "startWithRPM", motor_speed=speed, motor_direction=direction)
+
+    def stop(self, elementName):
+        self._set(elementName, "stop", motor_speed=None)
+
+    def rotate(self, elementName, numRotations, direction):
+        self._command(elementName, "rotate")
+
+    def onStall(self, elementName, handler):
+        self._on(elementName, "onStall", handler, "onStall")
+
+plezmoApi = SimApi(sim)
+Motion = SimMotion(sim, "Motion")
+Color = SimColor(sim, "Color")
+Light = SimLight(sim, "Light")
+Display = SimDisplay(sim, "Display")
+Music = SimMusic(sim, "Music")
+Motor = SimMotor(sim, "Motor")
+Distance = SimDistance(sim, "Distance")
+
+globalHandler = None
+
+# Same as plezmo.registerExceptionHandler()
+def registerExceptionHandler(handler):
+    global globalHandler
+    globalHandler = handler
+
+# Same as plezmo.PlezmoEventHandler, exceptions in event handlers go to the global handler
+def PlezmoEventHandler(func):
+    def eventHandler(*args, **kwargs):
+        try:
+            func(*args, **kwargs)
+        except ElementNotFoundException as e:
+            if globalHandler != None:
+                globalHandler(e)
+            else:
+                raise e
+    return eventHandler
@@ -0,0 +1,388 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Copies of the enums, value types and exceptions of the plezmo package that can be used
+# without importing plezmo. Importing anything from plezmo initializes BLE and needs the
+# Plezmo wireless adapter, these are for code that talks to the elements some other way
+# (e.g. through broker.py). Names and values are the same as in the plezmo package.
+import logging
+from enum import Enum
+
+class Logger:
+    def __init__(self):
+        logging.basicConfig(format='%(asctime)s %(thread)d %(levelname)s %(message)s', level=logging.INFO)
+    def info(self, message):
+        logging.info(message)
+    def error(self, message):
+        logging.error(message)
+    def debug(self, message):
+        logging.debug(message)
+
+# plezmo.plezmo_exceptions.exceptions
+class PlezmoInvalidStateException(Exception):
+    def __init__(self, msg=None):
+        super().__init__(msg)
+
+class ElementNotFoundException(Exception):
+    def __init__(self, name=None):
+        super().__init__(name)
+
+class ConnectionFailedException(Exception):
+    def __init__(self, name=None):
+        super().__init__(name)
+
+class PlezmoAdapterNotFoundException(Exception):
+    def __init__(self, msg=None):
+        super().__init__(msg)
+
+class CommandFailedException(Exception):
+    def __init__(self, msg=None):
+        super().__init__(msg)
+
+# plezmo.elements.element_types
+class PlezmoElementType(Enum):
+    MOTOR = 0x09
+    COLOR = 0x0D
+    MUSIC = 0x07
+    MOTION = 0x06
+    DISPLAY = 0x03
+    DISTANCE = 0x0E
+    LIGHT = 0x02
+
+# plezmo.elements.plezmo_element
+class Flip(Enum):
+    UP = 5
+    DOWN = 6
+
+# plezmo.elements.plezmo_motion
+class Tilt(Enum):
+    LEFT = 1
+    RIGHT = 2
+    FRONT = 3
+    BACK = 4
+
+class Movement(Enum):
+    START = 5
+    STOP = 7
+
+class Axis(Enum):
+    LEFT_TO_RIGHT = 2
+    FRONT_TO_BACK = 3
+
+class Acceleration(Enum):
+    X = 0
+    Y = 1
+    Z = 2
+    RESULTANT = 3
+
+# plezmo.elements.plezmo_distance
+class DistanceEvent(Enum):
+    NEAR = 1
+    FAR = 2
+
+# plezmo.elements.plezmo_color
+class LightComponent(Enum):
+    RED = 1
+    GREEN = 2
+    BLUE = 3
+    CLEAR = 4
+
+class ColorSensorLightState(Enum):
+    BRIGHT = 1
+    DARK = 2
+    UNKNOWN = -1
+
+class ColorSensorColor(Enum):
+    RED = 1
+    GREEN = 2
+    BLUE = 3
+    YELLOW = 4
+    WHITE = 5
+    PINK = 6
+    ORANGE = 7
+    UNKNOWN = -1
+
+# plezmo.elements.plezmo_light
+class LightState(Enum):
+    ON = 1
+    OFF = 0
+
+class LightFadeSpeed(Enum):
+    SLOW = 4
+    MEDIUM = 2
+    FAST = 1
+
+class Percentage():
+    def __init__(self, val):
+        self.value = val
+
+class LightColor():
+    def __init__(self, val):
+        self.value = val
+
+# plezmo.elements.plezmo_display
+class TextAlignment(Enum):
+    LEFT = 0
+    CENTER = 1
+    RIGHT = 2
+
+class DisplayBackground(Enum):
+    RED = 0
+    GREEN = 1
+    BLUE = 2
+    YELLOW = 3
+    WHITE = 4
+    BLACK = 5
+    CYAN = 6
+    MAGENTA = 7
+
+class FontSize(Enum):
+    SMALL = 0
+    MEDIUM = 1
+
+class DisplayImage(Enum):
+    GRINNING_FACE = 50
+    SAVOURING_FOOD = 1
+    FACE_WITH_TONGUE = 2
+    TEARS_OF_JOY = 3
+    SCARED_FACE = 4
+    FROWNING_FACE = 5
+    CRYING_FACE = 6
+    POUTING_FACE = 7
+    THUMBS_UP = 8
+    THUMBS_DOWN = 9
+    FISTED_HAND = 10
+    PEDESTRIAN_WALKING = 11
+    RUNNER = 12
+    BICYCLIST = 13
+    MUSICAL_NOTES = 14
+    KEYBOARD = 15
+    SAXOPHONE = 16
+    TRUMPET = 17
+    VIOLIN = 18
+    GUITAR = 19
+    DRUM = 20
+    PLAY = 21
+    STOP = 22
+    PREVIOUS = 23
+    NEXT = 24
+    CLOCKWISE = 25
+    ANTICLOCKWISE = 26
+    UP = 27
+    LEFT = 28
+    DOWN = 29
+    RIGHT = 30
+    SUNNY = 31
+    CLOUDY = 32
+    LOCK = 33
+    UNLOCK = 34
+    TROPHY = 35
+    MEDAL = 36
+    ALARM_CLOCK = 37
+    BIRTHDAY_CAKE = 38
+    BULLSEYE = 39
+    INBOX = 40
+    DINNER_PLATE = 41
+    WARNING = 42
+    DANGER = 43
+    STOP_SIGN = 44
+    CHILDREN_CROSSING = 45
+    NO_PEDESTRIANS = 46
+    CHECK_MARK = 47
+    CROSS_MARK = 48
+    NO_ENTRY = 49
+    PLEZMO = 0
+    CUSTOM_IMAGE_0 = 100
+    CUSTOM_IMAGE_1 = 101
+    CUSTOM_IMAGE_2 = 102
+    CUSTOM_IMAGE_3 = 103
+    CUSTOM_IMAGE_4 = 104
+    CUSTOM_IMAGE_5 = 105
+    CUSTOM_IMAGE_6 = 106
+    CUSTOM_IMAGE_7 = 107
+    CUSTOM_IMAGE_8 = 108
+    CUSTOM_IMAGE_9 = 109
+
+class DisplayLine(Enum):
+    ONE = 1
+    TWO = 2
+    THREE = 3
+    FOUR = 4
+    FIVE = 5
+
+# plezmo.elements.plezmo_music
+class Audio(Enum):
+    CAT = 0
+    DOG = 1
+    ROOSTER = 2
+    HEN = 3
+    DONKEY = 4
+    SHEEP = 5
+    BIRDS_SONG = 6
+    BIRDS_CHIRPING = 7
+    HAND_BELL = 8
+    DING_BELL = 9
+    SCHOOL_BELL = 10
+    CATHEDRAL_BELL = 11
+    POLICE_SIREN = 12
+    FIRE_ENGINE_BELL = 13
+    ALARM_1 = 14
+    ALARM_2 = 15
+    ALARM_3 = 16
+    FUNNY_LAUGH = 17
+    VILLAINISH_LAUGH = 18
+    COUNTDOWN = 19
+    CLAPPING = 20
+    YES = 21
+    NO = 22
+    SCREAM = 23
+    CUCKOO_CLOCK = 24
+    CLOCK_TOLL = 25
+    CLOCK_TICK = 26
+    GRANDFATHER_CLOCK = 27
+    CAR_HORN = 28
+    TRAIN_HORN = 29
+    WATER_SPLASH = 30
+    WATER_BOILING = 31
+    WIND = 32
+    RAIN = 33
+    SYNTH_MUSIC_LOOP_1 = 45
+    SYNTH_MUSIC_LOOP_2 = 48
+    PIANO_LOOP_1 = 46
+    PIANO_LOOP_2 = 50
+    PIANO_LOOP_3 = 51
+    PIANO_LOOP_4 = 53
+    DRUM_LOOP_1 = 34
+    DRUM_LOOP_2 = 35
+    DRUM_LOOP_3 = 39
+    VIOLIN_LOOP_1 = 40
+    VIOLIN_LOOP_2 = 47
+    VIOLIN_LOOP_3 = 52
+    HIPHOP_LOOP_1 = 41
+    HIPHOP_LOOP_2 = 49
+    ROCK_GUITAR_LOOP_1 = 42
+    ROCK_GUITAR_LOOP_2 = 43
+    ELECTRONIC_BEATS_LOOP = 44
+    CHRISTMAS_BELLS_LOOP = 37
+    BAGPIPES_LOOP = 38
+    FUNLY_BRASS_MUSIC = 36
+    BRASS_MUSIC = 54
+    DRUM_ROLL = 55
+    CUSTOM_AUDIO_0 = 100
+    CUSTOM_AUDIO_1 = 101
+    CUSTOM_AUDIO_2 = 102
+    CUSTOM_AUDIO_3 = 103
+    CUSTOM_AUDIO_4 = 104
+    CUSTOM_AUDIO_5 = 105
+    CUSTOM_AUDIO_6 = 106
+    CUSTOM_AUDIO_7 = 107
+    CUSTOM_AUDIO_8 = 108
+    CUSTOM_AUDIO_9 = 109
+
+class Tempo(Enum):
+    SLOW = 60
+    MEDIUM = 120
+    FAST = 240
+
+class Instrument(Enum):
+    PIANO = 0
+    ELECTRIC_GRAND_PIANO = 1
+    CLAVI = 7
+    GLOCKENSPIEL = 9
+    TUBULAR_BELLS = 14
+    CHURCH_ORGAN = 19
+    ACCORDION = 21
+    GUITAR = 24
+    GUITAR_HARMONICS = 31
+    SLAP_BASS_1 = 36
+    VIOLIN = 40
+    SYNTH_VOICE = 54
+    MUTED_TRUMPET = 59
+    BRASS_SECTION = 61
+    OBOE = 68
+    ENGLISH_HORN = 69
+    FLUTE = 73
+    CHARANG_LEAD = 84
+    FIFTHS_LEAD = 86
+    HALO = 94
+    RAIN = 96
+    CRYSTAL = 98
+    ATMOSPHERE = 99
+    SITAR = 104
+    BAGPIPE = 109
+    TINKLE_BELL = 112
+    REVERSE_CYMBALL = 119
+    GUITAR_FRET_NOISE = 120
+    BIRD_TWEET = 123
+    TELEPHONE_RING = 124
+    APPLAUSE = 126
+
+class Volume(Enum):
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+
+class Note():
+    def __init__(self, val):
+        self.value = val
+
+class AudioLoop(Enum):
+    ONCE = 0
+    CONTINUOUS = 1
+
+# plezmo.elements.plezmo_motor
+class MotorEvent(Enum):
+    STALL = 1
+
+class MotorDirection(Enum):
+    CLOCKWISE = 2
+    ANTICLOCKWISE = 3
+
+class MotorRotation(Enum):
+    QUARTER = 1
+    HALF = 2
+    ONE = 4
+    TWO = 8
+    THREE = 12
+
+class MotorSpeed(Enum):
+    HIGH = 100
+    MEDIUM = 50
+    SLOW = 25
+
+# Classes that wrap a single value, passed to and returned from element commands
+VALUE_TYPES = ["Percentage", "LightColor", "Note"]
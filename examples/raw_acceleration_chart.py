@@ -37,7 +37,7 @@
 
 
 # Real-time charting of RAW Acceleration data from Motion sensor.
-# This example requires a Python 3.7 setup with some basic libraries setup (see the imports below).
+# This example requires a Python 3.7 setup with numpy and matplotlib (see the imports below).
 # A Motion sensor needs to be available for the experiment.
 
 # A simple experiment setup to study the pendulum behavior with raw-acceleration data is as follows.
@@ -47,85 +47,189 @@
 # Now, hold the attachment at a swing angle with the thread taught and start this experiment.
 # As soon as the chart shows up, release the attachment (with the attached Motion sensor)
 # without any extra jerks or force to start the swinging.
+# Note: A motion_inverted configuration variable is set to True in the script below to account for
+# the inverted position of the motion element suspended as described above. Depending on how you
+# setup your experiment you might want to set that to False.
 
-# When you want to end the experiment, press 'q' in the chart window.
-# This will exit the program and dump a motion-raw-accel-data.csv data file for the session.
+# This program will connect with the specified Motion sensor and read RAW z-axis and resultant
+# acceleration values in a background thread as fast as the element answers, both axes of a
+# sample requested together (see acceleration.AxisReader). Samples are stamped with the middle
+# of their read on a monotonic clock. The chart is updated with the samples read since the last
+# frame, against time, and shows:
+#  - the latest width samples of both axes
+#  - the sampling rate, read latency and a histogram of the intervals between samples
+#  - the pendulum period, frequency and damping ratio, worked out from the z-axis samples while
+#    they come in (see oscillation.OscillationAnalyzer). The z acceleration swings twice in
+#    every swing of the pendulum, so its period is half the pendulum period. The damping ratio
+#    shows up once enough swings have been seen to tell it from noise.
+#  - an overview of the whole session, reduced to the lowest and highest samples of up to a few
+#    thousand stretches of it (see acceleration.MinMaxDecimator), so that drawing it takes the
+#    same time however long the session runs.
+# Samples are written to a motion-raw-accel-data.csv data file while the session runs (--out
+# picks another file, a .npy file is smaller and faster to load with numpy.load), so a long
+# session runs in bounded memory and a crash loses at most the last second of samples. The
+# sampling statistics and pendulum results are kept with it, in the .json file next to it.
+
+# Several Motion sensors can be given, e.g. for coupled pendulums or vibration at several points:
+#   python raw_acceleration_chart.py Motion1 Motion2
+# Each element is read by its own background thread, so that one does not slow down the others,
+# and all samples are stamped on the same clock so that they line up in the chart and the capture
+# files (one per element, motion-raw-accel-data-Motion1.csv etc.).
+
+# The program will continue fetching and showing these lines as long as 'q' is not pressed in the
+# chart window. SPACE pauses the chart while sampling and capture go on. While paused the left and
+# right arrow keys scroll through the latest samples (history_size of them), SPACE goes back to live.
+
+# With --headless no chart is shown and matplotlib is not needed: the axes given with --axes
+# (default z,r) are read as fast as the element answers and written straight to the capture
+# file, for --duration seconds or --samples samples or till Ctrl-C, e.g. on a Raspberry Pi
+#   python raw_acceleration_chart.py Motion --headless --axes x,y,z,r --duration 600 --out swing.npy
 
 # You can do the same charting with any other acceleration experiments.
 # Note that this script charts only the Z-axis and Resultant raw samples.
 # You can edit the code below to suit your requirements.
-# Note: A motion_inverted configuration variable is set to True in the script below to account for
-# the inverted position of the motion element suspended as described above. Depending on how you
-# setup your experiment you might want to set that to False.
-
-# This program will connect with the specified Motion sensor
-# and fetch a batch of RAW z-axis and resultant acceleration values.
-# It will then update a chart with these against time.
-# The program will continue fetching and showing these lines as long as 'q' is not pressed in the chart context.
 
+import os
 import time
 import traceback
-import sys
 import math
-import pandas as pd
-import matplotlib.animation as animation
-import matplotlib.pyplot as plt
+import argparse
 
-# Generic Plezmo SDK imports.
-from plezmo import *
-import plezmo.utils.logger as pzLogger
-import plezmo as pz
-import plezmo.elements.element_types as pzType
-from plezmo.elements.plezmo_motion import *
+# Generic Plezmo SDK imports, plezmo is loaded when it is first used.
+from plezmo_backend import *
+import plezmo_backend as pz
+
+import utils
 
 # Configurations.
 motion_inverted = True ## Correction for inverted swinging Motion element w.r.t resultant data
-cfgsize = (14,6) # inches
+cfgsize = (14,8) # inches
 width = 100 # data-points across the chart
-ani_interval = 1 # msec update interval
+history_size = 30000 # samples kept to scroll back through while paused, minutes of them
+max_fps = 60 # chart frame rate cap, no use going above the display refresh rate (--fps)
+use_blit = True # redraw only the lines and texts on each frame (--no-blit draws everything)
 OutFile = 'motion-raw-accel-data.csv'
+headless = False # capture without the chart (--headless)
+axes = ['z', 'r'] # axes captured, x, y, z and r for the resultant (--axes, headless only)
+duration = None # seconds to capture headless (--duration), None till Ctrl-C
+sample_count = None # samples to capture headless (--samples)
+
+# Acceleration axes by their --axes name
+AXES = {'x': 'X', 'y': 'Y', 'z': 'Z', 'r': 'RESULTANT'}
 
 # Globals.
-x_data, y_data, y2_data = [], [], []  # x,y,y2 data arrays
+channels = [] # one Channel for each Motion element, the first one sets the time span shown
 g_paused = False
+g_view_end = 0 # while paused, the chart shows the width samples of the first element before this sample number
+g_redraw = False # draw again even without new samples, e.g. after scrolling
+frames = None # chart frames drawn, an acceleration.RateCounter
 # Global time tracking variables
 gTime = 0
 rTime = 0
 
+# One Motion element: its own sampler thread, capture file and what the chart shows of it.
+# All elements are stamped with ref_time(), so their samples line up in time.
+class Channel:
+    def __init__(self, name, out_file):
+        self.name = name
+        self.out_file = out_file
+        # Samples go to out_file as they are read, the chart only keeps the latest of them.
+        # Opened first, it is what fails for a bad --out.
+        self.writer = capture.CaptureWriter(out_file, ['t'] + axes, ['%.9f'] + ['%d'] * len(axes),
+                                            metadata={"motion": name, "elements": list(element_names)})
+        self.reader = acceleration.AxisReader(name, [getattr(Acceleration, AXES[a]) for a in axes], ref_time)
+        self.z = axes.index('z') + 1 if 'z' in axes and motion_inverted else None
+        # sample_count is set only headless, the chart samples till it is closed
+        self.sampler = acceleration.Sampler(self.read, len(axes) + 1, sink=self.writer.append, count=sample_count)
+        self.history = acceleration.RingBuffer(history_size, 3) # latest samples (t, z, r), the chart shows width of them
+        self.overview = acceleration.MinMaxDecimator(3) # all samples of the session, decimated for the overview
+        self.analyzer = oscillation.OscillationAnalyzer() # pendulum analysis of the z-axis samples
+
+    # Runs in the sampler thread, one sample per call
+    def read(self):
+        # For the Pendulum experiment we are looking at the Z-axis and Resultant data
+        row = self.reader.read()
+        #print(f' {row}')
+        if self.z != None:
+            row[self.z] = -row[self.z]
+        return row
+
+    # Pendulum figures from the analysis of the z-axis, which swings at twice the pendulum frequency
+    def pendulum_result(self):
+        result = self.analyzer.result()
+        return {
+            "period": 2 * result["period"] if result["period"] != None else None,
+            "frequency": result["frequency"] / 2 if result["frequency"] != None else None,
+            "fft_period": 2 / result["fft_frequency"] if result["fft_frequency"] else None,
+            "damping": result["damping"],
+            "damping_error": result["damping_error"],
+            "cycles": result["cycles"],
+        }
+
+    def close(self):
+        self.sampler.stop()
+        self.reader.close()
+        self.writer.set_metadata("sampling", self.reader.stats.summary())
+        self.writer.close()
+        pzLog.info(f'Wrote {self.writer.rows} samples of {self.name} to {self.out_file}')
+
+# Capture file of an element, OutFile for one element, OutFile with the element name added for more
+def capture_file(name):
+    if len(element_names) == 1:
+        return OutFile
+    root, ext = os.path.splitext(OutFile)
+    return f'{root}-{name}{ext}'
+
 # Functions.
 # Init bluetooth communication
 def init(element_names):
     # Register global exception handler
     pz.registerExceptionHandler(globalExceptionHandler)
     # Elements to connect
-    elementList = [
-        {"name" : element_names["motion"], "type": pzType.PlezmoElementType.MOTION},
-    ]
-    connectedElements = []
+    elementList = [{"name" : name, "type": pz.PlezmoElementType.MOTION} for name in element_names]
     try:
-        # connect to elements one by one
-        for e in elementList:
-            pz.plezmoApi.connect(e["name"], e["type"])
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-        return True
+        return utils.ElementSession(elementList).connect()
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         print(f'Err! Failed to connect to element, ex {e}')
         #traceback.print_exc()
-        # Disconnect already connected elements
-        for e in connectedElements:
-            pz.plezmoApi.disconnect(e["name"])
-        return False
+        return None
 
 def extract_element_names():
-    motion_name = None
-    if len(sys.argv) < 2:
+    global max_fps, use_blit, OutFile, headless, axes, duration, sample_count
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('motion', nargs='*')
+    parser.add_argument('--fps', type=float, default=max_fps)
+    parser.add_argument('--no-blit', action='store_true')
+    parser.add_argument('--out', default=OutFile)
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--axes', default=','.join(axes))
+    parser.add_argument('--duration', type=float)
+    parser.add_argument('--samples', type=int)
+    args = parser.parse_args()
+    if len(args.motion) == 0:
         print('Error 1')
         return None
-    else:
-        motion_name = sys.argv[1]
-        return {"motion": motion_name}
+    if len(set(args.motion)) != len(args.motion):
+        print(f'Err! Motion elements are given more than once')
+        exit(1)
+    axes = args.axes.lower().split(',')
+    if any(a not in AXES for a in axes) or len(set(axes)) != len(axes):
+        print(f'Err! --axes takes a list of {",".join(AXES)}')
+        exit(1)
+    if not args.headless and axes != ['z', 'r']:
+        print(f'Err! The chart shows the z and r axes, --axes needs --headless')
+        exit(1)
+    if not args.headless and (args.duration != None or args.samples != None):
+        print(f'Err! The chart runs till it is closed, --duration and --samples need --headless')
+        exit(1)
+    headless = args.headless
+    duration = args.duration
+    sample_count = args.samples
+    max_fps = args.fps
+    use_blit = not args.no_blit
+    OutFile = args.out
+    return args.motion
 
 # All unhandled exceptions from event handlers will be directed to this handler
 def globalExceptionHandler(e):
@@ -135,133 +239,252 @@ def globalExceptionHandler(e):
 def mark_time():
     global gTime
     gTime = time.time()
+# Nanoseconds since ref_time(True), from the monotonic clock so that wall clock changes do not move it
 def ref_time(set=False):
     global rTime
     if set is True:
-        rTime = time.time()
+        rTime = time.monotonic_ns()
     else:
-        lt = time.time()
-        return round((lt - rTime),6) # usec resolution
+        return time.monotonic_ns() - rTime
 
 def keypress(event):
-    global g_paused
+    global g_paused, g_view_end, g_redraw
     print(f'Keypress... {event.key}')
-    if event.key == ' ': # SPACE controls pause -- TODO
+    history = channels[0].history
+    if event.key == ' ': # SPACE controls pause
         g_paused ^= True
-
-def refresh(frame):
-    global dataset, width, x_data, y_data, y2_data
-    #print(f'Refresh> {dataset.shape}')
-
-    if g_paused:
-        print(f'Paused...')
-        time.sleep(1) # slowdown animation checks
-        return line, line2
-
-   # pzLog.info(f'Fetching Motion Accl data...')
-    rows = []
-    for i in range(5):
-		# For the Pendulum experiment we are looking at the Z-axis and Resultant data
-        z = Motion.getAccelerometerData(motion_name, Acceleration.Z)
-        r = Motion.getAccelerometerData(motion_name, Acceleration.RESULTANT)
-        t = ref_time()
-        #print(f' {i:3} {t:10.3f} {z:10} {r:10}')
-        row = [ t, -z if motion_inverted else z, r]
-        rows.append(row)
-
-    dataset = pd.concat([dataset, pd.DataFrame(rows, columns=['t','z','r'])])
-   
-    if (dataset.shape[0] < width):
-        x_data = list(dataset['t'])
-        y_data = list(dataset['z'])
-        y2_data = list(dataset['r'])
+        g_view_end = history.total
+    elif event.key in ('left', 'right'): # scroll by half a chart, pausing if live
+        if not g_paused:
+            g_paused = True
+            g_view_end = history.total
+        g_view_end += width // 2 if event.key == 'right' else -(width // 2)
     else:
-        x_data = list(dataset['t'][-width:])
-        y_data = list(dataset['z'][-width:])
-        y2_data = list(dataset['r'][-width:])
-
-    line.set_data(x_data, y_data)
-    line2.set_data(x_data, y2_data)
-
-    fig.gca().relim()
-    fig.gca().autoscale_view()
-    return line, line2
-
-# Handlers that keep the program running.
-@pz.PlezmoEventHandler
-def move_handler():
-    pzLog.info(f'  {motion_name} moved ...')
-    return mark_time()
-@pz.PlezmoEventHandler
-def stop_handler():
-    pzLog.info(f'  {motion_name} STOP received.')
-    return mark_time()
-@pz.PlezmoEventHandler
-def l_tilt_handler():
-    pzLog.info(f'  {motion_name} Left tilt')
-    return mark_time()
-@pz.PlezmoEventHandler
-def r_tilt_handler():
-    pzLog.info(f'  {motion_name} Right tilt')
-    return mark_time()
-@pz.PlezmoEventHandler
-def f_tilt_handler():
-    pzLog.info(f'  {motion_name} Front tilt')
-    return mark_time()
-@pz.PlezmoEventHandler
-def b_tilt_handler():
-    pzLog.info(f'  {motion_name} Back tilt')
-    return mark_time()
-@pz.PlezmoEventHandler
-def flat_handler():
-    pzLog.info(f'  {motion_name} Flat.')
-    return mark_time()
+        return
+    # stay within the samples kept
+    oldest = history.total - len(history)
+    g_view_end = min(max(g_view_end, oldest + min(width, len(history))), history.total)
+    g_redraw = True
+
+def refresh():
+    global g_redraw
+    #print(f'Refresh> {channels[0].history.total}')
+
+    # Only take what the samplers have read since the last frame, reading is not done here.
+    # Samples keep coming in while paused, only the view of them stays.
+    new = False
+    for c in channels:
+        rows = c.sampler.drain()
+        if len(rows) > 0:
+            # Adding samples costs the same however long the session has run
+            c.history.extend(rows)
+            c.overview.extend(rows)
+            c.analyzer.add(rows[:, :2])
+            new = True
+    if not new and not g_redraw:
+        return # nothing new to draw
+    g_redraw = False
+
+    # The first element sets the time span shown, the others show their samples of that span
+    history = channels[0].history
+    end = len(history)
+    if g_paused:
+        # samples older than history_size are gone, the view then moves on with the oldest
+        end = max(end - (history.total - g_view_end), min(width, end))
+    span = slice(max(end - width, 0), end)
+    t = history.view()[0, span]
+    if len(t) == 0:
+        return
+    low, high = math.inf, -math.inf
+    texts = []
+    status = []
+    hist_max = 0
+    for c in channels:
+        data = c.history.view()
+        if c is not channels[0]:
+            span = slice(data[0].searchsorted(t[0], side='left'), data[0].searchsorted(t[-1], side='right'))
+        ct, z, r = data[:, span]
+        c.line.set_data(ct, z)
+        c.line2.set_data(ct, r)
+        if len(ct) > 0:
+            low, high = min(low, z.min(), r.min()), max(high, z.max(), r.max())
+        timing = c.reader.stats.summary()
+        c.writer.set_metadata("sampling", timing)
+        latency, interval = timing["latency_ms"], timing["interval_ms"]
+        status.append(f'{c.name + ": " if len(channels) > 1 else ""}{timing["rate"]:.1f} samples/s  interval {interval["mean"]:.1f} ms \u00b1{interval["std"]:.1f}'
+                      f'  read latency p50 {latency["p50"]:.1f} ms p95 {latency["p95"]:.1f} ms  dropped {c.sampler.dropped}')
+        c.hist_line.set_ydata(timing["histogram"]["counts"])
+        hist_max = max(hist_max, max(timing["histogram"]["counts"]))
+        pendulum = c.pendulum_result()
+        c.writer.set_metadata("pendulum", pendulum)
+        if pendulum["period"] != None:
+            text = f'{c.name + ": " if len(channels) > 1 else ""}Pendulum period {pendulum["period"]:.3f} s  frequency {pendulum["frequency"]:.3f} Hz'
+            if pendulum["fft_period"] != None:
+                text += f'  (FFT {pendulum["fft_period"]:.3f} s)'
+            if pendulum["damping"] != None:
+                text += f'  damping ratio {pendulum["damping"]:.4f} \u00b1{pendulum["damping_error"]:.4f} over {pendulum["cycles"]} swings'
+            texts.append(text)
+    analysis.set_text('\n'.join(texts))
+    paused = 'PAUSED  \u2190 \u2192 scroll, SPACE for live    ' if g_paused else ''
+    stats.set_text(paused + '    '.join(status) + f'    {frames.rate():.1f} frames/s')
+
+    # Axes are rescaled, and the whole chart drawn, only when the data leaves the limits
+    rescaled = x_scaler.update(t[0], t[-1])
+    rescaled = y_scaler.update(low, high) or rescaled
+    rescaled = hist_scaler.update(0, hist_max) or rescaled
+    start, stop, low, high = math.inf, -math.inf, math.inf, -math.inf
+    for c in channels:
+        ot, oz = c.overview.view(0)
+        ot2, or2 = c.overview.view(1)
+        c.overview_line.set_data(ot, oz)
+        c.overview_line2.set_data(ot2, or2)
+        if len(ot) > 0:
+            start, stop = min(start, ot[0]), max(stop, ot[-1])
+            low, high = min(low, oz.min(), or2.min()), max(high, oz.max(), or2.max())
+    if start < stop:
+        rescaled = overview_x_scaler.update(start, stop) or rescaled
+        rescaled = overview_y_scaler.update(low, high) or rescaled
+    renderer.draw(full=rescaled)
+    frames.add()
+
+# Headless capture, no chart: samples are read as fast as the elements answer and written
+# straight to the capture files till duration seconds or sample_count samples are done, or Ctrl-C.
+def run_headless():
+    ref_time(True)
+    start = time.monotonic()
+    report_at = start + 5
+    pzLog.info(f'Capturing {",".join(axes)} of {", ".join(element_names)}, Ctrl-C to stop')
+    for c in channels:
+        c.sampler.start()
+    try:
+        while any(c.sampler.running() for c in channels):
+            now = time.monotonic()
+            if duration != None and now - start >= duration:
+                break
+            if now >= report_at:
+                pzLog.info('  ' + ', '.join(f'{c.name} {c.sampler.samples.total} samples {c.sampler.samples.rate():.1f}/s' for c in channels))
+                report_at = now + 5
+            time.sleep(0.1)
+            # samples are in the capture files already
+            for c in channels:
+                c.sampler.drain()
+    except KeyboardInterrupt:
+        pzLog.info(f'Stopped.')
+    for c in channels:
+        c.sampler.stop()
+    elapsed = time.monotonic() - start
+    for c in channels:
+        count = c.sampler.samples.total
+        timing = c.reader.stats.summary()
+        latency = timing["latency_ms"]
+        pzLog.info(f'Captured {count} samples of {c.name} in {elapsed:.1f} s, {count / elapsed if elapsed > 0 else 0:.1f} samples/s,'
+                   f' read latency p50 {latency["p50"]:.1f} ms p95 {latency["p95"]:.1f} ms,'
+                   f' interval jitter {timing["interval_ms"]["std"]:.2f} ms, {c.sampler.errors} errors')
+
+# Handlers that keep the program running, for element name
+def event_handler(name, what):
+    @pz.PlezmoEventHandler
+    def handler():
+        pzLog.info(f'  {name} {what}')
+        return mark_time()
+    return handler
 
 # Main.
-pzLog = pzLogger.Logger()
-pzLog.info(f'Begin.')
+pzLog = pz.Logger()
+utils.handle_options('python raw_acceleration_chart.py <Motion element name> [<Motion element name> ...]'
+                     ' [--fps FPS] [--no-blit] [--out FILE] [--headless [--axes z,r] [--duration SECS] [--samples N]]')
 element_names = extract_element_names()
 if element_names is None:
-    pz.plezmoApi.close()
-    print(f'Err! Need one argument <Motion element>')
+    print(f'Err! Need at least one argument <Motion element>')
     exit(1)
+if utils.dry_run(element_names):
+    exit(0)
+pzLog.info(f'Begin.')
 pzLog.info(f'Looking for: {element_names}')
 
+# Charting libraries take a while to import, they are imported once the arguments are fine
+# and only for the chart. The helpers use numpy, which is slow to import too.
+import acceleration
+import capture
+import live_chart
+import oscillation
+frames = acceleration.RateCounter()
+if not headless:
+    import matplotlib.pyplot as plt
+
 # Init bluetooth communication and connect to elements
-retval = init(element_names)
-if not retval:
-    pz.plezmoApi.close()
+session = init(element_names)
+if session is None:
     print(f'Err! Could not connect to all the required elements!')
     exit(0)
 
-motion_name = element_names["motion"]
-
 # Register event handlers in a try-except-finally form.
 try:
-    pz.Motion.onMotion(motion_name, move_handler, Movement.START)
-    pz.Motion.onMotion(motion_name, stop_handler, Movement.STOP)
-    pz.Motion.onTilt(motion_name, l_tilt_handler, Tilt.LEFT)
-    pz.Motion.onTilt(motion_name, r_tilt_handler, Tilt.RIGHT)
-    pz.Motion.onTilt(motion_name, f_tilt_handler, Tilt.FRONT)
-    pz.Motion.onTilt(motion_name, b_tilt_handler, Tilt.BACK)
-
-    dataset = pd.DataFrame(columns=[i for i in range(3)])
-    dataset.rename(columns={0:'t',1:'z',2:'r'}, inplace=True)
-
-    # Setup Animated Charting.
-    fig = plt.figure(figsize=cfgsize)
-    fig.canvas.mpl_connect('key_press_event', keypress)
-    line,line2 = plt.plot(x_data, y_data, 'r-',  x_data, y2_data, 'b-',  linewidth=1)
-    plt.legend([line,line2], ['z-axis','Resultant'])
-    plt.title('Charting RAW Acceleration from Motion sensor')
-    plt.xlabel('Time (secs)')
-    plt.ylabel('Accel (mm/sq_sec)')
-    ref_time(True)
-    ani = animation.FuncAnimation(fig, refresh, interval=ani_interval)
-    plt.tight_layout()
-    plt.show()
-    dataset.reset_index(inplace=True, drop=True)
-    dataset.to_csv(OutFile, encoding='utf-8')
+    # Each element is read in the background by its own sampler. If a capture file cannot be
+    # opened, the channels created so far are closed and the elements disconnected below.
+    for name in element_names:
+        channels.append(Channel(name, capture_file(name)))
+    if headless:
+        run_headless()
+    else:
+        for name in element_names:
+            pz.Motion.onMotion(name, event_handler(name, 'moved ...'), Movement.START)
+            pz.Motion.onMotion(name, event_handler(name, 'STOP received.'), Movement.STOP)
+            pz.Motion.onTilt(name, event_handler(name, 'Left tilt'), Tilt.LEFT)
+            pz.Motion.onTilt(name, event_handler(name, 'Right tilt'), Tilt.RIGHT)
+            pz.Motion.onTilt(name, event_handler(name, 'Front tilt'), Tilt.FRONT)
+            pz.Motion.onTilt(name, event_handler(name, 'Back tilt'), Tilt.BACK)
+
+        # Setup Animated Charting.
+        # the arrow keys scroll the paused chart instead of going through the zoom history
+        for keymap in ('keymap.back', 'keymap.forward'):
+            plt.rcParams[keymap] = [k for k in plt.rcParams[keymap] if k not in ('left', 'right')]
+        fig = plt.figure(figsize=cfgsize)
+        fig.canvas.mpl_connect('key_press_event', keypress)
+        grid = fig.add_gridspec(3, 5)
+        ax = fig.add_subplot(grid[:2, :4])
+        hist_ax = fig.add_subplot(grid[:, 4])
+        overview_ax = fig.add_subplot(grid[2, :4])
+        # one element in red and blue, more in a color each with the resultant dotted
+        for i, c in enumerate(channels):
+            colors, styles = (['r', 'b'], ['-', '-']) if len(channels) == 1 else ([f'C{i}', f'C{i}'], ['-', ':'])
+            c.line, = ax.plot([], [], color=colors[0], linestyle=styles[0], linewidth=1)
+            c.line2, = ax.plot([], [], color=colors[1], linestyle=styles[1], linewidth=1)
+            c.hist_line, = hist_ax.plot(c.reader.stats.edges, c.reader.stats.histogram, color='g' if len(channels) == 1 else colors[0],
+                                        drawstyle='steps-post', linewidth=1)
+            c.overview_line, = overview_ax.plot([], [], color=colors[0], linestyle=styles[0], linewidth=0.5)
+            c.overview_line2, = overview_ax.plot([], [], color=colors[1], linestyle=styles[1], linewidth=0.5)
+        prefix = ['' if len(channels) == 1 else f'{c.name} ' for c in channels]
+        ax.legend([l for c in channels for l in (c.line, c.line2)],
+                  [f'{p}{axis}' for p in prefix for axis in ('z-axis', 'Resultant')], loc='upper right')
+        ax.set_title('Charting RAW Acceleration from Motion sensor' + ('s' if len(channels) > 1 else ''))
+        ax.set_xlabel('Time (secs)')
+        ax.set_ylabel('Accel (mm/sq_sec)')
+        stats = fig.text(0.01, 0.01, '', fontsize=8)
+        analysis = ax.text(0.01, 0.98, '', transform=ax.transAxes, va='top', fontsize=9)
+        x_scaler = live_chart.AxisScaler(ax.get_xlim, ax.set_xlim, margin=0.25)
+        y_scaler = live_chart.AxisScaler(ax.get_ylim, ax.set_ylim)
+        # Histogram of the intervals between samples
+        hist_ax.set_xlim(0, channels[0].reader.stats.max_ms)
+        hist_ax.set_title('Sample intervals')
+        hist_ax.set_xlabel('ms')
+        hist_scaler = live_chart.AxisScaler(hist_ax.get_ylim, hist_ax.set_ylim, margin=0.5, pad_low=False)
+        # Whole session
+        overview_ax.set_title('Whole session', fontsize=10)
+        overview_x_scaler = live_chart.AxisScaler(overview_ax.get_xlim, overview_ax.set_xlim, margin=0.5, shrink=0, pad_low=False)
+        overview_y_scaler = live_chart.AxisScaler(overview_ax.get_ylim, overview_ax.set_ylim, shrink=0)
+        renderer = live_chart.BlitRenderer(fig, [stats, analysis] + [a for c in channels for a in
+                                                   (c.line, c.line2, c.hist_line, c.overview_line, c.overview_line2)], use_blit)
+        ref_time(True)
+        for c in channels:
+            c.sampler.start()
+        renderer.start(refresh, max_fps)
+        plt.tight_layout()
+        plt.show()
+        renderer.stop()
+        for c in channels:
+            c.sampler.stop()
+            pzLog.info(f'Read {c.sampler.samples.total} samples of {c.name}, {c.sampler.errors} errors')
 
 except Exception as e:
     print(f'Err! Failed to run commands: ex {e}')
@@ -269,8 +492,11 @@ except Exception as e:
 
 finally:
     pzLog.info(f'End.')
+    for c in channels:
+        try:
+            c.close()
+        except Exception as e:
+            print(f'Err! Failed to write {c.out_file}, ex {e}')
     # Program completed, disconnect elements and quit
-    pz.plezmoApi.disconnect(motion_name)
-    time.sleep(1)
-    pz.plezmoApi.close()
+    session.close()
     exit(0)
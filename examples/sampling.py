@@ -0,0 +1,170 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Reading elements at a fixed rate, or at a rate that follows how fast the value changes,
+# e.g. the distance of distance_plot_example.py.
+#   sampler = PeriodicSampler(lambda: Distance.getDistanceCM("Distance"), interval=0.5, duration=60)
+#   for t, distance in sampler:
+#       ...
+# Reads are started at absolute deadlines interval apart on the monotonic clock, so the time
+# taken by reads and by the loop body does not add up into drift. Each reading comes with
+# the time it was actually taken, the middle of its read in seconds since the start. When a
+# read and the loop body run past the next deadline, that reading is taken at once. Deadlines
+# that passed completely meanwhile are skipped rather than read late in a burst, and counted
+# as missed.
+import time
+import threading
+
+from plezmo_backend import Logger
+
+logger = Logger()
+
+class PeriodicSampler:
+    # Stops after duration seconds or count readings if given, or when stop() is called
+    def __init__(self, read, interval, duration=None, count=None):
+        if interval <= 0:
+            raise ValueError("interval must be more than 0, got {}".format(interval))
+        self.read = read
+        self.interval = interval
+        self.duration = duration
+        self.count = count
+        self.samples = 0
+        # times the next deadline had passed already, and deadlines skipped because of it
+        self.overruns = 0
+        self.missed = 0
+        # most a read started after its deadline, and total time of all reads, in seconds
+        self.max_late = 0.0
+        self.read_time = 0.0
+        self.start = None
+        # time of the first and the last reading
+        self._first = None
+        self._last = None
+        self._stop = threading.Event()
+
+    # Can be called from another thread, the sampler stops without waiting for the next deadline
+    def stop(self):
+        self._stop.set()
+
+    def __iter__(self):
+        self._stop.clear()
+        self.start = time.monotonic()
+        deadline = self.start
+        while self.count == None or self.samples < self.count:
+            if self.duration != None and deadline - self.start >= self.duration:
+                break
+            wait = deadline - time.monotonic()
+            if self._stop.wait(wait if wait > 0 else 0):
+                break
+            before = time.monotonic()
+            value = self.read()
+            after = time.monotonic()
+            self.samples += 1
+            self.max_late = max(self.max_late, before - deadline)
+            self.read_time += after - before
+            t = (before + after) / 2 - self.start
+            if self._first == None:
+                self._first = t
+            self._last = t
+            yield t, value
+            deadline += self.next_interval(value)
+            late = time.monotonic() - deadline
+            if late > 0:
+                # the reading of the latest deadline passed is taken now, the ones before it are skipped
+                missed = int(late // self.interval)
+                if self.overruns == 0:
+                    logger.info("Sampling every {} s is too fast, reading took {:.3f} s".format(self.interval, after - before))
+                self.overruns += 1
+                self.missed += missed
+                deadline += missed * self.interval
+
+    # Time to the next read after value was read
+    def next_interval(self, value):
+        return self.interval
+
+    # Summary as a dict: readings, rate asked (the latest) and achieved, overruns, deadlines missed, and
+    # how late reads started and how long they took at most / on average, in milliseconds
+    def summary(self):
+        elapsed = self._last - self._first if self.samples > 1 else 0
+        return {
+            "samples": self.samples,
+            "interval": self.interval,
+            "rate": 1 / self.interval,
+            "achieved_rate": (self.samples - 1) / elapsed if elapsed > 0 else 0.0,
+            "overruns": self.overruns,
+            "missed": self.missed,
+            "max_late_ms": self.max_late * 1000,
+            "mean_read_ms": self.read_time / self.samples * 1000 if self.samples > 0 else 0.0,
+        }
+
+# Reading an element at a rate that follows its value, to leave the adapter to other elements
+# while the value does not change. As soon as a reading differs from the one before by
+# threshold or more the rate goes up to max_rate, while readings stay within threshold it backs
+# off by backoff times with every reading down to min_rate, e.g.
+#   sampler = AdaptiveSampler(lambda: Color.getLightValueLux("Color"), 0.5, 10, threshold=20)
+class AdaptiveSampler(PeriodicSampler):
+    def __init__(self, read, min_rate, max_rate, threshold, duration=None, count=None, backoff=1.25):
+        if not 0 < min_rate <= max_rate:
+            raise ValueError("rates must be 0 < min_rate <= max_rate, got {} and {}".format(min_rate, max_rate))
+        super().__init__(read, 1 / max_rate, duration, count)
+        self.min_interval = 1 / max_rate
+        self.max_interval = 1 / min_rate
+        self.threshold = threshold
+        self.backoff = backoff
+        # readings that changed by threshold or more
+        self.changes = 0
+        self._previous = None
+
+    def next_interval(self, value):
+        if self._previous != None and abs(value - self._previous) >= self.threshold:
+            self.changes += 1
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        self._previous = value
+        return self.interval
+
+    # Also the rates allowed, readings that changed and reads saved compared to max_rate
+    def summary(self):
+        summary = super().summary()
+        elapsed = self._last - self._first if self.samples > 1 else 0
+        summary.update({
+            "min_rate": 1 / self.max_interval,
+            "max_rate": 1 / self.min_interval,
+            "changes": self.changes,
+            "saved": max(int(elapsed / self.min_interval) + 1 - self.samples, 0) if self.samples > 0 else 0,
+        })
+        return summary
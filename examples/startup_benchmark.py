@@ -0,0 +1,130 @@
+# Copyright (c) 2019 Gunakar Pvt Ltd
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted (subject to the limitations in the disclaimer
+# below) provided that the following conditions are met:
+
+#      * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+
+#      * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+
+#      * Neither the name of the Gunakar Pvt Ltd/Plezmo nor the names of its
+#      contributors may be used to endorse or promote products derived from this
+#      software without specific prior written permission.
+
+#      * This software must only be used with Plezmo elements manufactured by
+#      Gunakar Pvt Ltd.
+
+#      * Any software provided in binary or object form under this license must not be
+#      reverse engineered, decompiled, modified and/or disassembled.
+
+# NO EXPRESS OR IMPLIED LICENSES TO ANY PARTY'S PATENT RIGHTS ARE GRANTED BY
+# THIS LICENSE. THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+# IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# Measures how long the examples take to start. Every script is run a few times with
+# python -X importtime, by default with --help so that only the start up is measured.
+# Prints the wall clock start up time and the modules that took longest to import.
+#
+# e.g. # python startup_benchmark.py
+#      # python startup_benchmark.py --runs 10 --args "--dry-run Motion" raw_acceleration_chart.py
+#      # python startup_benchmark.py --json startup.json
+import os
+import re
+import sys
+import glob
+import json
+import shlex
+import argparse
+import statistics
+import subprocess
+import time
+
+EXAMPLES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+# Scripts that handle the common options of utils.handle_options(), except this one
+def default_scripts():
+    scripts = []
+    for path in sorted(glob.glob(os.path.join(EXAMPLES_DIR, "*.py"))):
+        if path == os.path.abspath(__file__):
+            continue
+        with open(path, encoding="utf-8") as f:
+            if "utils.handle_options(" in f.read():
+                scripts.append(path)
+    return scripts
+
+# Run script once, returns wall clock time in seconds and {module: (self us, cumulative us, depth)}
+def run_once(script, args):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", script] + args, cwd=EXAMPLES_DIR,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    modules = {}
+    for line in proc.stderr.splitlines():
+        m = IMPORT_TIME.match(line)
+        if m != None:
+            modules[m.group(4)] = (int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2)
+    return elapsed, modules
+
+def measure(script, args, runs):
+    # first run writes the .pyc files, it is not counted
+    run_once(script, args)
+    times = []
+    cumulative = {}
+    for _ in range(runs):
+        elapsed, modules = run_once(script, args)
+        times.append(elapsed)
+        for name, (_, cum, depth) in modules.items():
+            # modules imported by the script itself and by the modules of the examples
+            if depth == 0:
+                cumulative.setdefault(name, []).append(cum)
+    imports = {name: statistics.median(values) / 1000 for name, values in cumulative.items()}
+    return {"script": os.path.basename(script),
+            "startup_ms": {"median": statistics.median(times) * 1000, "min": min(times) * 1000, "max": max(times) * 1000},
+            "imports_ms": sum(imports.values()),
+            "modules_ms": dict(sorted(imports.items(), key=lambda item: -item[1]))}
+
+def report(result, top):
+    startup = result["startup_ms"]
+    print("{}: start up {:.1f} ms (min {:.1f}, max {:.1f}), imports {:.1f} ms".format(
+        result["script"], startup["median"], startup["min"], startup["max"], result["imports_ms"]))
+    for name, ms in list(result["modules_ms"].items())[:top]:
+        print("    {:>8.1f} ms  {}".format(ms, name))
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure start up and import time of the examples")
+    parser.add_argument("scripts", nargs="*", help="scripts to run, all examples by default")
+    parser.add_argument("--runs", type=int, default=5, help="runs per script, default 5")
+    parser.add_argument("--args", default="--help", help="arguments given to the scripts, default --help")
+    parser.add_argument("--top", type=int, default=5, help="slowest imports shown per script, default 5")
+    parser.add_argument("--json", help="also write the results to this file")
+    options = parser.parse_args()
+
+    scripts = [os.path.abspath(s) for s in options.scripts] or default_scripts()
+    results = []
+    for script in scripts:
+        result = measure(script, shlex.split(options.args), options.runs)
+        report(result, options.top)
+        results.append(result)
+    if options.json != None:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version, "args": options.args, "runs": options.runs, "results": results}, f, indent=2)
+
+# Program starts here
+if __name__ == "__main__":
+    main()
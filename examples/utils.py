@@ -35,7 +35,54 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import os
 import sys
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import plezmo_types
+import plezmo_backend
+from plezmo_backend import plezmoApi, Logger, PlezmoElementType, ConnectionFailedException
+
+logger = Logger()
+
+# Time given to an element to start after it is connected, plezmoApi.connect() waits the same
+ELEMENT_SETTLE_TIME = 1
+
+# Plezmo wireless adapter can look for only one element at a time, so finding and
+# connecting elements is serialized on it. Element start up after the connect runs in parallel.
+adapter_lock = threading.Lock()
+
+# Where MAC addresses of known elements are remembered, PLEZMO_MAC_CACHE overrides it.
+# Simulated and replayed elements have made up addresses, they are kept apart from the real ones.
+MAC_CACHE_FILE = os.environ.get("PLEZMO_MAC_CACHE", os.path.join(os.path.expanduser("~"), ".plezmo",
+    "mac_cache.json" if plezmo_backend.BACKEND in ("plezmo", "broker") else "mac_cache_{}.json".format(plezmo_backend.BACKEND)))
+
+# Options understood by all examples, they are taken out of sys.argv by handle_options()
+#   -h, --help  print usage and exit
+#   --dry-run   check the arguments and exit without connecting to any element
+OPTIONS = ["-h", "--help", "--dry-run"]
+
+_dry_run = False
+
+# Handle the common options. Call it first thing in the example, before anything of plezmo
+# is used, so that help and argument errors come back without initializing BLE.
+def handle_options(usage):
+    global _dry_run
+    if "-h" in sys.argv or "--help" in sys.argv:
+        print("usage: {} [--dry-run]".format(usage))
+        sys.exit(0)
+    _dry_run = "--dry-run" in sys.argv
+    sys.argv[1:] = [arg for arg in sys.argv[1:] if arg not in OPTIONS]
+
+# Returns True if the example was started with --dry-run, after logging what it would connect to
+def dry_run(elementNames):
+    if _dry_run:
+        logger.info("Dry run, arguments are fine, not connecting to elements {}".format(elementNames))
+    return _dry_run
 
 def extract_element_name():
     element_name = None
@@ -43,4 +90,471 @@ def extract_element_name():
         return element_name
     else:
         element_name = sys.argv[1]
-        return element_name
\ No newline at end of file
+        return element_name
+
+# Element list from arguments given as name:TYPE e.g. Motion:MOTION, None if any is not valid.
+# Types are kept as names so that checking the arguments does not load the backend, see
+# resolve_elements().
+def extract_elements(args):
+    elementList = []
+    for arg in args:
+        name, _, type_name = arg.rpartition(":")
+        if name == "" or type_name not in [t.name for t in plezmo_types.PlezmoElementType]:
+            return None
+        elementList.append({"name": name, "type": type_name})
+    return elementList
+
+# Element list from extract_elements() with the type names replaced by element types of the backend
+def resolve_elements(elementList):
+    return [{"name": e["name"], "type": PlezmoElementType[e["type"]]} for e in elementList]
+
+# Remembers MAC addresses of elements between runs, keyed by element name and type,
+# so that known elements can be connected by MAC without scanning for them first.
+# With path None the cache is kept in memory only.
+class MacCache:
+    def __init__(self, path=MAC_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+
+    @staticmethod
+    def _key(name, element_type):
+        return "{}/{}".format(element_type.name, name)
+
+    def _load(self):
+        if self._entries == None:
+            self._entries = {}
+            if self.path == None:
+                # in memory cache only
+                return
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    # Returns cached entry {"mac": ..., "addr_type": ...} or None if the element is not known
+    def get(self, name, element_type):
+        with self._lock:
+            self._load()
+            return self._entries.get(self._key(name, element_type))
+
+    # addr_type None keeps the address type known for the same MAC, backends without the
+    # adapter (e.g. the broker) do not know it
+    def put(self, name, element_type, mac, addr_type=None):
+        with self._lock:
+            self._load()
+            key = self._key(name, element_type)
+            known = self._entries.get(key)
+            if addr_type == None and known != None and known.get("mac") == mac:
+                addr_type = known.get("addr_type")
+            entry = {"mac": mac, "addr_type": addr_type}
+            if self._entries.get(key) != entry:
+                self._entries[key] = entry
+                self._dirty = True
+
+    def remove(self, name, element_type):
+        with self._lock:
+            self._load()
+            if self._entries.pop(self._key(name, element_type), None) != None:
+                self._dirty = True
+
+    # Write the cache to disk if it changed. Failures are logged, the cache is only an optimization.
+    def save(self):
+        with self._lock:
+            if not self._dirty or self.path == None:
+                return
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self._entries, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logger.error("Failed to save MAC cache {}, ex {}".format(self.path, e))
+
+# Cache used by connect_all() unless told otherwise
+mac_cache = MacCache()
+
+# BLE address type (e.g. random static) of an address reported by the adapter, None if unknown
+def _addr_type(peer_addr):
+    addr_type = getattr(peer_addr, "addr_type", None)
+    return getattr(addr_type, "value", addr_type)
+
+# Remember MAC addresses of elements returned by plezmoApi.getDiscoveredElements()
+def remember_discovered(elements, cache=None):
+    if cache == None:
+        cache = mac_cache
+    discovered = getattr(getattr(plezmoApi, "device_manager", None), "discovered_elements", None) or {}
+    for e in elements:
+        peer_addr = discovered.get(e["mac"], {}).get("peer_addr")
+        cache.put(e["name"], e["type"], e["mac"], _addr_type(peer_addr))
+    cache.save()
+
+# Adapter accepts connect by MAC only for elements found by a scan in this process.
+# Register the cached address as if it was just discovered so that the scan can be skipped.
+# Only done when the address type is known, a wrong one would not connect. Returns True if
+# the element was registered, False if it was discovered already or cannot be.
+def _seed_discovered(device_manager, name, element_type, entry):
+    if not hasattr(device_manager, "discovered_elements"):
+        # no scan has run yet
+        device_manager.discovered_elements = {}
+    addr_type = entry.get("addr_type")
+    discovered = device_manager.discovered_elements
+    if addr_type == None or entry["mac"] in discovered:
+        return False
+    from plezmo_ble_driver_py.ble_driver import BLEGapAddr
+    addr = [int(b, 16) for b in entry["mac"].split(":")]
+    discovered[entry["mac"]] = {"name": name, "mac": entry["mac"],
+        "type": element_type.value, "peer_addr": BLEGapAddr(BLEGapAddr.Types(addr_type), addr)}
+    return True
+
+# Connect by the cached MAC address of the element through the adapter, returns the element
+# or None if it has to be scanned for
+def _adapter_connect_by_mac(device_manager, name, element_type, timeout, cache, entry):
+    seeded = _seed_discovered(device_manager, name, element_type, entry)
+    if not seeded and entry["mac"] not in device_manager.discovered_elements:
+        # not known to the adapter, the element has to be scanned for
+        return None
+    try:
+        return device_manager.connect_by_mac(entry["mac"], element_type, timeout)
+    except Exception as e:
+        logger.info("Connect to element {} by cached MAC {} failed, scanning for it, ex {}".format(name, entry["mac"], e))
+        cache.remove(name, element_type)
+        if seeded:
+            # the address is not good, later connects must not use it
+            device_manager.discovered_elements.pop(entry["mac"], None)
+        return None
+
+# Connect by the cached MAC address of the element through a backend without adapter,
+# returns False if it has to be connected by name
+def _api_connect_by_mac(name, element_type, timeout, entry):
+    try:
+        plezmoApi.connectByMac(entry["mac"], element_type, timeout)
+        return True
+    except Exception as e:
+        # not a reason to drop the address, e.g. the broker connects by MAC only elements it
+        # has connected already
+        logger.info("Connect to element {} by cached MAC {} failed, ex {}".format(name, entry["mac"], e))
+        return False
+
+# Connect to one element. Returns the time spent waiting for the adapter and the time the
+# connect took after that, in seconds.
+# plezmoApi.connect() finds and connects the element, then sends it the start command and
+# gives it ELEMENT_SETTLE_TIME to start. Only finding and connecting need the adapter, so
+# this does the same in two steps with adapter_lock held for the first one only, and the
+# start up of elements overlaps. Backends without the adapter in this process (sim, broker,
+# replay) do the complete connect through plezmoApi without the lock.
+def _connect_element(name, element_type, timeout, cache):
+    queued = time.monotonic()
+    entry = cache.get(name, element_type) if cache != None else None
+    device_manager = getattr(plezmoApi, "device_manager", None)
+    if device_manager == None:
+        if entry == None or not _api_connect_by_mac(name, element_type, timeout, entry):
+            plezmoApi.connect(name, element_type, timeout)
+            if cache != None:
+                for e in plezmoApi.getConnectedElements():
+                    if e["name"] == name and e.get("mac") != None:
+                        cache.put(name, element_type, e["mac"])
+        return 0.0, time.monotonic() - queued
+    with adapter_lock:
+        start = time.monotonic()
+        try:
+            element = None
+            if entry != None:
+                element = _adapter_connect_by_mac(device_manager, name, element_type, timeout, cache, entry)
+            if element == None:
+                element = device_manager.connect(name, element_type, timeout)
+                if cache != None:
+                    cache.put(name, element_type, element.mac, _addr_type(device_manager.target_device_addr_type))
+        except Exception:
+            logger.error("Failed to connect to element {}. Please check element name and type.".format(name))
+            raise ConnectionFailedException(name)
+    try:
+        # Send start command to element and give it time to initialize
+        element.init()
+        time.sleep(ELEMENT_SETTLE_TIME)
+    except Exception:
+        logger.error("Failed to start element {}".format(name))
+        raise ConnectionFailedException(name)
+    return start - queued, time.monotonic() - start
+
+# Connect to all elements in elementList, each on a worker thread of its own. The adapter
+# finds and connects one element at a time, the start up of the elements overlaps. Either
+# all elements get connected or none: if any connect fails, pending connects are cancelled,
+# elements connected so far are disconnected and the exception is raised again.
+# Elements with a MAC address in cache are connected by MAC, pass cache=None to always scan.
+# Returns dictionary of element name to connect latency in seconds, from the time the
+# connect got the adapter. Time spent waiting for the adapter is logged.
+def connect_all(elementList, timeout=30, max_workers=None, cache=mac_cache):
+    if max_workers == None:
+        max_workers = len(elementList)
+    latencies = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {}
+        for e in elementList:
+            futures[pool.submit(_connect_element, e["name"], e["type"], timeout, cache)] = e["name"]
+        for f in as_completed(futures):
+            if f.cancelled():
+                continue
+            name = futures[f]
+            try:
+                wait, latencies[name] = f.result()
+                logger.info("Connected to element {} in {:.2f} seconds, after waiting {:.2f} seconds for the adapter".format(
+                    name, latencies[name], wait))
+            except Exception as e:
+                if error == None:
+                    error = e
+                    # no point waiting for the rest, stop connects not started yet
+                    for other in futures:
+                        other.cancel()
+    if cache != None:
+        cache.save()
+    if error != None:
+        # Disconnect already connected elements
+        disconnect_all(list(latencies))
+        raise error
+    return latencies
+
+# True if discovered element e is the wanted one. Wanted element is a dictionary with
+# optional "name" and "type", missing keys match anything.
+def _matches(wanted, e):
+    return wanted.get("name", e["name"]) == e["name"] and wanted.get("type", e["type"]) == e["type"]
+
+# Elements found so far by the running scan
+def _scanned_elements(device_manager, stale):
+    discovered = getattr(device_manager, "discovered_elements", None)
+    if discovered == None or discovered is stale:
+        # scan has not started yet, these are results of an earlier scan
+        return []
+    return [{"mac": mac, "type": PlezmoElementType(e["type"]), "name": e["name"]} for mac, e in list(discovered.items())]
+
+# End a running scan. The SDK leaves the scan running after discovery, stopping it once
+# the wanted elements are seen frees the adapter for connecting them.
+def _stop_scan(device_manager):
+    try:
+        device_manager.adapter.driver.ble_gap_scan_stop()
+    except Exception as e:
+        logger.debug("Failed to stop scan, ex {}".format(e))
+
+# Discover elements in the background and yield each element (dictionary with name, mac
+# and type) as soon as it is seen, instead of waiting for the complete scan like
+# plezmoApi.getDiscoveredElements() does. If wanted is given (list of dictionaries with
+# "name" and/or "type"), the scan is stopped as soon as all the wanted elements have been
+# seen. The adapter is held till the generator ends, connect elements after the loop (see
+# discover_and_connect()). Backends without the adapter in this process report elements
+# only at the end of the scan.
+def discover_elements(timeout=5, wanted=None):
+    device_manager = getattr(plezmoApi, "device_manager", None)
+    stale = getattr(device_manager, "discovered_elements", None)
+    scan_result = {}
+    def scan():
+        scan_result["elements"] = plezmoApi.getDiscoveredElements(timeout)
+    pending = list(wanted) if wanted != None else None
+    seen = set()
+    with adapter_lock:
+        # getDiscoveredElements() returns only after timeout even if the scan is stopped
+        # earlier, it is left to finish in the background
+        scan_thread = threading.Thread(target=scan, daemon=True)
+        scan_thread.start()
+        while True:
+            finished = not scan_thread.is_alive()
+            if device_manager == None:
+                found = scan_result.get("elements") or []
+            else:
+                found = _scanned_elements(device_manager, stale)
+            for e in found:
+                if e["mac"] in seen:
+                    continue
+                seen.add(e["mac"])
+                yield e
+                if pending != None:
+                    for w in pending:
+                        if _matches(w, e):
+                            pending.remove(w)
+                            break
+                    if len(pending) == 0:
+                        if device_manager != None and not finished:
+                            _stop_scan(device_manager)
+                        return
+            if finished:
+                return
+            time.sleep(0.02)
+
+# Scan for the elements in elementList and connect them as soon as all of them have been
+# seen, instead of scanning for timeout seconds first. Seen elements are connected by their
+# MAC address, elements not seen within timeout seconds are scanned for by name as
+# connect_all() does. Either all elements get connected or none.
+# Returns dictionary of element name to connect latency in seconds.
+def discover_and_connect(elementList, timeout=5, connect_timeout=30, cache=mac_cache):
+    if cache == None:
+        # seen addresses are still needed for the connects, just not saved
+        cache = MacCache(path=None)
+    discovered = []
+    for e in discover_elements(timeout, elementList):
+        logger.debug("Found element {}".format(e))
+        discovered.append(e)
+    remember_discovered([e for e in discovered if any(_matches(w, e) for w in elementList)], cache)
+    return connect_all(elementList, connect_timeout, cache=cache)
+
+# Names of elements currently connected to the adapter
+def connected_element_names():
+    return [e["name"] for e in plezmoApi.getConnectedElements()]
+
+# Disconnect elements in parallel and wait till none of them is reported as connected.
+# Returns False if some element is still connected after timeout seconds.
+def disconnect_all(names, timeout=5):
+    if len(names) > 0:
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            futures = {}
+            for name in names:
+                futures[pool.submit(plezmoApi.disconnect, name)] = name
+            for f in as_completed(futures):
+                try:
+                    f.result()
+                except Exception as e:
+                    logger.error("Failed to disconnect element {}, ex {}".format(futures[f], e))
+    # wait for the adapter to drop the elements instead of sleeping for a fixed time
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = set(names) & set(connected_element_names())
+        if len(remaining) == 0:
+            return True
+        if time.monotonic() >= deadline:
+            logger.error("Elements {} still connected after {} seconds".format(sorted(remaining), timeout))
+            return False
+        time.sleep(0.05)
+
+# Connects to the elements of elementList and disconnects them when the session ends.
+# plezmoApi.close() is always called at the end of the session, also when connect fails.
+#
+#   with ElementSession(elementList) as session:
+#       Light.turnOn(...)
+class ElementSession:
+    def __init__(self, elementList, timeout=30):
+        self.elementList = elementList
+        self.timeout = timeout
+        # element name to connect latency, None till the elements are connected
+        self.latencies = None
+
+    # Connect to all the elements. If any connect fails plezmo is closed and the exception is raised.
+    def connect(self):
+        if self.latencies == None:
+            try:
+                self.latencies = connect_all(self.elementList, self.timeout)
+            except Exception:
+                plezmoApi.close()
+                raise
+        return self
+
+    # Disconnect all the elements and uninitialize plezmo
+    def close(self):
+        try:
+            if self.latencies != None:
+                disconnect_all([e["name"] for e in self.elementList])
+        finally:
+            self.latencies = None
+            plezmoApi.close()
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+# Keeps elements connected in long running programs. Elements that drop out (e.g. go out
+# of BLE range) are reconnected with exponential backoff and jitter, and event handlers
+# registered through the supervisor are registered again after the reconnect, as the
+# element forgets them when it disconnects.
+#
+#   supervisor = ElementSupervisor(elementList)
+#   supervisor.register(Motion.onTilt, motion_name, tilt_handler, Tilt.LEFT)
+#   supervisor.run_forever()
+class ElementSupervisor:
+    def __init__(self, elementList, poll_interval=0.5, min_backoff=0.5, max_backoff=30, connect_timeout=30):
+        self.elementList = elementList
+        self.poll_interval = poll_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connect_timeout = connect_timeout
+        # element name to list of (facade method, arguments) to call again after reconnect
+        self._registrations = {}
+        # element name to {"lost": time, "attempts": count, "next": time of next attempt,
+        # "worker": thread reconnecting it or None}
+        self._lost = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reconnects = 0
+
+    # Call facade method (e.g. Motion.onTilt) for the element now and after every reconnect
+    def register(self, method, elementName, *args):
+        method(elementName, *args)
+        self._registrations.setdefault(elementName, []).append((method, args))
+
+    # Monitor elements in a background thread
+    def start(self):
+        if self._thread == None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread != None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    # Monitor elements in the calling thread till stop() is called
+    def run_forever(self):
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.poll_interval)
+
+    # Look for lost elements and start reconnecting the ones whose backoff has expired. Each
+    # element is reconnected by a worker thread of its own, so an element that cannot be found
+    # does not hold up the others.
+    def check(self):
+        connected = set(connected_element_names())
+        now = time.monotonic()
+        with self._lock:
+            for e in self.elementList:
+                name = e["name"]
+                if name in connected:
+                    continue
+                state = self._lost.get(name)
+                if state == None:
+                    logger.error("Element {} disconnected, reconnecting".format(name))
+                    state = {"lost": now, "attempts": 0, "next": now, "worker": None}
+                    self._lost[name] = state
+                if state["worker"] == None and now >= state["next"]:
+                    state["worker"] = threading.Thread(target=self._reconnect, args=(e, state), daemon=True)
+                    state["worker"].start()
+
+    def _reconnect(self, e, state):
+        name = e["name"]
+        try:
+            connect_all([e], self.connect_timeout)
+            for method, args in self._registrations.get(name, []):
+                method(name, *args)
+        except Exception as ex:
+            logger.error("Reconnect to element {} failed (attempt {}), ex {}".format(name, state["attempts"] + 1, ex))
+            if name in connected_element_names():
+                # connected but handlers could not be registered, start over on next attempt
+                disconnect_all([name])
+            with self._lock:
+                state["attempts"] += 1
+                # full jitter keeps several elements (or scripts) from retrying in lock step
+                backoff = min(self.max_backoff, self.min_backoff * (2 ** state["attempts"]))
+                state["next"] = time.monotonic() + random.uniform(0, backoff)
+                state["worker"] = None
+            return
+        with self._lock:
+            del self._lost[name]
+            self.reconnects += 1
+        logger.info("Element {} reconnected after {:.1f} seconds".format(name, time.monotonic() - state["lost"]))
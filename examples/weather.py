@@ -35,18 +35,18 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-import requests
+import os
 import json
 import time
 import sys
+import argparse
 import traceback
 import logging
+from collections import OrderedDict
 
-from plezmo import *
-from plezmo.elements.element_types import PlezmoElementType
-from plezmo.elements.plezmo_display import *
-from plezmo.elements.plezmo_music import *
-from plezmo.elements.plezmo_light import *
+from plezmo_backend import *
+
+import utils
 
 MUSIC_NAME = "Music"
 DISPLAY_NAME = "Display"
@@ -101,11 +101,104 @@ CONST_CLOUD = "cloud"
 def kelvinToCelcius(temp):
     return round(temp - 273.15, 2)
 
+# Weather of recently asked cities, so that asking for a city again costs no request and API
+# quota. Entries are keyed by normalized city name and are good for ttl seconds. At most
+# size cities are kept, the one asked for least recently is dropped first. With path given
+# entries are kept in that JSON file between runs, so they are on wall clock time.
+class WeatherCache:
+    def __init__(self, ttl=600, size=32, path=None):
+        self.ttl = ttl
+        self.size = size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        # key -> {"time": ..., "data": ...}, least recently used first
+        self._entries = OrderedDict()
+        self._load()
+
+    # " new  york" and "New York" are the same city
+    @staticmethod
+    def _key(cityName):
+        return " ".join(cityName.split()).casefold()
+
+    def _load(self):
+        if self.path == None:
+            return
+        now = time.time()
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+            loaded = OrderedDict()
+            for key, entry in entries.items():
+                if not isinstance(entry["time"], (int, float)) or not isinstance(entry["data"], dict):
+                    raise ValueError("bad entry {}".format(key))
+                if now - entry["time"] < self.ttl:
+                    loaded[key] = {"time": entry["time"], "data": entry["data"]}
+        except FileNotFoundError:
+            # nothing cached yet
+            return
+        except (OSError, ValueError, AttributeError, KeyError, TypeError) as e:
+            # not a cache written by save(), start with an empty one
+            print("Ignoring weather cache {}, ex {}".format(self.path, e))
+            return
+        self._entries = loaded
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    # Returns weather of the city if it was fetched less than ttl seconds ago, else None
+    def get(self, cityName):
+        key = self._key(cityName)
+        entry = self._entries.get(key)
+        if entry != None and time.time() - entry["time"] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["data"]
+        if entry != None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, cityName, data):
+        key = self._key(cityName)
+        self._entries[key] = {"time": time.time(), "data": data}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        self.save()
+
+    # Write the cache to disk. Failures are printed, the cache is only an optimization.
+    def save(self):
+        if self.path == None:
+            return
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print("Failed to save weather cache {}, ex {}".format(self.path, e))
+
+# Cache used by fetchWeather(), set up from the arguments in main()
+weatherCache = WeatherCache()
+
 def fetchWeather(cityName):
+    data = weatherCache.get(cityName)
+    if data != None:
+        print("Weather for {} from cache ({} hits, {} misses)".format(cityName, weatherCache.hits, weatherCache.misses))
+        return data
+    data = requestWeather(cityName)
+    # failed lookups are not cached, they are tried again next time
+    if data != None:
+        weatherCache.put(cityName, data)
+    return data
+
+def requestWeather(cityName):
     print("Fetching weather for {}".format(cityName))
     url = "http://api.openweathermap.org/data/2.5/weather?APPID=" + API_KEY + "&q=" + cityName
     #print(url)
     try:
+       # imported only when needed, importing requests takes a while
+       import requests
        res = requests.get(url)
        print("response is {}".format(res.text))
        data = json.loads(res.text)
@@ -131,97 +224,87 @@ def init():
     elementList = [{"name" : DISPLAY_NAME, "type": PlezmoElementType.DISPLAY},
                    {"name" : MUSIC_NAME, "type": PlezmoElementType.MUSIC},
                    {"name" : LIGHT_NAME, "type": PlezmoElementType.LIGHT}]
-    connectedElements = []
     try:
-        # connect to elements one by one
-        for e in elementList:
-            print("Connecting to element {}".format(e["name"]))
-            plezmoApi.connect(e["name"], e["type"], 60)
-            # keep track of connected elements
-            connectedElements.append(e["name"])
-            print("Connection to element {} successful".format(e["name"]))
+        session = utils.ElementSession(elementList, 60).connect()
+        for name in session.latencies:
+            print("Connection to element {} successful in {:.2f} seconds".format(name, session.latencies[name]))
         print("All connections successful")
-        return True
+        return session
     except Exception as e:
-        # Disconnect and stop program if connection to element fails
+        # Stop program if connection to element fails
         print("Failed to connect to one of the elements, restart the script")
-        # Disconnect already connected elements
-        for e in connectedElements:
-            plezmoApi.disconnect(e)
-        return False
+        return None
 
 # Main logic of the program
-def main():
+def main(cacheTtl, cacheSize, cacheFile):
+    global weatherCache
+    weatherCache = WeatherCache(cacheTtl, cacheSize, cacheFile)
     # Init bluetooth communication
-    success = init()
-    if success != True:
+    session = init()
+    if session == None:
         # Bluetooth communication cannot be enabled, quit.
-        plezmoApi.close()
         print("Could not connect to all the required elements")
         return
 
-    Display.setFontSize(DISPLAY_NAME, FontSize.SMALL)
-
-    while True:
-        # clear display
-        Display.clearDisplay(DISPLAY_NAME)
-        # turn light off
-        Light.setState(LIGHT_NAME, LightState.OFF)
-        print("------------------------------------------------")
-        cityName = input("To know weather, enter city name: ")
-
-        # fetch weather for city
-        data = fetchWeather(cityName)
-        if data == None:
-            print("Unable to find weather for city " + cityName)
-            continue
-        try:
-            # get temp
-            temp = data.get("currentTemp")
-            # get overall weather
-            weather = data.get("weather")
-            lightColor = None
-            print("temp is {}, weather is {}".format(temp, weather))
-            # turn light on in BLUE color if temeperatur is < 20
-            # turn light on in YELLOw color if temeperatur is > 20 but < 30
-            # turn light on in RED color if temeperatur is > 30
-            if temp < 20:
-                lightColor = LightColor("#0000FF")
-            elif temp < 30:
-                lightColor = LightColor("#FFFF00")
-            else:
-                lightColor = LightColor("#FF0000")
-            Light.turnOn(LIGHT_NAME, lightColor, Percentage(100))
-
-            # Show images on display and play audio on Music based on weather
-            if weather.lower().find(CONST_RAIN) >= 0 or weather.lower().find(CONST_CLOUD) >= 0:
-                Display.showImage(DISPLAY_NAME, DisplayImage.CLOUDY)
-                Display.showText(DISPLAY_NAME, DisplayLine.FIVE, TextAlignment.CENTER, weather)
-                if weather.lower().find(CONST_RAIN) >= 0:
-                    Music.playAudio(MUSIC_NAME, Audio.RAIN)
+    # Elements are disconnected and plezmo is closed when the session ends
+    with session:
+        Display.setFontSize(DISPLAY_NAME, FontSize.SMALL)
+
+        while True:
+            # clear display
+            Display.clearDisplay(DISPLAY_NAME)
+            # turn light off
+            Light.setState(LIGHT_NAME, LightState.OFF)
+            print("------------------------------------------------")
+            cityName = input("To know weather, enter city name: ")
+
+            # fetch weather for city
+            data = fetchWeather(cityName)
+            if data == None:
+                print("Unable to find weather for city " + cityName)
+                continue
+            try:
+                # get temp
+                temp = data.get("currentTemp")
+                # get overall weather
+                weather = data.get("weather")
+                lightColor = None
+                print("temp is {}, weather is {}".format(temp, weather))
+                # turn light on in BLUE color if temeperatur is < 20
+                # turn light on in YELLOw color if temeperatur is > 20 but < 30
+                # turn light on in RED color if temeperatur is > 30
+                if temp < 20:
+                    lightColor = LightColor("#0000FF")
+                elif temp < 30:
+                    lightColor = LightColor("#FFFF00")
+                else:
+                    lightColor = LightColor("#FF0000")
+                Light.turnOn(LIGHT_NAME, lightColor, Percentage(100))
+
+                # Show images on display and play audio on Music based on weather
+                if weather.lower().find(CONST_RAIN) >= 0 or weather.lower().find(CONST_CLOUD) >= 0:
+                    Display.showImage(DISPLAY_NAME, DisplayImage.CLOUDY)
+                    Display.showText(DISPLAY_NAME, DisplayLine.FIVE, TextAlignment.CENTER, weather)
+                    if weather.lower().find(CONST_RAIN) >= 0:
+                        Music.playAudio(MUSIC_NAME, Audio.RAIN)
+                    else:
+                        Music.playAudio(MUSIC_NAME, Audio.BIRDS_CHIRPING)
                 else:
+                    Display.showImage(DISPLAY_NAME, DisplayImage.SUNNY)
+                    Display.showText(DISPLAY_NAME, DisplayLine.FIVE, TextAlignment.CENTER, weather)
                     Music.playAudio(MUSIC_NAME, Audio.BIRDS_CHIRPING)
-            else:
-                Display.showImage(DISPLAY_NAME, DisplayImage.SUNNY)
-                Display.showText(DISPLAY_NAME, DisplayLine.FIVE, TextAlignment.CENTER, weather)
-                Music.playAudio(MUSIC_NAME, Audio.BIRDS_CHIRPING)
-        except Exception as e:
-            pass
+            except Exception as e:
+                pass
 
 # Program starts here
 if __name__ == "__main__":
-    try:
-        main()
-    finally:
-        # Program completed, disconnect elements and quit
-        plezmoApi.disconnect(DISPLAY_NAME)
-        plezmoApi.disconnect(MUSIC_NAME)
-        plezmoApi.disconnect(LIGHT_NAME)
-        time.sleep(1)
-        try:
-            plezmoApi.close()
-        except:
-            pass
-
-
-
+    utils.handle_options("python weather.py [--cache-ttl SECS] [--cache-size N] [--cache-file FILE]")
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--cache-ttl", type=float, default=600)
+    parser.add_argument("--cache-size", type=int, default=32)
+    parser.add_argument("--cache-file")
+    options = parser.parse_args()
+    if options.cache_size < 0:
+        print("--cache-size must not be negative")
+    elif not utils.dry_run([DISPLAY_NAME, MUSIC_NAME, LIGHT_NAME]):
+        main(options.cache_ttl, options.cache_size, options.cache_file)